@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Servidores locais que imitam o LoTW e a Bot API do Telegram, para testes de carga
+e regressão de throughput sem tocar nos serviços reais.
+
+LoTW  (GET /lotwuser/lotwreport.adi):
+  - filtra por qso_qslsince (APP_LOTW_RXQSL / QSLRDATE) quando qso_qsl=yes e por
+    qso_qsorxsince (APP_LOTW_RXQSO) quando qso_qsl=no, devolvendo APP_LOTW_LASTQSL /
+    APP_LOTW_LASTQSORX no cabeçalho; qso_startdate / qso_enddate e registros leves sem
+    qso_qsldetail / qso_mydetail;
+  - senha errada devolve a página HTML de erro (como o LoTW real);
+  - latência configurável e envio em chunks (Transfer-Encoding: chunked).
+
+Telegram (/bot<TOKEN>/<método>):
+  - getUpdates com long polling e offset; sendMessage, sendPhoto, setMyCommands;
+  - 429 "Too Many Requests" com retry_after a cada N envios (opcional).
+
+Admin (usado pelo load driver, ou manualmente com curl):
+  - POST /_admin/updates  {"text": "/check PY2XX"} -> injeta uma mensagem
+  - GET  /_admin/sent     -> mensagens enviadas pelo bot (com timestamp)
+
+Uso isolado:
+    python -m benchmarks.fake_services --port 8088 --qsos 5000
+    LOTW_URL=http://127.0.0.1:8088/lotwuser/lotwreport.adi \\
+    TELEGRAM_API_URL=http://127.0.0.1:8088 python main.py --mode bot
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import generate_qsos, to_adif
+
+LOTW_ERROR_PAGE = """<html><head><title>Logbook of the World</title></head>
+<body><h2>ARRL Logbook of the World</h2>
+<p>Username/password incorrect</p></body></html>"""
+
+
+QSL_DETAIL_FIELDS = {"DXCC", "COUNTRY", "CQZ", "ITUZ", "GRIDSQUARE", "VUCC_GRIDS", "STATE", "CNTY", "IOTA", "PFX"}
+MY_DETAIL_FIELDS = {"MY_GRIDSQUARE", "STATION_CALLSIGN", "MY_STATE", "MY_CNTY", "MY_DXCC", "MY_COUNTRY"}
+
+
+class FakeServices:
+    def __init__(self, qsos: Optional[List[Dict[str, str]]] = None, username: str = "BENCH",
+                 password: str = "BENCH", chat_id: str = "1", lotw_latency: float = 0.0,
+                 chunk_size: int = 0, chunk_delay: float = 0.0, rate_limit_every: int = 0,
+                 retry_after: int = 1, host: str = "127.0.0.1", port: int = 0):
+        self.qsos = qsos or []
+        self.username = username
+        self.password = password
+        self.chat_id = chat_id
+        self.lotw_latency = lotw_latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+
+        self._cond = threading.Condition()
+        self._updates: List[Dict] = []
+        self._next_update_id = 1
+        self._send_count = 0
+        self.sent: List[Dict] = []          # {"method", "chat_id", "text", "ts"}
+        self.lotw_requests: List[Dict] = []  # {"params", "records", "bytes", "ts"}
+
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    # --- Ciclo de vida ---
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def lotw_url(self) -> str:
+        return f"{self.base_url}/lotwuser/lotwreport.adi"
+
+    def start(self) -> "FakeServices":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- API usada pelo driver ---
+
+    def inject_update(self, text: str) -> int:
+        """Enfileira uma mensagem de texto como se o usuário tivesse digitado no chat."""
+        with self._cond:
+            update_id = self._next_update_id
+            self._next_update_id += 1
+            self._updates.append({
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": int(self.chat_id), "type": "private"},
+                    "text": text,
+                },
+            })
+            self._cond.notify_all()
+        return update_id
+
+    def _get_updates(self, offset: int, timeout: float) -> List[Dict]:
+        deadline = time.time() + min(timeout, 5.0)
+        with self._cond:
+            while True:
+                # Como o Telegram: o offset confirma (descarta) os anteriores
+                self._updates = [u for u in self._updates if u["update_id"] >= offset]
+                if self._updates or time.time() >= deadline:
+                    return list(self._updates)
+                self._cond.wait(max(0.0, deadline - time.time()))
+
+    def _record_send(self, method: str, chat_id: str, text: str) -> bool:
+        """Registra o envio. Retorna False se este envio deve levar 429."""
+        with self._cond:
+            self._send_count += 1
+            if self.rate_limit_every and self._send_count % self.rate_limit_every == 0:
+                return False
+            self.sent.append({"method": method, "chat_id": chat_id, "text": text, "ts": time.time()})
+            return True
+
+    def _lotw_slice(self, params: Dict[str, str]) -> List[Dict[str, str]]:
+        records = self.qsos
+        start = params.get("qso_startdate", "").replace("-", "")
+        end = params.get("qso_enddate", "").replace("-", "")
+        if start or end:
+            records = [q for q in records if (not start or q.get("QSO_DATE", "") >= start)
+                       and (not end or q.get("QSO_DATE", "") <= end)]
+        if params.get("qso_qsl", "yes").lower() == "yes":
+            records = [q for q in records if q.get("QSL_RCVD") == "Y"]
+            since = params.get("qso_qslsince", "")
+            if since:
+                # Como o LoTW: QSLs recebidas a partir de since (data ou data/hora)
+                records = [q for q in records
+                           if q.get("APP_LOTW_RXQSL", "") >= since
+                           or (not q.get("APP_LOTW_RXQSL") and q.get("QSLRDATE", "") >= since.replace("-", "")[:8])]
+        else:
+            # qso_qsl=no: todos os QSOs enviados ao LoTW a partir de qso_qsorxsince
+            since = params.get("qso_qsorxsince", "")
+            if since:
+                records = [q for q in records if q.get("APP_LOTW_RXQSO", "") >= since]
+        # Sem qso_qsldetail / qso_mydetail o LoTW omite os campos de detalhe
+        drop = set()
+        if params.get("qso_qsldetail", "no").lower() != "yes":
+            drop |= QSL_DETAIL_FIELDS
+        if params.get("qso_mydetail", "no").lower() != "yes":
+            drop |= MY_DETAIL_FIELDS
+        if drop:
+            records = [{k: v for k, v in q.items() if k not in drop} for q in records]
+        return records
+
+    # --- HTTP ---
+
+    def _handler_class(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status: int, obj):
+                self._send(status, json.dumps(obj).encode())
+
+            def _body(self) -> bytes:
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _send_chunked(self, body: bytes, content_type: str):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i in range(0, len(body), services.chunk_size):
+                    chunk = body[i:i + services.chunk_size]
+                    self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                    if services.chunk_delay:
+                        time.sleep(services.chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                if url.path == "/lotwuser/lotwreport.adi":
+                    return self._lotw(params)
+                if url.path == "/_admin/sent":
+                    with services._cond:
+                        return self._json(200, services.sent)
+                if url.path.endswith("/getUpdates"):
+                    updates = services._get_updates(int(params.get("offset", 0)),
+                                                    float(params.get("timeout", 0)))
+                    return self._json(200, {"ok": True, "result": updates})
+                self._json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                raw = self._body()
+                if url.path == "/_admin/updates":
+                    update_id = services.inject_update(json.loads(raw or b"{}").get("text", ""))
+                    return self._json(200, {"ok": True, "update_id": update_id})
+
+                method = url.path.rsplit("/", 1)[-1]
+                if method not in ("sendMessage", "sendPhoto", "setMyCommands", "getUpdates"):
+                    return self._json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                if method == "getUpdates":
+                    return self._json(200, {"ok": True, "result": []})
+
+                chat_id, text = "", ""
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    payload = json.loads(raw or b"{}")
+                    chat_id, text = str(payload.get("chat_id", "")), payload.get("text", "")
+                if not services._record_send(method, chat_id, text):
+                    return self._json(429, {
+                        "ok": False, "error_code": 429,
+                        "description": f"Too Many Requests: retry after {services.retry_after}",
+                        "parameters": {"retry_after": services.retry_after},
+                    })
+                self._json(200, {"ok": True, "result": True})
+
+            def _lotw(self, params: Dict[str, str]):
+                if services.lotw_latency:
+                    time.sleep(services.lotw_latency)
+                if params.get("login") != services.username or params.get("password") != services.password:
+                    return self._send(200, LOTW_ERROR_PAGE.encode(), "text/html")
+
+                records = services._lotw_slice(params)
+                if params.get("qso_qsl", "yes").lower() == "yes":
+                    last_qsl = max((q.get("APP_LOTW_RXQSL", "") for q in records), default="")
+                    body = to_adif(records, last_qsl=last_qsl or None).encode()
+                else:
+                    last_rx = max((q.get("APP_LOTW_RXQSO", "") for q in records), default="")
+                    body = to_adif(records, last_qsorx=last_rx or None).encode()
+                with services._cond:
+                    services.lotw_requests.append(
+                        {"params": params, "records": len(records), "bytes": len(body), "ts": time.time()}
+                    )
+                if services.chunk_size:
+                    return self._send_chunked(body, "application/x-arrl-adif")
+                self._send(200, body, "application/x-arrl-adif")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LoTW + Telegram falsos para testes locais")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--qsos", type=int, default=5000, help="Tamanho do log sintético servido")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso (s) antes de responder o LoTW")
+    parser.add_argument("--chunk-size", type=int, default=0, help="Envia o ADIF em chunks deste tamanho")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Atraso (s) entre chunks")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Responde 429 a cada N envios")
+    args = parser.parse_args()
+
+    services = FakeServices(
+        qsos=generate_qsos(args.qsos), lotw_latency=args.latency, chunk_size=args.chunk_size,
+        chunk_delay=args.chunk_delay, rate_limit_every=args.rate_limit_every, port=args.port,
+    ).start()
+    print(f"LOTW_URL={services.lotw_url}")
+    print(f"TELEGRAM_API_URL={services.base_url}")
+    print("Credenciais: LOTW_USERNAME=BENCH LOTW_PASSWORD=BENCH TELEGRAM_CHAT_ID=1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Driver de carga ponta a ponta contra benchmarks/fake_services.py.
+
+Sobe os serviços falsos, aponta o MonitorBot para eles (LOTW_URL / TELEGRAM_API_URL),
+roda o polling real do bot numa thread e:
+  1. injeta milhares de comandos e mede a latência mensagem -> resposta;
+  2. dispara N sincronizações (full + incrementais) e mede a duração de cada uma.
+
+Reporta percentis (p50/p90/p99/máx) e grava JSON em benchmarks/results/.
+
+Uso:
+    python -m benchmarks.load_driver --updates 2000 --syncs 20 --qsos 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fake_services import FakeServices  # noqa: E402
+from benchmarks.synthetic import generate_qsos  # noqa: E402
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    s = sorted(samples)
+
+    def pick(p):
+        return round(s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] * 1000, 2)
+
+    return {"count": len(s), "p50_ms": pick(50), "p90_ms": pick(90), "p99_ms": pick(99),
+            "max_ms": round(s[-1] * 1000, 2)}
+
+
+def _prepare_env(services: FakeServices, tmp: str):
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": "123456:LOAD",
+        "TELEGRAM_CHAT_ID": services.chat_id,
+        "LOTW_USERNAME": services.username,
+        "LOTW_PASSWORD": services.password,
+        "LOTW_URL": services.lotw_url,
+        "TELEGRAM_API_URL": services.base_url,
+        "STATE_FILE": str(Path(tmp) / "data" / "state.json"),
+    })
+    # Mapa base sintético: evita o download do NASA 8K nos alertas de grids novos
+    try:
+        from PIL import Image
+        data_dir = Path(tmp) / "data"
+        data_dir.mkdir(parents=True, exist_ok=True)
+        Image.new("RGB", (8192, 4096), (20, 60, 120)).save(data_dir / "world_map_v2.tif")
+    except ImportError:
+        pass
+
+
+def wait_for_reply(services: FakeServices, token: str, start_index: int, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with services._cond:
+            for msg in services.sent[start_index:]:
+                if token in msg["text"]:
+                    return msg["ts"]
+            services._cond.wait(0.05)
+    return None
+
+
+def drive_updates(services: FakeServices, count: int, rate: float, timeout: float, mix=("/grids", "/stats")):
+    """Injeta `count` comandos (/check e, a cada 5, um do `mix`) e mede a latência dos /check."""
+    pending = {}
+    interval = 1.0 / rate if rate else 0.0
+    for i in range(count):
+        if i % 5 == 4:
+            services.inject_update(mix[i % len(mix)])
+        else:
+            token = f"LOAD{i:06d}"
+            with services._cond:
+                start_index = len(services.sent)
+            pending[token] = (time.time(), start_index)
+            services.inject_update(f"/check {token}")
+        if interval:
+            time.sleep(interval)
+
+    latencies, lost = [], 0
+    for token, (sent_at, start_index) in pending.items():
+        replied = wait_for_reply(services, token, start_index, timeout)
+        if replied is None:
+            lost += 1
+        else:
+            latencies.append(replied - sent_at)
+    return latencies, lost
+
+
+def drive_syncs(bot, services: FakeServices, count: int):
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        bot.run_check_job(force_full=(i == 0))
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga local do LoTW Monitor")
+    parser.add_argument("--qsos", type=int, default=20000, help="Tamanho do log servido pelo LoTW falso")
+    parser.add_argument("--updates", type=int, default=1000, help="Comandos injetados no Telegram falso")
+    parser.add_argument("--rate", type=float, default=0.0, help="Comandos por segundo (0 = rajada)")
+    parser.add_argument("--syncs", type=int, default=10, help="Sincronizações (a primeira é full)")
+    parser.add_argument("--lotw-latency", type=float, default=0.0)
+    parser.add_argument("--chunk-size", type=int, default=0)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="429 a cada N envios")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Espera máxima por resposta (s)")
+    parser.add_argument("--mix", default="/grids,/stats",
+                        help="Comandos intercalados com os /check (ex.: /map,/stats para carga pesada)")
+    args = parser.parse_args()
+
+    services = FakeServices(
+        qsos=generate_qsos(args.qsos), lotw_latency=args.lotw_latency,
+        chunk_size=args.chunk_size, rate_limit_every=args.rate_limit_every,
+    ).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _prepare_env(services, tmp)
+        from src.bot import MonitorBot
+        bot = MonitorBot()
+        try:
+            bot.map_gen._resources_ready = True  # Não tenta baixar a fonte
+        except ImportError:
+            pass
+
+        sync_durations = drive_syncs(bot, services, args.syncs)
+
+        poller = threading.Thread(target=bot.start_polling, daemon=True)
+        poller.start()
+        t0 = time.perf_counter()
+        latencies, lost = drive_updates(services, args.updates, args.rate, args.timeout,
+                                       [c.strip() for c in args.mix.split(",") if c.strip()])
+        elapsed = time.perf_counter() - t0
+
+    services.stop()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "params": vars(args),
+        "updates": {**percentiles(latencies), "lost": lost,
+                    "throughput_per_s": round(args.updates / elapsed, 1) if elapsed else None},
+        "syncs": percentiles(sync_durations),
+        "lotw_requests": [
+            {"since": r["params"].get("qso_qslsince"), "records": r["records"], "bytes": r["bytes"]}
+            for r in services.lotw_requests
+        ],
+    }
+    print(json.dumps({k: report[k] for k in ("updates", "syncs")}, indent=2))
+
+    out = ROOT / "benchmarks" / "results" / f"load-{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados gravados em {out}")
+
+
+if __name__ == "__main__":
+    main()
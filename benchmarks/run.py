@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Suíte de benchmarks com dados sintéticos.
+
+Cada benchmark roda em um processo filho (fork) para isolar o pico de RSS e mede:
+  - wall time (mediana de N repetições, sem tracemalloc);
+  - pico de RSS do processo acima da linha de base após o setup;
+  - alocações (pico e blocos ainda vivos ao final, via tracemalloc, numa execução extra).
+
+Uso:
+    python -m benchmarks.run                       # tamanhos padrão 1k,10k,100k
+    python -m benchmarks.run --sizes 1000,500000 --only parse,merge
+    python -m benchmarks.run --compare benchmarks/results/bench-abc123-....json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+# Credenciais falsas: nada aqui acessa a rede
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:BENCH")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+os.environ.setdefault("LOTW_USERNAME", "BENCH")
+os.environ.setdefault("LOTW_PASSWORD", "BENCH")
+
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synthetic import generate_qsos, to_adif  # noqa: E402
+
+
+def _rss_kb() -> int:
+    """RSS atual (Linux: /proc), com fallback para o pico do getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except Exception:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# --- Benchmarks: setup(size, tmp) -> ctx ; run(ctx) ---
+
+def _storage(tmp: str, name: str = "state.json", state_format: str = "json"):
+    from src.storage import Storage
+    return Storage(Path(tmp) / name, state_format)
+
+
+def setup_parse(size, tmp):
+    from src.lotw_client import LoTWClient
+    return LoTWClient("BENCH", "BENCH"), to_adif(generate_qsos(size))
+
+
+def run_parse(ctx):
+    client, text = ctx
+    client.parse_adif(text)
+
+
+def setup_merge(size, tmp):
+    return tmp, generate_qsos(size)
+
+
+def run_merge(ctx):
+    tmp, qsos = ctx
+    _storage(tmp, "merge.json").merge_qsos(qsos)
+
+
+def setup_sync(size, tmp):
+    return tmp, to_adif(generate_qsos(size))
+
+
+def run_sync(ctx):
+    # Caminho antigo: resposta inteira -> lista de dicts -> merge
+    from src.lotw_client import LoTWClient
+    tmp, text = ctx
+    _storage(tmp, "sync.json").merge_qsos(LoTWClient("BENCH", "BENCH").parse_adif(text))
+
+
+def run_sync_stream(ctx):
+    # Pipeline em streaming, alimentado em pedaços de 64 KB como o iter_content do requests
+    from src.lotw_client import AdifStreamParser
+    from src.pipeline import SyncPipeline
+    tmp, text = ctx
+
+    def records():
+        parser = AdifStreamParser()
+        for i in range(0, len(text), 64 * 1024):
+            yield from parser.feed(text[i:i + 64 * 1024])
+        yield from parser.close()
+
+    SyncPipeline(_storage(tmp, "sync.json")).run(records())
+
+
+def setup_filled(size, tmp):
+    storage = _storage(tmp)
+    storage.merge_qsos(generate_qsos(size))
+    return storage
+
+
+def run_save(storage):
+    storage.save()
+
+
+def setup_load(size, tmp):
+    storage = setup_filled(size, tmp)
+    storage.save()
+    return storage
+
+
+def run_load(storage):
+    storage._load()
+
+
+def setup_filled_binary(size, tmp):
+    storage = _storage(tmp, state_format="binary")
+    storage.merge_qsos(generate_qsos(size))
+    return storage
+
+
+def setup_load_binary(size, tmp):
+    storage = setup_filled_binary(size, tmp)
+    storage.save()
+    return storage
+
+
+def run_scan(storage):
+    # Carga + uma varredura completa (paga a decodificação preguiçosa do formato binário)
+    from src.storage import Storage
+    Storage(storage.filepath, storage.state_format).get_worked_grids()
+
+
+# As visões do Storage são memorizadas no snapshot: mark_changed() + publish() força o recálculo medido aqui
+
+def run_dashboard(storage):
+    storage.mark_changed()
+    storage.publish()
+    storage.get_dashboard_stats()
+
+
+def run_labels(storage):
+    storage.mark_changed()
+    storage.publish()
+    storage.get_grid_labels()
+
+
+def setup_map(size, tmp):
+    from PIL import Image
+    from src.map_plot import MapGenerator
+    storage = setup_filled(size, tmp)
+    gen = MapGenerator(Path(tmp))
+    # Mapa base sintético (mesmas dimensões do NASA 8K) para não depender de download
+    Image.new("RGB", (8192, 4096), (20, 60, 120)).save(gen.map_path)
+    gen._resources_ready = True
+    return gen, storage.get_confirmed_grids(), storage.get_grid_labels()
+
+
+def run_map(ctx):
+    gen, confirmed, labels = ctx
+    gen.generate(confirmed, set(), labels)
+
+
+def setup_wab(size, tmp):
+    storage = _storage(tmp)
+    return sorted({g for q in generate_qsos(size) for g in storage._extract_grids(q)})
+
+
+def run_wab(grids):
+    from src.wab_data import get_state_from_grid
+    for g in grids:
+        get_state_from_grid(g)
+
+
+BENCHMARKS = {
+    "parse": (setup_parse, run_parse),
+    "merge": (setup_merge, run_merge),
+    "sync": (setup_sync, run_sync),
+    "sync_stream": (setup_sync, run_sync_stream),
+    "save": (setup_filled, run_save),
+    "load": (setup_load, run_load),
+    "scan": (setup_load, run_scan),
+    "save_binary": (setup_filled_binary, run_save),
+    "load_binary": (setup_load_binary, run_load),
+    "scan_binary": (setup_load_binary, run_scan),
+    "dashboard": (setup_filled, run_dashboard),
+    "grid_labels": (setup_filled, run_labels),
+    "map": (setup_map, run_map),
+    "wab_grid": (setup_wab, run_wab),
+}
+
+
+def _child(name: str, size: int, repeat: int, conn):
+    try:
+        setup, run = BENCHMARKS[name]
+        with tempfile.TemporaryDirectory() as tmp:
+            ctx = setup(size, tmp)
+            base_rss = _rss_kb()
+
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run(ctx)
+                samples.append(time.perf_counter() - start)
+            peak_rss = _peak_rss_kb()
+
+            tracemalloc.start()
+            run(ctx)
+            snapshot = tracemalloc.take_snapshot()
+            _current, alloc_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+
+        conn.send({
+            "wall_s": round(statistics.median(samples), 6),
+            "wall_min_s": round(min(samples), 6),
+            "peak_rss_delta_kb": max(0, peak_rss - base_rss),
+            "alloc_peak_kb": alloc_peak // 1024,
+            "alloc_live_blocks": blocks,
+        })
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_one(name: str, size: int, repeat: int) -> dict:
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(name, size, repeat, child))
+    proc.start()
+    child.close()
+    result = parent.recv() if parent.poll(3600) else {"error": "timeout"}
+    proc.join()
+    return result
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: dict, previous_path: Path):
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))
+    prev = {(r["bench"], r["size"]): r for r in previous["results"]}
+    print(f"\nComparação com {previous.get('git_rev')} ({previous_path.name}):")
+    for r in current["results"]:
+        old = prev.get((r["bench"], r["size"]))
+        if not old or "wall_s" not in r or "wall_s" not in old:
+            continue
+        ratio = r["wall_s"] / old["wall_s"] if old["wall_s"] else float("inf")
+        print(f"  {r['bench']:<12} {r['size']:>8}  {old['wall_s']:9.4f}s -> {r['wall_s']:9.4f}s  ({ratio:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks sintéticos do LoTW Monitor")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Tamanhos de log (QSOs), separados por vírgula")
+    parser.add_argument("--only", default="", help=f"Subconjunto: {','.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetições cronometradas por medida")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/bench-<rev>-<ts>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    names = [n for n in args.only.split(",") if n] or list(BENCHMARKS)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "results": [],
+    }
+    for size in sizes:
+        for name in names:
+            result = run_one(name, size, args.repeat)
+            result.update({"bench": name, "size": size})
+            report["results"].append(result)
+            if "error" in result:
+                print(f"{name:<12} {size:>8}  ERRO: {result['error']}")
+            else:
+                print(f"{name:<12} {size:>8}  {result['wall_s']:9.4f}s  "
+                      f"RSS +{result['peak_rss_delta_kb'] / 1024:7.1f}MB  "
+                      f"alloc pico {result['alloc_peak_kb'] / 1024:7.1f}MB")
+
+    out = Path(args.output) if args.output else \
+        RESULTS_DIR / f"bench-{report['git_rev']}-{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados gravados em {out}")
+
+    if args.compare:
+        compare(report, Path(args.compare))
+
+
+if __name__ == "__main__":
+    main()
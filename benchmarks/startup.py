@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark de startup (estilo `python -X importtime`).
+
+Mede, em processos novos:
+  - o tempo de import de `src.bot` (com o detalhamento do -X importtime);
+  - o tempo até um `MonitorBot()` pronto (config + storage), usando credenciais falsas
+    e um diretório de dados temporário, ou seja, o custo fixo de um `--mode check`.
+
+Cada execução acrescenta uma linha em benchmarks/results/startup.jsonl para
+acompanhar a evolução entre commits.
+
+Uso:
+    python -m benchmarks.startup [--runs 7] [--top 15]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_FILE = ROOT / "benchmarks" / "results" / "startup.jsonl"
+
+FAKE_ENV = {
+    "TELEGRAM_BOT_TOKEN": "123456:BENCH",
+    "TELEGRAM_CHAT_ID": "1",
+    "LOTW_USERNAME": "BENCH",
+    "LOTW_PASSWORD": "BENCH",
+}
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _env(tmp_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update(FAKE_ENV)
+    env["STATE_FILE"] = str(Path(tmp_dir) / "data" / "state.json")
+    env["PYTHONPATH"] = str(ROOT)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def _wall(code: str, env: dict, cwd: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], env=env, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def _importtime(env: dict, cwd: str) -> list:
+    """Retorna [(modulo, cumulativo_us)] apenas dos imports de primeiro nível."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.bot"],
+                          env=env, cwd=cwd, check=True, capture_output=True, text=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        cumulative, indent, module = int(m.group(2)), len(m.group(3)), m.group(4)
+        # Indentação 1 = src / src.bot; 3 = o que src.bot importa diretamente
+        if indent <= 3:
+            entries.append((module, cumulative))
+    return entries
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de startup do LoTW Monitor")
+    parser.add_argument("--runs", type=int, default=7, help="Repetições por medida (mediana)")
+    parser.add_argument("--top", type=int, default=15, help="Quantos imports mais caros listar")
+    parser.add_argument("--no-save", action="store_true", help="Não grava em results/startup.jsonl")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        measures = {
+            "python_baseline_ms": "pass",
+            "import_bot_ms": "import src.bot",
+            "bot_ready_ms": "from src.bot import MonitorBot; MonitorBot()",
+        }
+        result = {}
+        for name, code in measures.items():
+            samples = [_wall(code, env, tmp) for _ in range(args.runs)]
+            result[name] = round(statistics.median(samples), 2)
+
+        top_imports = sorted(_importtime(env, tmp), key=lambda x: x[1], reverse=True)[:args.top]
+
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": _git_rev(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        **result,
+        "top_imports_us": top_imports,
+    }
+
+    print(f"Python vazio:        {result['python_baseline_ms']:8.1f} ms")
+    print(f"import src.bot:      {result['import_bot_ms']:8.1f} ms")
+    print(f"MonitorBot() pronto: {result['bot_ready_ms']:8.1f} ms")
+    print("\nImports mais caros (cumulativo):")
+    for module, us in top_imports:
+        print(f"  {us / 1000:8.1f} ms  {module}")
+
+    if not args.no_save:
+        RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"\nResultado gravado em {RESULTS_FILE.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Gerador determinístico (seed) de logs ADIF sintéticos de satélite, no formato
+retornado pelo lotwreport.adi: SAT_NAME, PROP_MODE=SAT, GRIDSQUARE ou VUCC_GRIDS,
+mistura de confirmados/não confirmados, DXCC/CQ/ITU e MY_GRIDSQUARE.
+"""
+import random
+from typing import Dict, List, Optional
+
+SATELLITES = ["SO-50", "AO-91", "AO-92", "RS-44", "ISS", "IO-117", "PO-101", "AO-7", "FO-29", "QO-100"]
+BANDS = ["2M", "70CM", "23CM", "13CM"]
+MODES = ["FM", "SSB", "CW", "FT4"]
+
+# (COUNTRY, DXCC, CQZ, ITUZ, prefixos, fields Maidenhead típicos)
+COUNTRIES = [
+    ("BRAZIL", "108", "11", "15", ["PY", "PU", "PP", "PT", "PR", "PS"], ["GG", "GH", "GI", "HI", "HH", "FH"]),
+    ("ARGENTINA", "100", "13", "14", ["LU", "LW", "LO"], ["FF", "FE", "GF", "GE", "FD"]),
+    ("CHILE", "112", "12", "14", ["CE", "CA", "XQ"], ["FF", "FE", "FG", "FD"]),
+    ("UNITED STATES OF AMERICA", "291", "5", "8", ["W", "K", "N", "AA"], ["FN", "EM", "DM", "CM", "EN", "FM"]),
+    ("MEXICO", "50", "6", "10", ["XE", "XF"], ["EK", "DL", "EL", "DK"]),
+    ("SPAIN", "281", "14", "37", ["EA", "EB"], ["IN", "IM", "JN"]),
+    ("PORTUGAL", "272", "14", "37", ["CT", "CS"], ["IN", "IM"]),
+    ("URUGUAY", "144", "13", "14", ["CX"], ["GF"]),
+]
+
+
+def _grid(rng: random.Random, fields: List[str]) -> str:
+    return f"{rng.choice(fields)}{rng.randint(0, 9)}{rng.randint(0, 9)}{chr(97 + rng.randint(0, 23))}{chr(97 + rng.randint(0, 23))}"
+
+
+def generate_qsos(n: int, seed: int = 42, confirmed_ratio: float = 0.6,
+                  vucc_ratio: float = 0.05, my_grid: str = "GG66mk") -> List[Dict[str, str]]:
+    """Lista de n QSOs (dicts de tags ADIF) reprodutível pela seed."""
+    rng = random.Random(seed)
+    # Universo de indicativos proporcional ao log (estações repetidas, como num log real)
+    n_calls = max(50, n // 8)
+    stations = []
+    for _ in range(n_calls):
+        country = rng.choice(COUNTRIES)
+        call = f"{rng.choice(country[4])}{rng.randint(0, 9)}{''.join(chr(65 + rng.randint(0, 25)) for _ in range(rng.randint(1, 3)))}"
+        stations.append((call, country, _grid(rng, country[5])))
+
+    qsos = []
+    for i in range(n):
+        call, country, home = rng.choice(stations)
+        # 20% das vezes a estação está portátil em outro grid
+        grid = home if rng.random() > 0.2 else _grid(rng, country[5])
+        year = rng.randint(2015, 2025)
+        qso = {
+            "CALL": call,
+            "BAND": rng.choice(BANDS),
+            "MODE": rng.choice(MODES),
+            "QSO_DATE": f"{year}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+            "TIME_ON": f"{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}{rng.randint(0, 59):02d}",
+            "PROP_MODE": "SAT",
+            "SAT_NAME": rng.choice(SATELLITES),
+            "APP_LOTW_OWNCALL": "PU7SDE",
+            "STATION_CALLSIGN": "PU7SDE",
+            "MY_GRIDSQUARE": my_grid,
+            "APP_LOTW_QSO_TIMESTAMP": f"{year}-01-01T00:00:00Z",
+        }
+        # Envio ao LoTW logo após o QSO (derivado dos campos: não consome a rng)
+        d, t = qso["QSO_DATE"], qso["TIME_ON"]
+        qso["APP_LOTW_RXQSO"] = f"{d[:4]}-{d[4:6]}-{d[6:]} {t[:2]}:{t[2:4]}:{t[4:]}"
+        if rng.random() < vucc_ratio:
+            neighbor = grid[:3] + str((int(grid[3]) + 1) % 10)
+            qso["VUCC_GRIDS"] = f"{grid[:4]},{neighbor}"
+        else:
+            qso["GRIDSQUARE"] = grid
+        if rng.random() < confirmed_ratio:
+            qslr = f"{min(year + 1, 2025)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+            # Hora derivada do índice (não consome a rng: os dados continuam os mesmos por seed)
+            rx_time = f"{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"
+            qso.update({
+                "QSL_RCVD": "Y",
+                "QSLRDATE": qslr,
+                "APP_LOTW_RXQSL": f"{qslr[:4]}-{qslr[4:6]}-{qslr[6:]} {rx_time}",
+                "COUNTRY": country[0],
+                "DXCC": country[1],
+                "CQZ": country[2],
+                "ITUZ": country[3],
+            })
+        else:
+            qso["QSL_RCVD"] = "N"
+        qsos.append(qso)
+    return qsos
+
+
+def to_adif(qsos: List[Dict[str, str]], last_qsl: Optional[str] = None,
+            last_qsorx: Optional[str] = None) -> str:
+    """Serializa no formato do LoTW (cabeçalho + <eoh> + registros terminados em <eor>)."""
+    header = [
+        "ARRL Logbook of the World Status Report",
+        "Generated for PU7SDE (synthetic)",
+        "<PROGRAMID:4>LoTW",
+        "<APP_LOTW_NUMREC:{0}>{1}".format(len(str(len(qsos))), len(qsos)),
+    ]
+    if last_qsl:
+        header.append(f"<APP_LOTW_LASTQSL:{len(last_qsl)}>{last_qsl}")
+    if last_qsorx:
+        header.append(f"<APP_LOTW_LASTQSORX:{len(last_qsorx)}>{last_qsorx}")
+    parts = ["\n".join(header), "\n<eoh>\n"]
+    for qso in qsos:
+        for tag, value in qso.items():
+            parts.append(f"<{tag}:{len(value)}>{value}\n")
+        parts.append("<eor>\n\n")
+    return "".join(parts)
@@ -2,7 +2,6 @@
 import sys
 import argparse
 import logging
-from src.bot import MonitorBot
 
 # Configuração básica de logs
 logging.basicConfig(
@@ -24,16 +23,39 @@ def main():
     args = parser.parse_args()
 
     try:
-        # Instancia o bot (que carrega config e storage)
-        bot = MonitorBot()
-        
         if args.mode == "check":
             logger.info("Executando ciclo único de verificação...")
-            # Roda síncrono
-            bot.run_check_job(manual=False)
+            # Caminho rápido: só o resumo do estado + fatia incremental do LoTW
+            from src.config import Config
+            from src.lotw_client import QSL, WORKED
+            from src.quickcheck import QuickCheck
+            quick = QuickCheck(Config.STATE_FILE, [QSL, WORKED] if Config.SYNC_WORKED else [QSL])
+            if quick.run(Config.STATE_FORMAT):
+                # Nada novo no LoTW, mas o TLE é conferido do mesmo jeito (GET condicional: 304 se inalterado)
+                from src.tle import TLEMonitor
+                tle_diff = TLEMonitor(Config.STATE_FILE.parent).check_update()
+                if tle_diff:
+                    from src.bot import MonitorBot
+                    MonitorBot().send_tle_alert(tle_diff)
+                logger.info("Ciclo concluído (nada novo no LoTW).")
+                return
+            logger.info(f"Sync completo necessário: {quick.reason}.")
+
+            # Import tardio: `--help`, erros de argumento e o caminho rápido não pagam o custo do bot
+            from src.bot import MonitorBot
+            bot = MonitorBot()
+            if quick.streams:
+                # Reaproveita as fatias já baixadas (e os cabeçalhos com a marca d'água)
+                bot.client = quick.client
+            bot.run_check_job(prefetched=quick.streams or None)
             logger.info("Ciclo concluído.")
             
         elif args.mode == "bot":
+            # Import tardio: `--help` e erros de argumento não pagam o custo dos módulos do bot
+            from src.bot import MonitorBot
+
+            # Instancia o bot (que carrega config e storage)
+            bot = MonitorBot()
             logger.info("Iniciando modo Bot Interativo...")
             bot.start_polling()
             
@@ -0,0 +1,224 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .maidenhead import grid_to_index, haversine_km, index_center
+from .wab_data import get_all_states, get_state_from_call, get_state_from_grid
+
+logger = logging.getLogger(__name__)
+
+AWARD_STATE_VERSION = 1
+VUCC_TARGET = 100  # VUCC Satélite: 100 grids confirmados
+
+# Nomes das tabelas de diplomas. As por banda/satélite usam sufixo ":<BANDA>" / ":<SAT>".
+VUCC = "VUCC"
+VUCC_BAND = "VUCC_BAND"
+VUCC_SAT = "VUCC_SAT"
+DXCC = "DXCC"
+CQ = "CQ"
+ITU = "ITU"
+WAB = "WAB"
+SATS = "SAT"
+
+
+def is_satellite_qso(qso: Dict[str, str]) -> bool:
+    return qso.get("PROP_MODE", "").upper() == "SAT" or bool(qso.get("SAT_NAME"))
+
+
+def received_at(qso: Dict[str, str]) -> str:
+    """
+    Quando a confirmação chegou, como AAAAMMDDHHMMSS (ou só AAAAMMDD): APP_LOTW_RXQSL, senão
+    QSLRDATE; sem nenhum dos dois, a data/hora do próprio QSO.
+    """
+    received = "".join(c for c in qso.get("APP_LOTW_RXQSL", "") or "" if c.isdigit())
+    return received or qso.get("QSLRDATE", "") or qso.get("QSO_DATE", "") + qso.get("TIME_ON", "")
+
+
+def wab_state_for(qso: Dict[str, str], grids: Iterable[str]) -> Optional[str]:
+    """
+    UF brasileira do QSO (diploma WAB).
+    1. Indicativo (mais robusto para sufixos e grids costeiros)
+    2. Grid (ponto no polígono, via shapely)
+    3. Campo STATE do ADIF
+    """
+    if qso.get("COUNTRY", "").upper() != "BRAZIL":
+        return None
+    state = get_state_from_call(qso.get("CALL", ""))
+    if not state:
+        grids_list = sorted(grids)
+        state = get_state_from_grid(grids_list[0]) if grids_list else None
+    if not state:
+        st = qso.get("STATE", "").upper().strip()
+        if len(st) == 2:
+            state = st
+    return state
+
+
+class AwardEngine:
+    """
+    Estado incremental dos diplomas (VUCC geral/por banda/por satélite, DXCC, zonas CQ/ITU, WAB).
+
+    O estado vive dentro do state.json (chave "awards") e é atualizado QSO a QSO pelo
+    Storage.merge_qsos, apenas quando um QSO passa a ser confirmado. Cada entidade guarda
+    a primeira confirmação, pela data de recebimento da QSL (call/data/hora/chave do QSO e
+    "received", ver received_at), e a contagem de QSOs confirmados.
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        if state.get("version") != AWARD_STATE_VERSION:
+            self.reset()
+
+    def reset(self):
+        self.state.clear()
+        self.state.update({
+            "version": AWARD_STATE_VERSION,
+            "built": False,  # True após o primeiro rebuild (persistido: ver Storage.__init__)
+            "total_confirmed": 0,
+            "max_distance": 0,
+            "awards": {},   # tabela -> {entidade: {call, date, time, received, key, count}}
+            "hunters": {},  # call -> [grids]
+        })
+
+    @property
+    def is_built(self) -> bool:
+        """False em estado antigo ou de outra versão: precisa de um rebuild a partir do log."""
+        return bool(self.state.get("built"))
+
+    def copy_state(self) -> Dict[str, Any]:
+        """
+        Cópia do estado para um novo escritor (copy-on-write do Storage). Só os dicts são
+        copiados; as entradas e listas de hunters são compartilhadas, pois nunca mudam no lugar.
+        """
+        state = dict(self.state)
+        state["awards"] = {name: dict(t) for name, t in self.state["awards"].items()}
+        state["hunters"] = dict(self.state["hunters"])
+        return state
+
+    def rebuild(self, qsos: Iterable[Tuple[str, Dict[str, str]]], extract_grids):
+        """Recalcula tudo a partir de (chave, qso). Usado na migração ou após remoções."""
+        self.reset()
+        for key, qso in qsos:
+            if qso.get("QSL_RCVD", "").upper() == "Y":
+                self.add(key, qso, extract_grids(qso))
+        self.state["built"] = True
+        logger.info(f"Diplomas recalculados: {self.state['total_confirmed']} QSOs confirmados.")
+
+    # --- Atualização incremental ---
+
+    def _credit(self, table: str, entity: str, key: str, qso: Dict[str, str]):
+        if not entity:
+            return
+        entries = self.state["awards"].setdefault(table, {})
+        date, time_on = qso.get("QSO_DATE", ""), qso.get("TIME_ON", "")
+        received = received_at(qso)
+        current = entries.get(entity)
+        if current is None:
+            entries[entity] = {
+                "call": qso.get("CALL", "?"), "date": date, "time": time_on, "received": received,
+                "key": key, "count": 1,
+            }
+            return
+        # Entradas são substituídas, nunca alteradas no lugar: cópias do estado (copy_state) as compartilham.
+        # Mantém a confirmação recebida primeiro (empate: o QSO mais antigo) como "primeira"
+        if (received, date, time_on) < (current["received"], current["date"], current["time"]):
+            entries[entity] = {
+                "call": qso.get("CALL", "?"), "date": date, "time": time_on, "received": received,
+                "key": key, "count": current["count"] + 1,
+            }
+        else:
+            entries[entity] = dict(current, count=current["count"] + 1)
+
+    def add(self, key: str, qso: Dict[str, str], grids: Set[str]):
+        """Credita um QSO recém-confirmado em todas as tabelas aplicáveis."""
+        if not is_satellite_qso(qso):
+            return
+
+        self.state["total_confirmed"] += 1
+        band = qso.get("BAND", "").upper()
+        sat = qso.get("SAT_NAME", "").upper()
+
+        for g in grids:
+            self._credit(VUCC, g, key, qso)
+            if band:
+                self._credit(f"{VUCC_BAND}:{band}", g, key, qso)
+            if sat:
+                self._credit(f"{VUCC_SAT}:{sat}", g, key, qso)
+
+        self._credit(SATS, sat, key, qso)
+        self._credit(DXCC, qso.get("COUNTRY", "").upper(), key, qso)
+        self._credit(CQ, qso.get("CQZ", ""), key, qso)
+        self._credit(ITU, qso.get("ITUZ", ""), key, qso)
+
+        try:
+            self._credit(WAB, wab_state_for(qso, grids), key, qso)
+        except Exception as e:
+            logger.error(f"Erro ao resolver estado WAB de {qso.get('CALL')}: {e}")
+
+        call = qso.get("CALL", "?").upper()
+        hunter = set(self.state["hunters"].get(call, []))
+        if not grids <= hunter:
+            self.state["hunters"][call] = sorted(hunter | grids)
+
+        self._update_distance(qso, grids)
+
+    def _update_distance(self, qso: Dict[str, str], grids: Set[str]):
+        my_grid = qso.get("MY_GRIDSQUARE") or \
+                  (qso.get("MY_VUCC_GRIDS", "").split(",")[0] if qso.get("MY_VUCC_GRIDS") else None)
+        my_idx = grid_to_index(my_grid) if my_grid else None
+        if my_idx is None:
+            return
+        my_lat, my_lon = index_center(my_idx)
+        for g in grids:
+            idx = grid_to_index(g)
+            if idx is None:
+                continue
+            d = int(haversine_km(my_lat, my_lon, *index_center(idx)))
+            if d > self.state["max_distance"]:
+                self.state["max_distance"] = d
+
+    # --- Leitura ---
+
+    def table(self, name: str) -> Dict[str, Dict]:
+        return self.state["awards"].get(name, {})
+
+    def tables_with_prefix(self, prefix: str) -> Dict[str, Dict[str, Dict]]:
+        """{"2M": {...}, "70CM": {...}} para prefix="VUCC_BAND"."""
+        p = prefix + ":"
+        return {name[len(p):]: t for name, t in self.state["awards"].items() if name.startswith(p)}
+
+    def progress(self) -> Dict[str, Any]:
+        """Resumo já calculado, no formato consumido por Storage.get_dashboard_stats."""
+        wab = self.table(WAB)
+        return {
+            "total_confirmed": self.state["total_confirmed"],
+            "max_distance": self.state["max_distance"],
+            "total_grids": len(self.table(VUCC)),
+            "vucc_target": VUCC_TARGET,
+            "vucc_bands": {b: len(t) for b, t in self.tables_with_prefix(VUCC_BAND).items()},
+            "vucc_sats": {s: len(t) for s, t in self.tables_with_prefix(VUCC_SAT).items()},
+            "total_sats": len(self.table(SATS)),
+            "sats_breakdown": {s: e["count"] for s, e in self.table(SATS).items()},
+            "dxcc_count": len(self.table(DXCC)),
+            "dxcc_breakdown": {c: e["count"] for c, e in self.table(DXCC).items()},
+            "cq_count": len(self.table(CQ)),
+            "itu_count": len(self.table(ITU)),
+            "wab_count": len(wab),
+            "wab_missing": sorted(set(get_all_states()) - set(wab)),
+            "wab_confirmed_list": sorted(wab),
+            "wab_breakdown": {uf: e["count"] for uf, e in wab.items()},
+        }
+
+    def top_hunters(self, limit: int = 5, min_grids: int = 2) -> List[Dict[str, Any]]:
+        hunters = sorted(self.state["hunters"].items(), key=lambda item: len(item[1]), reverse=True)
+        top = []
+        for call, grids in hunters:
+            if len(grids) < min_grids:
+                break
+            top.append({
+                "call": call,
+                "count": len(grids),
+                "grids": ", ".join(grids[:5]) + ("..." if len(grids) > 5 else ""),
+            })
+            if len(top) >= limit:
+                break
+        return top
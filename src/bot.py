@@ -2,28 +2,80 @@ import time
 import requests
 import threading
 import logging
-from typing import Dict, List, Set
-from datetime import datetime
+from typing import Dict, List, Optional, Set
+from datetime import datetime, timedelta
 
 from .config import Config
 from .storage import Storage
-from .lotw_client import LoTWClient
+from .lotw_client import LoTWClient, QSL, WORKED
+from .pipeline import SyncPipeline
+from .reconcile import Reconciler, parse_scope
+from .dispatcher import CommandDispatcher, CHEAP, CPU, NETWORK
+from .jobs import SyncQueue, SyncJob, SYNC, RECONCILE, FORGET, STARTED, JOINED, MERGED, UPGRADED, ABSORBED
 from .tle import TLEMonitor
-from .map_plot import MapGenerator
-import io
+from .metrics import REGISTRY, STAGE_SECONDS, COMMAND_SECONDS, TELEGRAM_SECONDS
+from .profiling import Profiler
 import json
+import re
 
 logger = logging.getLogger(__name__)
 
 class MonitorBot:
     def __init__(self):
         self.token = Config.TELEGRAM_BOT_TOKEN
+        self.api_base = f"{Config.TELEGRAM_API_URL}/bot{self.token}"
         self.allowed_chat_id = str(Config.TELEGRAM_CHAT_ID)
-        self.storage = Storage(Config.STATE_FILE)
+        self.storage = Storage(Config.STATE_FILE, Config.STATE_FORMAT, Config.LABEL_POLICY)
         self.client = LoTWClient()
-        self.tle_mon = TLEMonitor(Config.STATE_FILE.parent / "tle_cache.txt")
-        self.map_gen = MapGenerator(Config.STATE_FILE.parent)
-        self._lock = threading.Lock()  # Para evitar rodar sync concorrentemente
+        self.tle_mon = TLEMonitor(Config.STATE_FILE.parent)
+        self._map_gen = None  # Criado no primeiro uso (ver propriedade map_gen)
+        self._map_lock = threading.Lock()
+        self._pass_predictor = None
+        self._neighbor_index = None
+        # Sync e reconciliação rodam um por vez, com pedidos repetidos agrupados (ver jobs.py)
+        self.jobs = SyncQueue(self._run_job, self._notify_chats)
+        # Comandos rodam fora da thread de polling, num pool por classe de custo (COMMAND_COSTS)
+        self.dispatcher = CommandDispatcher(Config.COMMAND_POOLS)
+        self.profiler = Profiler(Config.STATE_FILE.parent / "profiles",
+                                 always=Config.PROFILE_COMMANDS, keep=Config.PROFILE_KEEP)
+
+    @property
+    def map_gen(self):
+        """
+        Gerador de mapas inicializado sob demanda.
+        Pillow, o mapa base (8K) e a fonte só são carregados quando um mapa é realmente gerado,
+        assim um `--mode check` sem novidades não paga esse custo.
+        """
+        if self._map_gen is None:
+            with self._map_lock:
+                if self._map_gen is None:
+                    from .map_plot import MapGenerator
+                    self._map_gen = MapGenerator(Config.STATE_FILE.parent)
+        return self._map_gen
+
+    @property
+    def pass_predictor(self):
+        """Motor de previsão de passagens (numpy/sgp4 importados só no primeiro /passes)."""
+        if self._pass_predictor is None:
+            with self._map_lock:
+                if self._pass_predictor is None:
+                    from .passes import PassPredictor
+                    self._pass_predictor = PassPredictor(self.tle_mon)
+        return self._pass_predictor
+
+    @property
+    def neighbor_index(self):
+        """Índice de vizinhança dos quadrados para o /needed (numpy importado só no primeiro uso)."""
+        if self._neighbor_index is None:
+            with self._map_lock:
+                if self._neighbor_index is None:
+                    from .needed import NeighborIndex
+                    self._neighbor_index = NeighborIndex()
+        return self._neighbor_index
+
+    def get_station_grid(self) -> str:
+        """Locator da estação: MY_GRIDSQUARE do .env ou o mais usado nos QSOs."""
+        return Config.MY_GRIDSQUARE or self.storage.get_my_grid()
 
     # Teclado Principal Persistente
     MAIN_KEYBOARD = {
@@ -36,19 +88,52 @@ class MonitorBot:
         "persistent": True
     }
 
+    # Espera máxima num 429 (Too Many Requests) antes de desistir: quem envia é um worker do pool
+    # ou a thread de sync, que não podem ficar parados; acima disso a mensagem é descartada
+    MAX_RETRY_AFTER = 3
+
+    def _telegram_post(self, method: str, **kwargs):
+        """POST na Bot API respeitando um 429 (retry_after) uma vez."""
+        url = f"{self.api_base}/{method}"
+        with REGISTRY.timer(TELEGRAM_SECONDS, "Latência das chamadas à Bot API", method=method):
+            r = requests.post(url, **kwargs)
+        REGISTRY.inc("lotw_monitor_telegram_requests_total", 1, "Chamadas à Bot API por status",
+                     method=method, status=r.status_code)
+        if r.status_code == 429:
+            retry_after = self._retry_after(r)
+            if retry_after <= self.MAX_RETRY_AFTER:
+                logger.warning(f"Telegram 429 em {method}: aguardando {retry_after}s")
+                time.sleep(retry_after)
+                r = requests.post(url, **kwargs)
+            else:
+                logger.warning(f"Telegram 429 em {method}: retry_after de {retry_after}s, mensagem descartada")
+        r.raise_for_status()
+        return r
+
+    @staticmethod
+    def _retry_after(r) -> int:
+        """Segundos pedidos num 429 (parameters.retry_after da Bot API)."""
+        try:
+            return int(r.json().get("parameters", {}).get("retry_after", 1))
+        except Exception:
+            return 1
+
     def send_photo(self, chat_id: str, photo_bytes: bytes, caption: str = ""):
-        url = f"https://api.telegram.org/bot{self.token}/sendPhoto"
         data = {"chat_id": chat_id, "caption": caption, "reply_markup": json.dumps(self.MAIN_KEYBOARD)}
         # O gerador retorna PNG. É importante o nome/mime baterem.
         files = {"photo": ("map.png", photo_bytes, "image/png")}
         try:
-            r = requests.post(url, data=data, files=files, timeout=60)
-            r.raise_for_status()
+            self._telegram_post("sendPhoto", data=data, files=files, timeout=60)
         except Exception as e:
             logger.error(f"Erro ao enviar foto: {e}")
 
+    def send_tle_alert(self, diff: Dict[str, List[str]]):
+        self.send_message(
+            self.allowed_chat_id,
+            "🛰️ *TLE Alert*: O arquivo de keplerianos do PU4ELT foi atualizado!\n" + self.tle_mon.format_diff(diff)
+        )
+
     def send_message(self, chat_id: str, text: str, reply_markup=None):
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
         
         # Use default keyboard if not provided
         if reply_markup is None:
@@ -62,8 +147,7 @@ class MonitorBot:
             "reply_markup": reply_markup
         }
         try:
-            r = requests.post(url, json=payload, timeout=15)
-            r.raise_for_status()
+            self._telegram_post("sendMessage", json=payload, timeout=15)
         except Exception as e:
             logger.error(f"Erro ao enviar mensagem Telegram: {e}")
 
@@ -96,117 +180,261 @@ class MonitorBot:
         
         # Envia o mapa atualizado automaticamente
         try:
-             confirmed = self.storage.get_confirmed_grids()
+             snapshot = self.storage.snapshot
+             confirmed = snapshot.get_confirmed_grids()
              # Passamos worked vazio pois removemos a visualização
-             grid_labels = self.storage.get_grid_labels()
-             img_bytes = self.map_gen.generate(confirmed, set(), grid_labels)
+             grid_labels = snapshot.get_grid_labels()
+             with REGISTRY.timer(STAGE_SECONDS, stage="map_render"):
+                 img_bytes = self.map_gen.generate(confirmed, set(), grid_labels)
              if img_bytes:
                  self.send_photo(self.allowed_chat_id, img_bytes, "🗺️ Mapa atualizado com os novos grids!")
         except Exception as e:
             logger.error(f"Erro ao enviar mapa automático: {e}")
 
-    def run_check_job(self, manual=False, chat_id=None, force_full=False):
+    def _run_job(self, job: SyncJob) -> Optional[str]:
+        """Executor da fila de sync (self.jobs); o resumo vai para todos os chats do job."""
+        chat_id = job.chat_ids[0] if job.chat_ids else None
+        try:
+            if job.kind == SYNC:
+                return self.run_check_job(force_full=job.full, chat_id=chat_id)
+            if job.kind == FORGET:
+                return self.run_forget_job(job.grid)
+            return self.run_reconcile_job(job.months)
+        finally:
+            # Um job que falhou no meio não pode deixar o merge aberto: o save ficaria bloqueado
+            if self.storage.merge_open:
+                logger.warning(f"Job {job.kind} terminou com merge aberto; fechando.")
+                self.storage.finish_merge()
+
+    def _notify_chats(self, chat_ids: List[str], text: str):
+        for chat_id in chat_ids:
+            self.send_message(chat_id, text)
+
+    def run_check_job(self, force_full=False, chat_id=None, prefetched: Optional[Dict[str, Dict]] = None) -> str:
         """
-        Roda o processo de verificação (pode ser demorado).
-        Deve ser rodado em thread se chamado pelo bot.
+        Roda o processo de verificação (pode ser demorado) e retorna o resumo para quem pediu.
+        No bot, roda pela fila de sync (self.jobs); `chat_id` recebe o perfil, se armado.
+        `prefetched`: fluxos já baixados pela verificação rápida do cron (QuickCheck.streams),
+        mesclados no lugar de um novo download.
         """
-        if not self._lock.acquire(blocking=False):
-            if manual and chat_id:
-                self.send_message(chat_id, "⚠️ Já existe uma sincronização em andamento.")
-            return
+        with self.profiler.profile("sync") as prof:
+            summary = self._run_check_job(force_full, prefetched)
+        if prof.get("summary"):
+            self.send_message(chat_id or self.allowed_chat_id, prof["summary"])
+        return summary
 
+    def _sync_since(self, query: str, cursor, force_full: bool) -> str:
+        """Valor de qso_qslsince / qso_qsorxsince para uma consulta."""
+        if force_full:
+            logger.info(f"Modo FORCE FULL ativado ({query}).")
+            return "1900-01-01"
+        if cursor:
+            logger.info(f"Modo INCREMENTAL ({query}). Since: {cursor} (marca d'água do LoTW)")
+            return cursor
+        if query != QSL:
+            logger.info(f"Primeira execução de {query}: Modo FULL.")
+            return "1900-01-01"
+
+        # Estados antigos sem marca d'água: last_sync_date com margem de segurança (1 dia)
+        last_sync = self.storage.last_sync_date
+        if last_sync == "1900-01-01":
+            logger.info("Primeira execução detectada: Modo FULL.")
+            return "1900-01-01" # Nunca rodou, então FULL
+        # Margem de segurança: volta 1 dia para garantir (overlap)
+        # last_sync é YYYY-MM-DD
+        try:
+            ls_dt = datetime.strptime(last_sync, "%Y-%m-%d")
+            since_date = (ls_dt - timedelta(days=1)).strftime("%Y-%m-%d")
+            logger.info(f"Modo INCREMENTAL. Since: {since_date} (Last success: {last_sync})")
+            return since_date
+        except ValueError:
+            return "1900-01-01" # Fallback se parse falhar
+
+    def _run_check_job(self, force_full, prefetched=None) -> str:
+        job_start = time.perf_counter()
         try:
-            logger.info(f"Iniciando check job (manual={manual}, force_full={force_full})...")
+            logger.info(f"Iniciando check job (force_full={force_full})...")
             
             # --- Lógica Smart Sync ---
-            # 1. Determina data de corte.
+            # 1. Determina o ponto de partida de cada consulta (confirmados e trabalhados).
             # Se force_full = True, usa 1900-01-01.
-            # Se force_full = False, usa last_sync_date com margem de segurança (1 dia).
+            # Senão usa a marca d'água do último sync daquela consulta (APP_LOTW_LASTQSL /
+            # APP_LOTW_LASTQSORX do cabeçalho do LoTW): só vem o que é realmente novo.
+            queries = list(prefetched) if prefetched else ([QSL, WORKED] if Config.SYNC_WORKED else [QSL])
+            cursors = {q: self.storage.get_cursor(q) for q in queries}
+            since = {q: self._sync_since(q, cursors[q], force_full) for q in queries}
+            since_date = since[QSL]
             
-            import datetime as dt_module
-            from datetime import timedelta
-            
-            if force_full:
-                since_date = "1900-01-01"
-                logger.info("Modo FORCE FULL ativado.")
-            else:
-                last_sync = self.storage.last_sync_date
-                if last_sync == "1900-01-01":
-                    since_date = "1900-01-01" # Nunca rodou, então FULL
-                    logger.info("Primeira execução detectada: Modo FULL.")
-                else:
-                    # Margem de segurança: volta 1 dia para garantir (overlap)
-                    # last_sync é YYYY-MM-DD
-                    try:
-                        ls_dt = datetime.strptime(last_sync, "%Y-%m-%d")
-                        safe_dt = ls_dt - timedelta(days=1)
-                        since_date = safe_dt.strftime("%Y-%m-%d")
-                        logger.info(f"Modo INCREMENTAL. Since: {since_date} (Last success: {last_sync})")
-                    except:
-                        since_date = "1900-01-01" # Fallback se parse falhar
-            
-            qsos = self.client.get_qsos(since=since_date)
+            # 2. Download, parse e merge em streaming (lotes de SYNC_BATCH_SIZE); as consultas
+            # rodam em paralelo e um registro trabalhado vira confirmado sem baixar tudo de novo
+            pipeline = SyncPipeline(self.storage, Config.SYNC_BATCH_SIZE)
+            streams = prefetched or {q: self.client.stream(q, since[q]) for q in queries}
+            result = pipeline.run_streams(streams)
+
+            # Avança as marcas d'água só depois do download completo. Sem o campo no cabeçalho,
+            # usa o maior APP_LOTW_RXQSL / APP_LOTW_RXQSO recebido; sem nenhum, mantém a anterior.
+            for q in queries:
+                watermark = self.client.watermark(q, result["streams"][q]["watermark"])
+                if watermark and watermark > (cursors[q] or ""):
+                    self.storage.set_cursor(q, watermark)
+
+            # 3. Meses marcados pelo /forget: baixa de novo só esses meses (sem conferência)
+            repaired = []
+            if self.storage.dirty_months:
+                recon = self._reconciler().run(check=False)
+                repaired = recon["repaired"]
+                result["merge"]["inserted"] += recon["inserted"]
+                result["merge"]["updated"] += recon["updated"]
+                result["alerts"]["new_grids"] = sorted(set(result["alerts"]["new_grids"]) | set(recon["new_grids"]))
+                result["alerts"]["grid_info"].update(recon["grid_info"])
             
-            if not qsos:
-                if manual and chat_id:
-                    self.send_message(chat_id, f"✅ Sincronização concluída. 0 novos registros desde {since_date}.")
-                
+            if not result["parse"]["records"] and not repaired:
                 # Mesmo sem novos QSOs, atualizamos o last_sync_date para hoje,
-                # para que amanhã a busca seja rápida.
+                # para que amanhã a busca seja rápida (só grava se a data mudou).
                 self.storage.last_sync_date = datetime.now().strftime("%Y-%m-%d")
-                self.storage.save()
-                return
+                if self.storage.dirty:
+                    self.storage.save()
+                self.storage.refresh_sidecar()
+                return f"✅ Sincronização concluída. 0 novos registros desde {since_date}."
 
-            if manual and chat_id:
-                 self.send_message(chat_id, f"📥 Analisando {len(qsos)} registros do LoTW...")
-
-            # 2. Processa e salva no Storage
-            new_grids_found = self.storage.merge_qsos(qsos)
+            merge = result["merge"]
+            for outcome in ("inserted", "updated", "unchanged"):
+                REGISTRY.inc("lotw_monitor_merge_records_total", merge[outcome], "Registros mesclados por resultado", result=outcome)
+            changed = merge["inserted"] + merge["updated"]
+            logger.info(f"Merge: {merge['inserted']} novos, {merge['updated']} alterados, {merge['unchanged']} inalterados.")
             
             # Atualiza last_sync_date para HOJE (sucesso)
             # Não usamos max_date do QSO, pois queremos saber quando RODAMOS o check.
             self.storage.last_sync_date = datetime.now().strftime("%Y-%m-%d")
             
             # (Opcional) Mantemos last_qso_date para estatísticas, mas não para controle de sync
-            max_qso_date = "1900-01-01"
-            for q in qsos:
-                d = q.get("QSO_DATE", "")
-                if d > max_qso_date: max_qso_date = d
-            self.storage.last_qso_date = max_qso_date
+            if changed:
+                self.storage.last_qso_date = max(result["aggregate"]["max_qso_date"], "1900-01-01")
             
-            self.storage.save()
+            # Nada mudou (só o overlap do incremental): não regrava o estado inteiro
+            if self.storage.dirty:
+                with REGISTRY.timer(STAGE_SECONDS, stage="save"):
+                    self.storage.save()
+            self.storage.refresh_sidecar()
             
             # Checa TLE
-            if self.tle_mon.check_update():
-               self.send_message(self.allowed_chat_id, "🛰️ *TLE Alert*: O arquivo de keplerianos do PU4ELT foi atualizado!")
+            with REGISTRY.timer(STAGE_SECONDS, stage="tle_check"):
+                tle_diff = self.tle_mon.check_update()
+            if tle_diff:
+                self.send_tle_alert(tle_diff)
 
+            new_grids_found = result["alerts"]["new_grids"]
             if new_grids_found:
-                # Monta info para o alerta
-                # Varre os qsos baixados para achar quem deu o grid
-                grid_info = {}
-                for q in qsos:
-                    # check grids
-                    # (Lógica simplificada do storage._extract_grids)
-                    gs = self.storage._extract_grids(q)
-                    for g in gs:
-                        if g in new_grids_found:
-                            # Pega o primeiro ou mais recente
-                            grid_info[g] = {
-                                "call": q.get("CALL"),
-                                "date": q.get("QSO_DATE")
-                            }
-                
-                self.notify_new_grids(new_grids_found, grid_info)
-            else:
-                if manual and chat_id:
-                    self.send_message(chat_id, "✅ Novos QSOs baixados, mas sem grids inéditos.")
+                grid_info = result["alerts"]["grid_info"]
+                with REGISTRY.timer(STAGE_SECONDS, stage="notify"):
+                    self.notify_new_grids(new_grids_found, grid_info)
+                return f"✅ Sincronização concluída: {len(new_grids_found)} grid(s) inédito(s), alerta enviado."
+            if changed:
+                return f"✅ {merge['inserted']} novos e {merge['updated']} alterados, mas sem grids inéditos."
+            return f"✅ Nada mudou: os {merge['unchanged']} registros baixados já estavam no cache."
 
         except Exception as e:
             logger.error(f"Erro no job: {e}")
-            if manual and chat_id:
-                self.send_message(chat_id, f"❌ Erro na sincronização: {e}")
+            REGISTRY.inc("lotw_monitor_sync_errors_total", 1, "Sincronizações com erro")
+            return f"❌ Erro na sincronização: {e}"
         finally:
-            self._lock.release()
+            REGISTRY.observe(STAGE_SECONDS, time.perf_counter() - job_start, stage="total")
+
+    def _job_status_text(self, status: str, what: str) -> str:
+        """Resposta imediata a um pedido de sync/reconciliação, conforme SyncQueue.submit."""
+        if status == STARTED:
+            return f"🔄 Iniciando {what}..."
+        if status == JOINED:
+            return f"🔄 Já há um job em andamento que cobre a {what}; aviso quando terminar."
+        if status == MERGED:
+            return f"⏳ Já há um job na fila que cobre a {what}; aviso quando terminar."
+        if status == UPGRADED:
+            return "⏫ A sincronização na fila passou a ser COMPLETA; aviso quando terminar."
+        if status == ABSORBED:
+            return f"⏳ A {what} tomou o lugar do sync na fila (e cobre os QSOs novos); aviso quando terminar."
+        return f"⏳ {what[0].upper()}{what[1:]} na fila ({self.jobs.depth} job(s) aguardando)."
+
+    def run_forget_job(self, grid: str) -> str:
+        """
+        /forget: remove o grid e grava o estado. Roda pela fila de sync, nunca no meio de um
+        merge em lotes (publicar ali exporia aos leitores um sync pela metade).
+        """
+        if not self.storage.forget_grid(grid):
+            return f"⚠️ Grid {grid} não consta na lista."
+        with REGISTRY.timer(STAGE_SECONDS, stage="save"):
+            saved = self.storage.save()
+        if not saved:
+            return f"❌ Esqueci {grid}, mas não consegui gravar o estado (veja o log)."
+        months = len(self.storage.dirty_months)
+        return f"🗑️ Esqueci {grid}. O próximo /sync baixa de novo só os {months} mês(es) com QSOs nesse grid para achá-lo."
+
+    def _reconciler(self) -> Reconciler:
+        return Reconciler(self.storage, self.client, Config.SYNC_WORKED, Config.SYNC_BATCH_SIZE)
+
+    def run_reconcile_job(self, months: Optional[List[str]] = None) -> str:
+        """
+        /reconcile: confere os digests mensais com fatias leves do LoTW e repara só os meses
+        que divergem (inclusive QSOs apagados no LoTW). Roda pela fila de sync; retorna o resumo.
+        """
+        try:
+            with REGISTRY.timer(STAGE_SECONDS, stage="reconcile"):
+                report = self._reconciler().run(months, limit=Config.RECONCILE_MONTHS)
+            if self.storage.dirty:
+                with REGISTRY.timer(STAGE_SECONDS, stage="save"):
+                    self.storage.save()
+
+            lines = [
+                "🧮 *Reconciliação concluída*",
+                f"Meses conferidos: {len(report['checked'])} ({report['check_bytes'] / 1024:.0f} KB)",
+            ]
+            if report["repaired"]:
+                shown = ", ".join(f"{m[:4]}-{m[4:]}" for m in report["repaired"][:12])
+                more = f" (+{len(report['repaired']) - 12})" if len(report["repaired"]) > 12 else ""
+                lines.append(f"Reparados: {shown}{more} ({report['repair_bytes'] / 1024:.0f} KB)")
+                lines.append(f"{report['inserted']} novos, {report['updated']} alterados, {report['deleted']} removidos.")
+            else:
+                lines.append("✅ Cache idêntico ao LoTW nos meses conferidos.")
+
+            if report["new_grids"]:
+                self.notify_new_grids(report["new_grids"], report["grid_info"])
+            return "\n".join(lines)
+        except Exception as e:
+            logger.error(f"Erro na reconciliação: {e}")
+            REGISTRY.inc("lotw_monitor_sync_errors_total", 1, "Sincronizações com erro")
+            return f"❌ Erro na reconciliação: {e}"
+
+    def send_profile(self, chat_id: str, args: List[str]):
+        """/profile <comando> arma o perfilamento (cProfile + tracemalloc) da próxima execução."""
+        if not args:
+            recent = self.profiler.recent()
+            lines = [
+                "🔬 *Perfilamento sob demanda*",
+                "Uso: `/profile <comando>` (ex.: `stats`, `map`, `plan`, `sync`).",
+                "A próxima execução do comando é perfilada e o resumo chega aqui.",
+            ]
+            if self.profiler.always:
+                lines.append(f"Sempre perfilados (PROFILE\\_COMMANDS): `{', '.join(sorted(self.profiler.always))}`")
+            if recent:
+                lines.append("")
+                lines.append("Últimos perfis em `data/profiles/`:")
+                lines.extend(f"• `{name}`" for name in recent)
+            self.send_message(chat_id, "\n".join(lines))
+            return
+
+        target = args[0].lstrip("/").lower()
+        if target == "sync_full":
+            target = "sync"
+        self.profiler.arm(target)
+        hint = "Rode `/sync` agora." if target == "sync" else f"Rode `/{target}` agora."
+        self.send_message(chat_id, f"🔬 A próxima execução de `{target}` será perfilada. {hint}")
+
+    def run_tle_check(self, chat_id: str):
+        """Checa o TLE e responde com o diff por satélite."""
+        diff = self.tle_mon.check_update()
+        if diff:
+            self.send_message(chat_id, "✅ TLEs estavam desatualizados e foram renovados agora.\n" + self.tle_mon.format_diff(diff))
+        else:
+            self.send_message(chat_id, "ℹ️ TLEs já estão na última versão.")
 
     def handle_update(self, update: Dict):
         msg = update.get("message")
@@ -219,6 +447,47 @@ class MonitorBot:
         if chat_id != self.allowed_chat_id:
             return
 
+        command = self._command_name(text)
+        cost = self._command_cost(command, text)
+        if not self.dispatcher.submit(cost, self._run_command, chat_id, text, command):
+            self.send_message(chat_id, "⏳ Muitos comandos desse tipo em andamento. Tente de novo em instantes.")
+
+    def _run_command(self, chat_id: str, text: str, command: str):
+        # /sync, /sync_full e /reconcile só enfileiram o job: o perfil "sync" é feito no próprio job
+        target = "" if command in ("sync", "sync_full", "reconcile") else command
+        with self.profiler.profile(target) as prof:
+            with REGISTRY.timer(COMMAND_SECONDS, "Duração do tratamento de cada comando", command=command):
+                self._handle_text(chat_id, text)
+        if prof.get("summary"):
+            self.send_message(chat_id, prof["summary"])
+
+    # Botões do teclado -> nome do comando (rótulo das métricas)
+    KEYBOARD_COMMANDS = {
+        "📊 Dashboard": "stats", "🗺️ Mapa": "map", "🔄 Sync": "sync", "📥 Sync Full": "sync_full",
+        "📋 Grids": "grids", "🛰️ TLEs": "tle", "❓ Ajuda": "help",
+    }
+
+    # Classe de custo de cada comando (ver dispatcher.py); os não listados são CHEAP
+    COMMAND_COSTS = {
+        "stats": CPU, "map": CPU, "testgrid": CPU, "debug_state": CPU, "passes": CPU, "plan": CPU,
+        "tle": NETWORK,
+        # "needed" fica em CHEAP: a consulta ao NeighborIndex leva ~1 ms (o primeiro uso importa o
+        # numpy e monta um anel, ~0,15 s); /needed <SAT> propaga a órbita e vai para CPU (_command_cost).
+        # "forget" também: só enfileira o job na fila de sync (ver run_forget_job)
+    }
+
+    def _command_cost(self, command: str, text: str) -> str:
+        """Classe de custo do comando (COMMAND_COSTS), olhando os argumentos quando o custo depende deles."""
+        if command == "needed" and self._parse_needed_args(text.split()[1:])[2]:
+            return CPU  # Monta o PassPredictor no primeiro uso (sgp4 + TLE)
+        return self.COMMAND_COSTS.get(command, CHEAP)
+
+    def _command_name(self, text: str) -> str:
+        if text.startswith("/"):
+            return text.split()[0][1:].split("@")[0].lower() or "other"
+        return self.KEYBOARD_COMMANDS.get(text, "other")
+
+    def _handle_text(self, chat_id: str, text: str):
         if text == "/help" or text == "/start" or text == "❓ Ajuda":
             self.send_help(chat_id)
             return
@@ -242,10 +511,10 @@ class MonitorBot:
                 "📊 *Satellite Grid Dashboard* 🛰️",
                 "",
                 f"✅ *Confirmados:* `{d['total_confirmed']}` QSOs",
-                f"🗺️ *Grids:* `{d['total_grids']}` (VUCC: {d['total_grids']}/100)",
+                f"🗺️ *Grids:* `{d['total_grids']}` (VUCC: {d['total_grids']}/{d['vucc_target']})",
                 f"🛰️ *Satélites:* `{d['total_sats']}`",
                 f"📏 *Max DX:* `{d['max_distance']} km`",
-                # f"🇧🇷 *WAB:* `{d['wab_count']}/27` UFs",  # DISABLED (User Request)
+                f"🇧🇷 *WAB:* `{d['wab_count']}/27` UFs",
                 "",
                 f"🌍 *DXCC:* `{d['dxcc_count']}`  •  *CQ:* `{d['cq_count']}`  •  *ITU:* `{d['itu_count']}`",
             ]
@@ -256,6 +525,18 @@ class MonitorBot:
                 for idx, h in enumerate(d['top_hunters'], 1):
                     msg.append(f"{idx}. *{h['call']}* - {h['count']} grids")
             
+            # VUCC por banda e por satélite (progresso rumo aos 100 grids)
+            if d.get('vucc_bands'):
+                msg.append("")
+                msg.append("📶 *VUCC por banda:*")
+                for band, n in sorted(d['vucc_bands'].items(), key=lambda x: x[1], reverse=True):
+                    msg.append(f"- {band}: {n}/{d['vucc_target']}")
+            if d.get('vucc_sats'):
+                msg.append("")
+                msg.append("🛰️ *VUCC por satélite (Top 5):*")
+                for sat, n in sorted(d['vucc_sats'].items(), key=lambda x: x[1], reverse=True)[:5]:
+                    msg.append(f"- {sat}: {n} grids")
+
             # Breakdowns simplificados (Top 3 Sats)
             msg.append("")
             msg.append("📡 *Top Satélites:*")
@@ -264,22 +545,21 @@ class MonitorBot:
                 for s, c in sorted_sats:
                     msg.append(f"- {s}: {c}")
 
-            # WAB LIST DISABLED
-            # msg.append("")
-            # msg.append("🇧🇷 *Estados Confirmados (WAB):*")
-            # sorted_wab = sorted(d.get('wab_breakdown', {}).items(), key=lambda x: x[1], reverse=True)
-            # if sorted_wab:
-            #     wab_str = ", ".join([f"{s} ({c})" for s, c in sorted_wab])
-            #     msg.append(wab_str)
-            # else:
-            #     msg.append("(Nenhum)")
-
-            # WAB Missing DISABLED
-            # missing = d.get('wab_missing', [])
-            # if missing:
-            #     msg.append("")
-            #     msg.append(f"⏳ *Faltam ({len(missing)}):*")
-            #     msg.append(", ".join(sorted(missing)))
+            # WAB (estado pré-calculado pelo motor de diplomas)
+            msg.append("")
+            msg.append("🇧🇷 *Estados Confirmados (WAB):*")
+            sorted_wab = sorted(d.get('wab_breakdown', {}).items(), key=lambda x: x[1], reverse=True)
+            if sorted_wab:
+                wab_str = ", ".join([f"{s} ({c})" for s, c in sorted_wab])
+                msg.append(wab_str)
+            else:
+                msg.append("(Nenhum)")
+
+            missing = d.get('wab_missing', [])
+            if missing:
+                msg.append("")
+                msg.append(f"⏳ *Faltam ({len(missing)}):*")
+                msg.append(", ".join(sorted(missing)))
 
             # DXCC List
             msg.append("")
@@ -305,7 +585,7 @@ class MonitorBot:
                 found_msgs = []
                 count = 0
                 
-                for qso in self.storage.data.get("qso_cache", {}).values():
+                for qso in self.storage.snapshot.qsos:
                     if qso.get("QSL_RCVD", "").upper() != "Y": continue
                     if qso.get("COUNTRY", "").upper() != "BRAZIL": continue
                     
@@ -356,24 +636,31 @@ class MonitorBot:
                 force_full = True
             
             mode_str = "COMPLETA (Full Download)" if force_full else "Inteligente (Smart Sync)"
-            self.send_message(chat_id, f"🔄 Iniciando sincronização: {mode_str}...")
-            
-            t = threading.Thread(target=self.run_check_job, args=(True, chat_id, force_full)) 
-            t.start()
+            status = self.jobs.submit(SYNC, chat_id, full=force_full)
+            self.send_message(chat_id, self._job_status_text(status, f"sincronização {mode_str}"))
             
+        elif text == "/reconcile" or text.startswith("/reconcile "):
+            try:
+                months = parse_scope(text[len("/reconcile"):])
+            except ValueError as e:
+                self.send_message(chat_id, f"⚠️ {e}")
+                return
+            scope = "log inteiro" if months == [] else (f"{len(months)} mês(es)" if months else f"{Config.RECONCILE_MONTHS} meses conferidos há mais tempo")
+            status = self.jobs.submit(RECONCILE, chat_id, months=months)
+            self.send_message(chat_id, self._job_status_text(status, f"reconciliação ({scope})"))
+
         elif text == "/map" or text == "🗺️ Mapa":
              self.send_message(chat_id, "🗺️ Gerando mapa...")
-             # Gerar em thread para nao bloquear? Map é rápido com pillow, mas download da base pode demorar na 1a vez.
-             # Vamos fazer inline por simplificidade, já que download é cacheado.
-             confirmed = self.storage.get_confirmed_grids()
-             worked = self.storage.get_worked_grids()
-             
+             # Classe CPU: roda no pool do dispatcher, sem atrasar os comandos leves
              try:
-                 confirmed = self.storage.get_confirmed_grids()
-                 worked = self.storage.get_worked_grids()
-                 grid_labels = self.storage.get_grid_labels()
+                 # Um único snapshot: grids e rótulos da mesma versão, mesmo com um sync rodando
+                 snapshot = self.storage.snapshot
+                 confirmed = snapshot.get_confirmed_grids()
+                 worked = snapshot.get_worked_grids()
+                 grid_labels = snapshot.get_grid_labels()
                  
-                 img_bytes = self.map_gen.generate(confirmed, worked, grid_labels)
+                 with REGISTRY.timer(STAGE_SECONDS, stage="map_render"):
+                     img_bytes = self.map_gen.generate(confirmed, worked, grid_labels)
                  if img_bytes:
                      self.send_photo(chat_id, img_bytes, "Mapa de Grids Confirmados")
                  else:
@@ -384,47 +671,40 @@ class MonitorBot:
                  self.send_message(chat_id, f"❌ Erro ao gerar o mapa: {e}")
 
         elif text == "/tle" or text == "🛰️ TLEs":
-            changed = self.tle_mon.check_update()
-            if changed:
-                self.send_message(chat_id, "✅ TLEs estavam desatualizados e foram renovados agora.")
-            else:
-                self.send_message(chat_id, "ℹ️ TLEs já estão na última versão.")
+            # Classe NETWORK: roda no pool do dispatcher (download pode demorar)
+            self.run_tle_check(chat_id)
+
+        elif text == "/passes" or text.startswith("/passes "):
+            self.send_passes(chat_id, text.split()[1:])
+
+        elif text == "/plan" or text.startswith("/plan "):
+            self.send_plan(chat_id, text.split()[1:])
+
+        elif text == "/needed" or text.startswith("/needed "):
+            self.send_needed(chat_id, text.split()[1:])
+
+        elif text == "/metrics":
+            lines = REGISTRY.summary_lines()
+            body = "\n".join(lines[:60]) if lines else "(sem dados ainda)"
+            self.send_message(chat_id, f"📈 *Métricas*\n```\n{body}\n```")
+
+        elif text == "/profile" or text.startswith("/profile "):
+            self.send_profile(chat_id, text.split()[1:])
 
         elif text.startswith("/check "):
             call_to_check = text[7:].strip().upper()
             if not call_to_check:
                 self.send_message(chat_id, "Uso: `/check <INDICATIVO>`")
                 return
-            
-            # Pesquisa no cache
-            # Precisamos iterar o qso_cache do storage
-            found = False
-            for qso in self.storage.data.get("qso_cache", {}).values():
-                if qso.get("CALL") == call_to_check:
-                    grid = qso.get("GRIDSQUARE") or qso.get("VUCC_GRIDS") or "?"
-                    date = qso.get("QSO_DATE")
-                    status = "Confirmado" if (qso.get("QSL_RCVD") == "Y") else "Trabalhado"
-                    
-                    self.send_message(chat_id, f"✅ ENCONTRADO:\nCall: {call_to_check}\nGrid: {grid}\nData: {date}\nStatus: {status}")
-                    found = True
-                    break # para no primeiro? ou lista todos? Vamos parar no primeiro por enqto.
-            
-            if not found:
-                self.send_message(chat_id, f"❌ Nenhum registro encontrado para `{call_to_check}`.")
+            self.send_check(chat_id, call_to_check)
 
         elif text.startswith("/forget "):
-            # Remove um grid e força resync total
+            # Remove um grid (os meses dele são baixados de novo no próximo sync). Vai pela fila
+            # de sync: só altera e grava o estado entre jobs, nunca no meio de um merge
             grid_for = text[8:].strip().upper()
-            known = self.storage.data.get("known_grids", [])
-            
-            if grid_for in known:
-                known.remove(grid_for)
-                self.storage.data["known_grids"] = sorted(known)
-                self.storage.last_qso_date = "1900-01-01" # Forçar novo download completo
-                self.storage.save()
-                self.send_message(chat_id, f"🗑️ Esqueci {grid_for}. O próximo /sync fará um download COMPLETO para achá-lo de novo.")
-            else:
-                self.send_message(chat_id, f"⚠️ Grid {grid_for} não consta na lista.")
+            status = self.jobs.submit(FORGET, chat_id, grid=grid_for)
+            if status not in (STARTED, JOINED, MERGED):
+                self.send_message(chat_id, self._job_status_text(status, f"remoção de {grid_for}"))
 
         elif text.startswith("/testgrid "):
             # Simula um alerta visual COMPLETO
@@ -444,11 +724,11 @@ class MonitorBot:
             
             # 2. Gera mapa INCLUINDO o grid de teste (sem salvar no banco)
             try:
-                confirmed = self.storage.get_confirmed_grids()
-                confirmed.add(grid_test) # Adiciona temporariamente para o mapa
+                # Adiciona temporariamente para o mapa (novo GridSet, não altera o storage)
+                confirmed = self.storage.get_confirmed_grids() | {grid_test}
                 
                 # Mock labels
-                grid_labels = self.storage.get_grid_labels()
+                grid_labels = dict(self.storage.get_grid_labels())
                 grid_labels[grid_test] = "TEST-CALL"
                 
                 img_bytes = self.map_gen.generate(confirmed, set(), grid_labels)
@@ -460,6 +740,199 @@ class MonitorBot:
                 logger.error(f"Erro teste: {e}")
                 self.send_message(chat_id, f"❌ Erro: {e}")
 
+    def send_passes(self, chat_id: str, args: List[str]):
+        """
+        /passes [all|SAT] [HORAS]
+        Sem argumentos: satélites já trabalhados no log, próximas 24h.
+        """
+        hours = 24
+        target = None
+        for arg in args:
+            if arg.replace(".", "", 1).isdigit():
+                hours = min(float(arg), 72)
+            else:
+                target = arg.upper()
+
+        grid = self.get_station_grid()
+        if not grid:
+            self.send_message(chat_id, "⚠️ Locator da estação desconhecido. Defina `MY_GRIDSQUARE` no .env.")
+            return
+
+        try:
+            predictor = self.pass_predictor
+            if not predictor.satellite_names:
+                self.send_message(chat_id, "⚠️ Catálogo TLE local vazio. Use /tle para baixá-lo.")
+                return
+
+            if target == "ALL":
+                sats = None
+            elif target:
+                sats = predictor.match_satellites([target])
+                if not sats:
+                    self.send_message(chat_id, f"❌ Satélite `{target}` não encontrado no TLE.")
+                    return
+            else:
+                sats = predictor.match_satellites(list(self.storage.get_worked_sats())) or None
+
+            passes = predictor.predict(grid, hours=hours, sats=sats)
+        except Exception as e:
+            logger.exception("Erro ao prever passagens")
+            self.send_message(chat_id, f"❌ Erro ao prever passagens: {e}")
+            return
+
+        from .passes import format_pass
+        lines = [f"🛰️ *Passagens em {grid}* (próximas {hours:g}h)", ""]
+        if not passes:
+            lines.append("(Nenhuma passagem no período)")
+        for p in passes[:25]:
+            lines.append(format_pass(p))
+        if len(passes) > 25:
+            lines.append(f"... e mais {len(passes) - 25}.")
+        self.send_message(chat_id, "\n".join(lines))
+
+    def send_plan(self, chat_id: str, args: List[str]):
+        """
+        /plan [HORAS]
+        Passagens futuras ordenadas por quantos grids não confirmados cabem no footprint.
+        """
+        hours = 12
+        if args and args[0].replace(".", "", 1).isdigit():
+            hours = min(float(args[0]), 48)
+
+        grid = self.get_station_grid()
+        if not grid:
+            self.send_message(chat_id, "⚠️ Locator da estação desconhecido. Defina `MY_GRIDSQUARE` no .env.")
+            return
+
+        try:
+            from .planner import GridPlanner, opportunity_grids
+            from .passes import format_pass
+            predictor = self.pass_predictor
+            snapshot = self.storage.snapshot
+            sats = predictor.match_satellites(list(snapshot.get_worked_sats())) or None
+            plan = GridPlanner(predictor).plan(
+                grid,
+                snapshot.get_confirmed_grids(),
+                snapshot.get_worked_grids(),
+                hours=hours,
+                sats=sats,
+            )
+        except Exception as e:
+            logger.exception("Erro no planejamento de grids")
+            self.send_message(chat_id, f"❌ Erro no planejamento: {e}")
+            return
+
+        lines = [f"🎯 *Oportunidades de grids novos* ({grid}, próximas {hours:g}h)", ""]
+        if not plan:
+            lines.append("(Nenhuma passagem com grids novos no período)")
+        for item in plan[:8]:
+            lines.append(format_pass(item["pass"]))
+            lines.append(f"   {item['count']} grids não confirmados ({item['worked_count']} já trabalhados)")
+            lines.append(f"   `{', '.join(opportunity_grids(item, 8))}`")
+        self.send_message(chat_id, "\n".join(lines))
+
+    def send_check(self, chat_id: str, query: str):
+        """
+        /check <CALL>
+        Busca aproximada no snapshot publicado (um sync em andamento não altera o que é lido):
+        /P, prefixos (PY2/) e erros de digitação também encontram o indicativo.
+        """
+        matches = self.storage.find_calls(query, limit=5)
+        if not matches:
+            self.send_message(chat_id, f"❌ Nenhum registro encontrado para `{query}`.")
+            return
+
+        # Com acerto exato, os parecidos viram só uma linha; sem ele, os 3 melhores aparecem completos
+        exact = matches[0]["score"] == 1.0
+        detailed = matches[:1] if exact else matches[:3]
+        others = matches[len(detailed):]
+        lines = [f"🔍 *Resultados para* `{query}`", ""]
+        for m in detailed:
+            status = "✅ Confirmado" if m["confirmed"] else "🟡 Trabalhado"
+            similar = "" if m["score"] == 1.0 else f" (parecido, {m['score']:.0%})"
+            lines.append(f"*{m['base']}*{similar} — {len(m['qsos'])} QSO(s), {status}")
+            if m["calls"] != [m["base"]]:
+                lines.append(f"   Como: {', '.join(f'`{c}`' for c in m['calls'])}")
+            if m["grids"]:
+                grids = ", ".join(f"`{g}`{'✅' if g in m['confirmed_grids'] else ''}" for g in m["grids"])
+                lines.append(f"   Grids: {grids}")
+            for qso in m["qsos"][:8]:
+                date = qso.get("QSO_DATE", "")
+                if len(date) == 8:
+                    date = f"{date[6:8]}/{date[4:6]}/{date[0:4]}"
+                grid = qso.get("GRIDSQUARE") or qso.get("VUCC_GRIDS") or "?"
+                mark = "✅" if qso.confirmed else "🟡"
+                lines.append(f"   {mark} {date} `{qso.call}` {qso.get('BAND', '')} {qso.sat or qso.get('MODE', '')} {grid}")
+            if len(m["qsos"]) > 8:
+                lines.append(f"   ... e mais {len(m['qsos']) - 8}.")
+            lines.append("")
+        if others:
+            lines.append("Parecidos: " + ", ".join(f"`{m['base']}` ({len(m['qsos'])})" for m in others))
+        self.send_message(chat_id, "\n".join(lines).rstrip())
+
+    LOCATOR_RE = re.compile(r"^[A-R]{2}[0-9]{2}([A-X]{2})?$")
+
+    def _parse_needed_args(self, args: List[str]):
+        """Argumentos do /needed -> (locator ou None, raio em km, satélite ou None)."""
+        grid = None
+        radius = Config.NEEDED_RADIUS_KM
+        target = None
+        for arg in args:
+            arg = arg.upper()
+            if self.LOCATOR_RE.match(arg):
+                grid = arg
+            elif arg.replace(".", "", 1).isdigit():
+                radius = min(float(arg), 20000)
+            else:
+                target = arg
+        return grid, radius, target
+
+    def send_needed(self, chat_id: str, args: List[str]):
+        """
+        /needed [LOCATOR] [KM|SAT]
+        Grids não confirmados ao redor do locator (padrão: o da estação), do mais perto ao mais
+        longe, num raio em km (padrão NEEDED_RADIUS_KM) ou no alcance de um satélite agora.
+        """
+        grid, radius, target = self._parse_needed_args(args)
+        grid = grid or self.get_station_grid()
+        if not grid:
+            self.send_message(chat_id, "⚠️ Locator da estação desconhecido. Defina `MY_GRIDSQUARE` no .env ou use `/needed <LOCATOR>`.")
+            return
+
+        try:
+            scope = f"raio {radius:g} km"
+            if target:
+                from .needed import footprint_radius_km
+                predictor = self.pass_predictor
+                sats = predictor.match_satellites([target])
+                if not sats:
+                    self.send_message(chat_id, f"❌ Satélite `{target}` não encontrado no TLE.")
+                    return
+                radius = footprint_radius_km(predictor, sats[0])
+                scope = f"alcance do {sats[0]}: {radius:.0f} km"
+            snapshot = self.storage.snapshot
+            result = self.neighbor_index.needed(grid, radius, snapshot.get_confirmed_grids(),
+                                                snapshot.get_worked_grids(), limit=30)
+        except Exception as e:
+            logger.exception("Erro na consulta de grids faltantes")
+            self.send_message(chat_id, f"❌ Erro na consulta: {e}")
+            return
+
+        lines = [
+            f"🧭 *Grids que faltam perto de {grid}* ({scope})",
+            f"{result['confirmed']} de {result['total']} confirmados; faltam *{result['needed']}* "
+            f"({result['worked']} já trabalhados ⭐)",
+            "",
+        ]
+        if not result["items"]:
+            lines.append("(Todos os grids do raio já estão confirmados)")
+        for item in result["items"]:
+            star = " ⭐" if item["worked"] else ""
+            lines.append(f"• `{item['grid']}` {item['km']:.0f} km{star}")
+        if result["needed"] > len(result["items"]):
+            lines.append(f"... e mais {result['needed'] - len(result['items'])}.")
+        self.send_message(chat_id, "\n".join(lines))
+
     def set_bot_commands(self):
         """Configura o menu de comandos no Telegram via API."""
         commands = [
@@ -469,13 +942,17 @@ class MonitorBot:
             {"command": "sync_full", "description": "📥 Sincronizar TUDO (Completo)"},
             {"command": "grids", "description": "📋 Resumo de Grids"},
             {"command": "tle", "description": "🛰️ Checar TLEs"},
+            {"command": "passes", "description": "📡 Próximas passagens (Ex: /passes SO-50 12)"},
+            {"command": "plan", "description": "🎯 Passagens com mais grids novos"},
+            {"command": "needed", "description": "🧭 Grids que faltam perto (Ex: /needed 800)"},
+            {"command": "reconcile", "description": "🧮 Conferir cache x LoTW por mês"},
             {"command": "check", "description": "🔍 Checar Call (Ex: /check call)"},
+            {"command": "metrics", "description": "📈 Métricas de desempenho"},
+            {"command": "profile", "description": "🔬 Perfilar o próximo comando"},
             {"command": "help", "description": "❓ Ajuda"}
         ]
-        url = f"https://api.telegram.org/bot{self.token}/setMyCommands"
         try:
-            r = requests.post(url, json={"commands": commands})
-            r.raise_for_status()
+            self._telegram_post("setMyCommands", json={"commands": commands}, timeout=15)
             logger.info("Menu de comandos configurado com sucesso.")
         except Exception as e:
             logger.error(f"Erro ao configurar menu de comandos: {e}")
@@ -490,9 +967,15 @@ class MonitorBot:
             "• `/map` - Mapa visual.",
             "• `/sync` - Sincronização rápida.",
             "• `/sync_full` - Sincronização COMPLETA.",
-            "• `/check <CALL>` - Verificar indicativo.",
+            "• `/reconcile [all|AAAA|AAAA-MM]` - Confere o cache com o LoTW mês a mês e repara só o que diverge.",
+            "• `/check <CALL>` - Verificar indicativo (aceita /P, prefixos e erros de digitação).",
             "• `/grids` - Listar grids.",
             "• `/tle` - Atualizar TLEs.",
+            "• `/passes [all|SAT] [HORAS]` - Próximas passagens.",
+            "• `/plan [HORAS]` - Passagens com mais grids novos.",
+            "• `/needed [LOCATOR] [KM|SAT]` - Grids não confirmados mais próximos (⭐ = trabalhado).",
+            "• `/metrics` - Métricas de desempenho.",
+            "• `/profile <comando>` - Perfila (CPU e memória) a próxima execução do comando.",
             "• `/help` - Ajuda.",
         ]
         self.send_message(chat_id, "\n".join(lines))
@@ -500,6 +983,14 @@ class MonitorBot:
     def start_polling(self):
         logger.info("Bot iniciado...")
         
+        # Endpoint Prometheus opcional (METRICS_PORT)
+        if Config.METRICS_PORT:
+            try:
+                from .metrics import start_http_server
+                start_http_server(Config.METRICS_PORT)
+            except Exception as e:
+                logger.error(f"Erro ao iniciar servidor de métricas: {e}")
+
         # Configurar menu
         self.set_bot_commands()
         
@@ -511,7 +1002,7 @@ class MonitorBot:
             logger.error(f"Erro ao enviar mensagem de startup: {e}")
 
         offset = None
-        url = f"https://api.telegram.org/bot{self.token}/getUpdates"
+        url = f"{self.api_base}/getUpdates"
         
         while True:
             try:
@@ -520,6 +1011,12 @@ class MonitorBot:
                     params["offset"] = offset
                 
                 r = requests.get(url, params=params, timeout=60)
+                if r.status_code == 429:
+                    # Só esta thread espera: os comandos em andamento seguem nos pools
+                    retry_after = self._retry_after(r)
+                    logger.warning(f"Telegram 429 em getUpdates: aguardando {retry_after}s")
+                    time.sleep(retry_after)
+                    continue
                 r.raise_for_status()
                 data = r.json()
                 
@@ -0,0 +1,172 @@
+import logging
+import time
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Mapping, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+GRAM = 2               # Bigramas de "^CALL$" (as bordas contam: prefixo e sufixo pesam mais)
+MIN_DICE = 0.25        # Pré-filtro pelos n-gramas em comum
+MIN_SIMILARITY = 0.6   # Similaridade mínima do resultado final (difflib, tolera letras trocadas)
+MAX_CANDIDATES = 50    # Candidatos reavaliados com difflib
+
+QSOKey = Tuple[str, ...]
+
+
+def base_call(call: str) -> str:
+    """
+    Indicativo base, sem designadores de portátil / móvel nem prefixos de operação fora da
+    área: "PY2XX/P" -> "PY2XX", "PY2/W1AW" -> "W1AW", "CT3/PY2XX/M" -> "PY2XX".
+    Entre as partes separadas por "/", fica a mais longa com letra e algarismo.
+    """
+    call = call.strip().upper()
+    if "/" not in call:
+        return call
+    parts = [p for p in call.split("/") if p]
+    calls = [p for p in parts if len(p) >= 3 and any(c.isdigit() for c in p) and any(c.isalpha() for c in p)]
+    if not calls:
+        return parts[0] if parts else call
+    return max(calls, key=len)
+
+
+def call_grams(base: str) -> Set[str]:
+    padded = f"^{base}$"
+    return {padded[i:i + GRAM] for i in range(max(1, len(padded) - GRAM + 1))}
+
+
+class CallIndex:
+    """
+    Índice de busca aproximada de indicativos sobre as chaves do qso_cache.
+
+    Guarda, por indicativo como registrado, as chaves dos seus QSOs; por indicativo base
+    (base_call), as variantes registradas; e, por bigrama do indicativo base, os indicativos
+    base que o contêm (postings). Uma busca junta os postings dos bigramas da consulta,
+    pré-filtra pelo coeficiente de Dice e reordena os melhores candidatos pela similaridade
+    do difflib, então "PY2XX/P", "PY2/PY2XX" e "PY2XZ" encontram "PY2XX".
+
+    Não é persistido: é montado no load a partir das chaves do cache (que já trazem o CALL,
+    sem decodificar os registros) e atualizado pelo Storage a cada QSO inserido ou removido.
+    Copy-on-write como os demais motores (ver copy_state): tuplas são substituídas, e cada
+    conjunto de postings é copiado uma vez por escritor antes da primeira alteração.
+    """
+
+    def __init__(self, keys: Dict[str, Tuple[QSOKey, ...]] = None, bases: Dict[str, Tuple[str, ...]] = None,
+                 grams: Dict[str, Set[str]] = None):
+        self.keys = keys if keys is not None else {}       # indicativo -> chaves dos QSOs
+        self.bases = bases if bases is not None else {}    # indicativo base -> variantes registradas
+        self.grams = grams if grams is not None else {}    # bigrama -> indicativos base
+        self._owned_grams: Set[str] = set()                # postings já copiados por este escritor
+
+    @classmethod
+    def build(cls, keys: Iterable[QSOKey], call_idx: int = 0) -> "CallIndex":
+        """Monta o índice a partir das chaves do cache (CALL na posição `call_idx`)."""
+        t0 = time.perf_counter()
+        by_call: Dict[str, List[QSOKey]] = {}
+        for key in keys:
+            by_call.setdefault(key[call_idx], []).append(key)
+        bases: Dict[str, List[str]] = {}
+        for call in by_call:
+            bases.setdefault(base_call(call), []).append(call)
+        grams: Dict[str, Set[str]] = {}
+        for base in bases:
+            for g in call_grams(base):
+                grams.setdefault(g, set()).add(base)
+        index = cls({c: tuple(k) for c, k in by_call.items()}, {b: tuple(c) for b, c in bases.items()}, grams)
+        index._owned_grams = set(grams)
+        logger.debug(f"Índice de indicativos: {len(by_call)} indicativos em {time.perf_counter() - t0:.3f}s")
+        return index
+
+    def copy_state(self) -> "CallIndex":
+        """Cópia para um novo escritor: copia os dicts, compartilha tuplas e postings."""
+        return CallIndex(dict(self.keys), dict(self.bases), dict(self.grams))
+
+    def _posting(self, gram: str) -> Set[str]:
+        if gram not in self._owned_grams:
+            self.grams[gram] = set(self.grams.get(gram, ()))
+            self._owned_grams.add(gram)
+        return self.grams[gram]
+
+    def add(self, call: str, key: QSOKey):
+        known = self.keys.get(call)
+        self.keys[call] = (known or ()) + (key,)
+        if known:
+            return
+        base = base_call(call)
+        variants = self.bases.get(base)
+        self.bases[base] = (variants or ()) + (call,)
+        if not variants:
+            for g in call_grams(base):
+                self._posting(g).add(base)
+
+    def remove(self, call: str, key: QSOKey):
+        known = self.keys.get(call)
+        if not known or key not in known:
+            return
+        rest = tuple(k for k in known if k != key)
+        if rest:
+            self.keys[call] = rest
+            return
+        del self.keys[call]
+        base = base_call(call)
+        variants = tuple(c for c in self.bases.get(base, ()) if c != call)
+        if variants:
+            self.bases[base] = variants
+            return
+        self.bases.pop(base, None)
+        for g in call_grams(base):
+            posting = self._posting(g)
+            posting.discard(base)
+            if not posting:
+                del self.grams[g]
+                self._owned_grams.discard(g)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """[(indicativo base, similaridade 0..1)] mais parecidos com `query`, do melhor ao pior."""
+        base = base_call(query)
+        if not base:
+            return []
+        shared: Dict[str, int] = {}
+        for g in call_grams(base):
+            for candidate in self.grams.get(g, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        # Dice com o número de posições de n-grama (len + 3 - GRAM) no lugar do conjunto: evita
+        # recalcular os n-gramas de cada candidato (n-gramas repetidos só baixam a nota)
+        size = len(base) + 3 - GRAM
+        scored = []
+        for candidate, n in shared.items():
+            dice = 2 * n / (size + len(candidate) + 3 - GRAM)
+            if dice >= MIN_DICE:
+                scored.append((dice, candidate))
+        scored.sort(reverse=True)
+
+        results = []
+        for _dice, candidate in scored[:MAX_CANDIDATES]:
+            similarity = 1.0 if candidate == base else SequenceMatcher(None, base, candidate).ratio()
+            if similarity >= MIN_SIMILARITY:
+                results.append((candidate, similarity))
+        results.sort(key=lambda r: (-r[1], r[0]))
+        return results[:limit]
+
+    def matches(self, query: str, cache: Mapping[QSOKey, Any], limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Resultados de search() com os QSOs de cada indicativo base (todas as variantes):
+        [{"base", "score", "calls", "qsos" (mais recentes primeiro), "grids", "confirmed_grids",
+        "confirmed"}].
+        """
+        results = []
+        for base, score in self.search(query, limit):
+            calls = sorted(self.bases.get(base, ()))
+            qsos = [cache[k] for c in calls for k in self.keys.get(c, ()) if k in cache]
+            qsos.sort(key=lambda q: q.when, reverse=True)
+            grids = sorted({g for q in qsos for g in q.grids})
+            confirmed_grids = sorted({g for q in qsos if q.confirmed for g in q.grids})
+            results.append({
+                "base": base,
+                "score": score,
+                "calls": calls,
+                "qsos": qsos,
+                "grids": grids,
+                "confirmed_grids": confirmed_grids,
+                "confirmed": any(q.confirmed for q in qsos),
+            })
+        return results
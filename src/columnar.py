@@ -0,0 +1,390 @@
+"""
+Formato binário compacto do estado (alternativa ao state.json).
+
+Layout do arquivo (little-endian):
+
+    MAGIC (8s) | versão (u32) | offset do índice (u64) | tamanho do índice (u32) | blocos... | índice JSON
+
+O índice (no fim, para ser gravado depois dos blocos) aponta (offset, tamanho)
+de cada bloco, alinhado a 8 bytes:
+  - "meta": JSON compacto com tudo que não é `qso_cache` (known_grids, awards, datas...);
+  - "columns": uma coluna por tag ADIF, codificada por dicionário:
+        dict  = valores distintos separados por \\0 (UTF-8)
+        codes = array de inteiros (B/H/I conforme o tamanho do dicionário), 0 = campo ausente.
+
+A leitura faz mmap do arquivo e só decodifica o que for acessado: os arrays de códigos
+são memoryviews sobre o mmap (sem cópia) e o dicionário de cada coluna só é
+decodificado no primeiro acesso àquela coluna. As chaves do qso_cache não são gravadas:
+são remontadas a partir das colunas de `key_fields` (CALL, QSO_DATE, TIME_ON, BAND).
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .qso import extract_grids, qso_timestamp
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LTWSTATE"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIQI")
+_SEP = b"\0"
+
+
+def _typecode(size: int) -> str:
+    """Menor tipo de array que comporta códigos 0..size."""
+    for code in ("B", "H", "I"):
+        if size < 256 ** array(code).itemsize:
+            return code
+    return "Q"
+
+
+def _json_default(obj):
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"Objeto não serializável: {type(obj).__name__}")
+
+
+def is_binary_state(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class ColumnarStore:
+    """Leitura preguiçosa de um arquivo de estado binário via mmap."""
+
+    def __init__(self, path: Path, key_fields: Tuple[str, ...]):
+        self.path = path
+        self.key_fields = key_fields
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, toc_offset, toc_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} não é um estado binário do LoTW Monitor")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Versão de estado binário não suportada: {version}")
+        self._toc = json.loads(self._mm[toc_offset:toc_offset + toc_len])
+        self.rows: int = self._toc["rows"]
+        self.fields: List[str] = list(self._toc["columns"])
+        self._view = memoryview(self._mm)
+        self._codes: Dict[str, memoryview] = {}
+        self._dicts: Dict[str, List[Optional[str]]] = {}
+        self._keys: Optional[List[Tuple[str, ...]]] = None
+        self._index: Optional[Dict[str, int]] = None
+
+    def _block(self, ref) -> memoryview:
+        offset, length = ref[0], ref[1]
+        return self._view[offset:offset + length]
+
+    def meta(self) -> Dict[str, Any]:
+        return json.loads(bytes(self._block(self._toc["meta"])))
+
+    @property
+    def keys(self) -> List[Tuple[str, ...]]:
+        """Chave (tupla dos campos de `key_fields`, "" se ausente) de cada linha."""
+        if self._keys is None:
+            parts = []
+            for field in self.key_fields:
+                codes, values = self._column(field)
+                if codes is None:
+                    parts.append([""] * self.rows)
+                else:
+                    values = [""] + values[1:]
+                    parts.append([values[c] for c in codes])
+            self._keys = list(zip(*parts)) if self.rows else []
+        return self._keys
+
+    def row_of(self, key: Tuple[str, ...]) -> Optional[int]:
+        if self._index is None:
+            self._index = {k: i for i, k in enumerate(self.keys)}
+        return self._index.get(key)
+
+    def _column(self, field: str):
+        codes = self._codes.get(field)
+        if codes is None:
+            col = self._toc["columns"].get(field)
+            if col is None:
+                return None, None
+            blob = bytes(self._block(col["dict"]))
+            # Posição 0 reservada para "campo ausente". O dicionário entra antes dos códigos:
+            # leitores concorrentes testam só _codes e não podem ver uma coluna sem dicionário
+            self._dicts[field] = [None] + blob.decode("utf-8").split("\0")
+            codes = self._codes[field] = self._block(col["codes"]).cast(col["type"])
+        return codes, self._dicts[field]
+
+    def value(self, field: str, row: int) -> Optional[str]:
+        codes, values = self._column(field)
+        if codes is None:
+            return None
+        return values[codes[row]]
+
+    def fields_of(self, row: int) -> List[str]:
+        return [f for f in self.fields if self._column(f)[0][row]]
+
+
+class LazyQSO(Mapping):
+    """Linha do qso_cache que decodifica cada campo só quando é lido. Compatível com dict.get()."""
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: ColumnarStore, row: int):
+        self._store = store
+        self._row = row
+
+    def get(self, field, default=None):
+        value = self._store.value(field, self._row)
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        value = self._store.value(field, self._row)
+        if value is None:
+            raise KeyError(field)
+        return value
+
+    def __contains__(self, field):
+        return self._store.value(field, self._row) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.fields_of(self._row))
+
+    def __len__(self) -> int:
+        return len(self._store.fields_of(self._row))
+
+    # Mesmos campos normalizados do QSO (calculados no acesso, a linha não guarda estado)
+
+    @property
+    def confirmed(self) -> bool:
+        return self.get("QSL_RCVD", "").upper() == "Y"
+
+    @property
+    def grids(self) -> Tuple[str, ...]:
+        return extract_grids(self)
+
+    @property
+    def is_sat(self) -> bool:
+        return self.get("PROP_MODE", "").upper() == "SAT" or bool(self.get("SAT_NAME"))
+
+    @property
+    def when(self) -> int:
+        return qso_timestamp(self)
+
+    @property
+    def sat(self) -> str:
+        return self.get("SAT_NAME", "").upper()
+
+    @property
+    def call(self) -> str:
+        return self.get("CALL", "")
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"LazyQSO({dict(self)!r})"
+
+
+class LazyQSOCache(MutableMapping):
+    """
+    qso_cache apoiado no arquivo binário: leituras vêm do mmap (LazyQSO),
+    escritas ficam numa camada de sobreposição em memória até o próximo save.
+    """
+
+    def __init__(self, store: ColumnarStore):
+        self._store = store
+        self._overlay: Dict[str, Any] = {}
+        self._deleted: Set[str] = set()
+
+    def copy(self) -> "LazyQSOCache":
+        """Cópia rasa: compartilha o arquivo (somente leitura), duplica a sobreposição."""
+        clone = LazyQSOCache(self._store)
+        clone._overlay = dict(self._overlay)
+        clone._deleted = set(self._deleted)
+        return clone
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted:
+            raise KeyError(key)
+        row = self._store.row_of(key)
+        if row is None:
+            raise KeyError(key)
+        return LazyQSO(self._store, row)
+
+    def __setitem__(self, key, value):
+        self._overlay[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key in self._overlay:
+            del self._overlay[key]
+            if self._store.row_of(key) is not None:
+                self._deleted.add(key)
+        elif key not in self._deleted and self._store.row_of(key) is not None:
+            self._deleted.add(key)
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self._overlay:
+            return True
+        return key not in self._deleted and self._store.row_of(key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self._store.keys:
+            if key not in self._deleted or key in self._overlay:
+                yield key
+        for key in self._overlay:
+            if self._store.row_of(key) is None:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def values(self):
+        # Caminho rápido: evita a busca por chave para as linhas intocadas
+        overlay, deleted, store = self._overlay, self._deleted, self._store
+        for row, key in enumerate(store.keys):
+            if key in overlay:
+                yield overlay[key]
+            elif key not in deleted:
+                yield LazyQSO(store, row)
+        for key, value in overlay.items():
+            if store.row_of(key) is None:
+                yield value
+
+    def items(self):
+        overlay, deleted, store = self._overlay, self._deleted, self._store
+        for row, key in enumerate(store.keys):
+            if key in overlay:
+                yield key, overlay[key]
+            elif key not in deleted:
+                yield key, LazyQSO(store, row)
+        for key, value in overlay.items():
+            if store.row_of(key) is None:
+                yield key, value
+
+
+def read_state(path: Path, key_fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """Carrega o estado binário: metadados decodificados, qso_cache preguiçoso sobre o mmap."""
+    store = ColumnarStore(path, key_fields)
+    data = store.meta()
+    data["qso_cache"] = LazyQSOCache(store)
+    return data
+
+
+def read_cache(path: Path, key_fields: Tuple[str, ...]) -> LazyQSOCache:
+    """Só o qso_cache preguiçoso de um estado binário (sem decodificar os metadados)."""
+    return LazyQSOCache(ColumnarStore(path, key_fields))
+
+
+class _ColumnBuilder:
+    """Acumula colunas codificadas por dicionário, linha a linha ou a partir de colunas prontas."""
+
+    def __init__(self):
+        self.mappings: Dict[str, Dict[str, int]] = {}  # campo -> {valor: código}
+        self.codes: Dict[str, array] = {}
+
+    def seed(self, field: str, values: List[Optional[str]], codes):
+        # Reaproveita dicionário e códigos de um arquivo anterior (mesmos códigos, sem recodificar)
+        self.mappings[field] = {v: i for i, v in enumerate(values) if i}
+        self.codes[field] = array("I", codes)
+
+    def put(self, row: int, qso, overwrite: bool = False):
+        if overwrite:
+            for col in self.codes.values():
+                if len(col) > row:
+                    col[row] = 0
+        for field in qso:
+            value = qso[field]
+            mapping = self.mappings.get(field)
+            if mapping is None:
+                mapping = self.mappings[field] = {}
+                self.codes[field] = array("I")
+            code = mapping.get(value)
+            if code is None:
+                code = mapping[value] = len(mapping) + 1
+            col = self.codes[field]
+            if len(col) > row:
+                col[row] = code
+            else:
+                if len(col) < row:
+                    col.extend([0] * (row - len(col)))  # linhas anteriores sem o campo
+                col.append(code)
+
+
+def write_state(path: Path, data: Dict[str, Any]):
+    """
+    Grava o estado no formato colunar. A escrita é atômica (arquivo temporário + rename),
+    o que mantém válido o mmap de quem ainda estiver lendo o arquivo anterior.
+    """
+    cache = data.get("qso_cache", {})
+    meta = {k: v for k, v in data.items() if k != "qso_cache"}
+
+    columns = _ColumnBuilder()
+    keys: List[Tuple[str, ...]] = []
+    if isinstance(cache, LazyQSOCache):
+        # Linhas intocadas desde o último load: copia as colunas inteiras do mmap
+        store, overlay, deleted = cache._store, cache._overlay, cache._deleted
+        kept = [row for row, key in enumerate(store.keys) if key not in deleted or key in overlay]
+        for field in store.fields:
+            codes, values = store._column(field)
+            columns.seed(field, values, codes if len(kept) == store.rows else (codes[r] for r in kept))
+        keys = [store.keys[r] for r in kept]
+        for row, key in enumerate(keys):
+            if key in overlay:
+                columns.put(row, overlay[key], overwrite=True)
+        for key, qso in overlay.items():
+            if store.row_of(key) is None:
+                columns.put(len(keys), qso)
+                keys.append(key)
+    else:
+        for row, (key, qso) in enumerate(cache.items()):
+            keys.append(key)
+            columns.put(row, qso)
+    rows = len(keys)
+    fields, codes = columns.mappings, columns.codes
+
+    blocks: List[bytes] = []
+    toc: Dict[str, Any] = {"rows": rows, "columns": {}}
+    offset = _HEADER.size
+
+    def add(blob: bytes):
+        nonlocal offset
+        ref = [offset, len(blob)]
+        pad = -len(blob) % 8
+        blocks.append(blob + b"\0" * pad)
+        offset += len(blob) + pad
+        return ref
+
+    toc["meta"] = add(json.dumps(meta, ensure_ascii=False, separators=(",", ":"),
+                                 default=_json_default).encode("utf-8"))
+    for field, mapping in fields.items():
+        col = codes[field]
+        col.extend([0] * (rows - len(col)))
+        typecode = _typecode(len(mapping))
+        toc["columns"][field] = {
+            "dict": add(_SEP.join(str(v).encode("utf-8") for v in mapping)),
+            "codes": add(array(typecode, col).tobytes()),
+            "type": typecode,
+        }
+    toc_blob = json.dumps(toc, separators=(",", ":")).encode("utf-8")
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, offset, len(toc_blob)))
+        for blob in blocks:
+            f.write(blob)
+        f.write(toc_blob)
+    os.replace(tmp, path)
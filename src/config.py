@@ -1,9 +1,8 @@
 import os
+from functools import cached_property
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Dict, Set, Tuple
 
-# Carrega variáveis do arquivo .env se existir
-load_dotenv()
 
 def _get_required_env(key: str) -> str:
     val = os.getenv(key)
@@ -11,19 +10,124 @@ def _get_required_env(key: str) -> str:
         raise ValueError(f"A variável de ambiente obrigatória '{key}' não está definida.")
     return val
 
-class Config:
-    TELEGRAM_BOT_TOKEN = _get_required_env("TELEGRAM_BOT_TOKEN")
-    TELEGRAM_CHAT_ID = _get_required_env("TELEGRAM_CHAT_ID")
-    
-    LOTW_USERNAME = _get_required_env("LOTW_USERNAME")
-    LOTW_PASSWORD = _get_required_env("LOTW_PASSWORD")
-    
+
+class _Config:
+    """
+    Configuração resolvida sob demanda.
+    Importar este módulo não lê o .env, não valida nada e não cria diretórios:
+    cada atributo só é resolvido (e validado) no primeiro acesso.
+    """
+
+    def __init__(self):
+        self._dotenv_loaded = False
+
+    def _env(self, key: str, default=None):
+        # Carrega variáveis do arquivo .env (se existir) apenas uma vez, no primeiro uso
+        if not self._dotenv_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            self._dotenv_loaded = True
+        return os.getenv(key, default)
+
+    def _required(self, key: str) -> str:
+        self._env(key)
+        return _get_required_env(key)
+
+    @cached_property
+    def TELEGRAM_BOT_TOKEN(self) -> str:
+        return self._required("TELEGRAM_BOT_TOKEN")
+
+    @cached_property
+    def TELEGRAM_CHAT_ID(self) -> str:
+        return self._required("TELEGRAM_CHAT_ID")
+
+    @cached_property
+    def LOTW_USERNAME(self) -> str:
+        return self._required("LOTW_USERNAME")
+
+    @cached_property
+    def LOTW_PASSWORD(self) -> str:
+        return self._required("LOTW_PASSWORD")
+
+    @cached_property
+    def MY_GRIDSQUARE(self) -> str:
+        # Opcional: locator da estação (senão é deduzido do MY_GRIDSQUARE dos QSOs)
+        return (self._env("MY_GRIDSQUARE") or "").strip().upper()
+
+    # URLs base dos serviços externos (sobrescrevíveis para testes de carga com servidores locais)
+    @cached_property
+    def LOTW_URL(self) -> str:
+        return self._env("LOTW_URL") or ""
+
+    @cached_property
+    def TELEGRAM_API_URL(self) -> str:
+        return (self._env("TELEGRAM_API_URL") or "https://api.telegram.org").rstrip("/")
+
+    @cached_property
+    def METRICS_PORT(self) -> int:
+        # Porta local do endpoint Prometheus /metrics (0 ou vazio = desativado)
+        return int(self._env("METRICS_PORT") or 0)
+
+    @cached_property
+    def STATE_FORMAT(self) -> str:
+        # "json" (padrão, legível) ou "binary" (colunar, mmap, leitura preguiçosa)
+        return (self._env("STATE_FORMAT") or "json").strip().lower()
+
+    @cached_property
+    def LABEL_POLICY(self) -> str:
+        # Indicativo exibido em cada grid do mapa: latest (padrão), first ou most_frequent
+        return (self._env("LABEL_POLICY") or "latest").strip().lower()
+
+    @cached_property
+    def PROFILE_COMMANDS(self) -> Set[str]:
+        # Comandos sempre perfilados (ex.: "stats,map,sync"); vazio = só via /profile
+        raw = self._env("PROFILE_COMMANDS") or ""
+        return {c.strip().lstrip("/").lower() for c in raw.split(",") if c.strip()}
+
+    @cached_property
+    def PROFILE_KEEP(self) -> int:
+        # Quantos perfis manter em data/profiles/
+        return int(self._env("PROFILE_KEEP") or 20)
+
+    @cached_property
+    def SYNC_WORKED(self) -> bool:
+        # Também baixa os QSOs não confirmados (camada "trabalhado" do /map e do /check)
+        return (self._env("SYNC_WORKED") or "true").lower() not in ("0", "false", "no", "off")
+
+    @cached_property
+    def RECONCILE_MONTHS(self) -> int:
+        # Meses conferidos por /reconcile sem argumento (rodízio dos conferidos há mais tempo)
+        return int(self._env("RECONCILE_MONTHS") or 12)
+
+    @cached_property
+    def NEEDED_RADIUS_KM(self) -> float:
+        # Raio padrão do /needed sem argumento de distância
+        return float(self._env("NEEDED_RADIUS_KM") or 1000)
+
+    @cached_property
+    def SYNC_BATCH_SIZE(self) -> int:
+        # Registros por lote no pipeline de sync (memória transitória ~ proporcional a isso)
+        return int(self._env("SYNC_BATCH_SIZE") or 1000)
+
+    @cached_property
+    def COMMAND_POOLS(self) -> Dict[str, Tuple[int, int]]:
+        # Workers e fila máxima por classe de custo dos comandos (ex.: "cheap=4:256,cpu=1:8,network=2:16")
+        from .dispatcher import parse_pools
+        return parse_pools(self._env("COMMAND_POOLS") or "")
+
     # Caminho base: Diretório atual de execução (CWD)
     # Isso permite rodar múltiplas instâncias em pastas diferentes usando o mesmo código.
-    BASE_DIR = Path.cwd()
-    
-    # Arquivo de estado padrão: <cwd>/data/state.json
-    STATE_FILE = Path(os.getenv("STATE_FILE", BASE_DIR / "data" / "state.json"))
+    @cached_property
+    def BASE_DIR(self) -> Path:
+        return Path.cwd()
+
+    @cached_property
+    def STATE_FILE(self) -> Path:
+        # Arquivo de estado padrão: <cwd>/data/state.json
+        path = Path(self._env("STATE_FILE", self.BASE_DIR / "data" / "state.json"))
+        # Garante que o diretório de dados exista (só quando alguém realmente precisa dele)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
 
-    # Garante que o diretório de dados exista
-    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+Config = _Config()
@@ -0,0 +1,126 @@
+import logging
+from hashlib import blake2b as _blake2b
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIGEST_STATE_VERSION = 1
+
+# Campos que entram no digest: os que o LoTW devolve mesmo sem qso_qsldetail/qso_mydetail,
+# para que o digest local (registros completos) e o remoto (fatias leves) sejam comparáveis
+DIGEST_FIELDS = ("CALL", "QSO_DATE", "TIME_ON", "BAND", "MODE")
+
+Digest = Tuple[int, int]  # (quantidade de QSOs, XOR dos hashes)
+
+
+def _is_confirmed(qso: Mapping) -> bool:
+    return (qso.get("QSL_RCVD", "") or "").upper() == "Y"
+
+
+def record_hash(qso: Mapping, confirmed: bool) -> int:
+    """Hash de 64 bits de um QSO (DIGEST_FIELDS + status de confirmação)."""
+    get = qso.get
+    # Mesmos campos de DIGEST_FIELDS, sem laço (roda uma vez por QSO mesclado)
+    text = (f"{get('CALL', '')}|{get('QSO_DATE', '')}|{get('TIME_ON', '')}|{get('BAND', '')}|"
+            f"{get('MODE', '')}|{'Y' if confirmed else 'N'}")
+    return int.from_bytes(_blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def month_of(qso: Mapping) -> str:
+    """YYYYMM do QSO_DATE."""
+    return (qso.get("QSO_DATE", "") or "")[:6]
+
+
+def compute(records: Iterable[Mapping], confirmed_only: bool = False) -> Dict[str, Digest]:
+    """Digests por mês de uma sequência de registros (ex.: uma fatia baixada do LoTW)."""
+    digests: Dict[str, List[int]] = {}
+    for qso in records:
+        confirmed = _is_confirmed(qso)
+        if confirmed_only and not confirmed:
+            continue
+        d = digests.setdefault(month_of(qso), [0, 0])
+        d[0] += 1
+        d[1] ^= record_hash(qso, confirmed)
+    return {m: (d[0], d[1]) for m, d in digests.items()}
+
+
+class MonthDigests:
+    """
+    Digest incremental do cache de QSOs, por mês (QSO_DATE).
+
+    Vive dentro do estado (chave "month_digests") e é atualizado pelo Storage a cada QSO
+    inserido, alterado ou removido. O digest de um mês é (quantidade, XOR dos hashes dos
+    QSOs), o que permite somar e subtrair registros sem varrer o log; guarda-se um para
+    todos os QSOs e outro só para os confirmados. Também registra quando cada mês foi
+    conferido com o LoTW pela última vez ("checked").
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        if state.get("version") != DIGEST_STATE_VERSION:
+            self.reset()
+
+    def reset(self):
+        checked = self.state.get("checked", {})
+        self.state.clear()
+        self.state.update({"version": DIGEST_STATE_VERSION, "months": {}, "checked": checked})
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.state["months"]
+
+    def _apply(self, qso: Mapping, sign: int):
+        months = self.state["months"]
+        month = month_of(qso)
+        # [n, xor, n confirmados, xor confirmados]; substituído, nunca alterado no lugar (ver copy_state)
+        d = list(months.get(month, (0, 0, 0, 0)))
+        confirmed = _is_confirmed(qso)
+        h = record_hash(qso, confirmed)
+        d[0] += sign
+        d[1] ^= h
+        if confirmed:
+            d[2] += sign
+            d[3] ^= h
+        if d[0] > 0:
+            months[month] = d
+        else:
+            months.pop(month, None)
+
+    def add(self, qso: Mapping):
+        self._apply(qso, 1)
+
+    def remove(self, qso: Mapping):
+        self._apply(qso, -1)
+
+    def copy_state(self) -> Dict[str, Any]:
+        """Cópia do estado para um novo escritor: copia os dicts, compartilha as entradas."""
+        state = dict(self.state)
+        state["months"] = dict(self.state["months"])
+        state["checked"] = dict(self.state["checked"])
+        return state
+
+    def rebuild(self, qsos: Iterable[Mapping]):
+        """Recalcula a partir dos registros. Usado na migração."""
+        self.reset()
+        for qso in qsos:
+            self.add(qso)
+
+    def digests(self, confirmed_only: bool = False) -> Dict[str, Digest]:
+        """{YYYYMM: (n, xor)} de todos os meses com QSOs no cache."""
+        i = 2 if confirmed_only else 0
+        return {m: (d[i], d[i + 1]) for m, d in self.state["months"].items() if d[i]}
+
+    def months(self) -> List[str]:
+        return sorted(self.state["months"])
+
+    def mark_checked(self, months: Iterable[str], when: str):
+        checked = self.state["checked"]
+        for m in months:
+            checked[m] = when
+
+    def least_recently_checked(self, limit: int) -> List[str]:
+        """Meses do cache conferidos há mais tempo (nunca conferidos primeiro; recentes antes)."""
+        checked = self.state["checked"]
+        ordered = sorted(self.months(), reverse=True)
+        ordered.sort(key=lambda m: checked.get(m, ""))
+        return ordered[:limit]
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Classes de custo dos comandos do bot
+CHEAP = "cheap"      # Respostas rápidas (consultas ao snapshot, enfileirar sync)
+CPU = "cpu"          # Renderização de mapa, estatísticas, previsão de passagens
+NETWORK = "network"  # Esperam serviços externos (ex.: download de TLE)
+COSTS = (CHEAP, CPU, NETWORK)
+
+# classe -> (workers, fila máxima além dos workers)
+# CPU com um worker: renderizações em paralelo só disputariam o GIL e dobrariam o pico de memória
+DEFAULT_POOLS: Dict[str, Tuple[int, int]] = {CHEAP: (4, 256), CPU: (1, 8), NETWORK: (2, 16)}
+
+QUEUE_SECONDS = "lotw_monitor_command_queue_seconds"
+
+
+def parse_pools(raw: str) -> Dict[str, Tuple[int, int]]:
+    """
+    "cheap=4:256,cpu=1:4" -> {classe: (workers, fila)}; classes omitidas ficam no padrão.
+    """
+    pools = dict(DEFAULT_POOLS)
+    for item in raw.split(","):
+        if not item.strip():
+            continue
+        try:
+            cost, spec = item.split("=", 1)
+            workers, depth = spec.split(":", 1)
+            cost = cost.strip().lower()
+            if cost not in COSTS:
+                raise ValueError
+            pools[cost] = (max(1, int(workers)), max(0, int(depth)))
+        except ValueError:
+            raise ValueError(f"COMMAND_POOLS inválido: {item!r} (use classe=workers:fila, classes {', '.join(COSTS)})")
+    return pools
+
+
+class _Pool:
+    def __init__(self, cost: str, workers: int, depth: int):
+        self.cost = cost
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"cmd-{cost}")
+        # Vagas = em execução + na fila; sem vaga o comando é recusado na hora
+        self.slots = threading.Semaphore(workers + depth)
+
+
+class CommandDispatcher:
+    """
+    Executa os comandos do bot fora da thread de polling, num pool por classe de custo.
+
+    Cada classe tem seus próprios workers e um limite de fila: um /map demorado ocupa só o
+    pool "cpu", e um /check continua respondendo no pool "cheap" sem esperar por ele. Quando
+    a fila de uma classe está cheia, submit() recusa o comando (quem chama avisa o usuário)
+    em vez de acumular trabalho sem limite.
+    """
+
+    def __init__(self, pools: Dict[str, Tuple[int, int]] = None):
+        pools = pools or DEFAULT_POOLS
+        self._pools = {cost: _Pool(cost, workers, depth) for cost, (workers, depth) in pools.items()}
+
+    def submit(self, cost: str, fn: Callable, *args) -> bool:
+        """Agenda fn(*args) no pool da classe `cost`. Retorna False se a fila estiver cheia."""
+        pool = self._pools.get(cost) or self._pools[CHEAP]
+        if not pool.slots.acquire(blocking=False):
+            REGISTRY.inc("lotw_monitor_commands_rejected_total", 1, "Comandos recusados por fila cheia",
+                         cost=pool.cost)
+            return False
+        queued_at = time.perf_counter()
+
+        def run():
+            REGISTRY.observe(QUEUE_SECONDS, time.perf_counter() - queued_at,
+                             "Espera na fila do dispatcher por classe de custo", cost=pool.cost)
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.exception(f"Erro no comando ({pool.cost}): {e}")
+            finally:
+                pool.slots.release()
+
+        pool.executor.submit(run)
+        return True
+
+    def shutdown(self, wait: bool = True):
+        for pool in self._pools.values():
+            pool.executor.shutdown(wait=wait)
@@ -0,0 +1,79 @@
+import logging
+from typing import Any, Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+LABEL_STATE_VERSION = 1
+
+# Políticas de rótulo (indicativo exibido em cada grid do mapa)
+LATEST = "latest"                 # QSO confirmado mais recente
+FIRST = "first"                   # Primeiro QSO confirmado
+MOST_FREQUENT = "most_frequent"   # Indicativo com mais QSOs confirmados no grid
+POLICIES = (LATEST, FIRST, MOST_FREQUENT)
+
+
+class GridLabelIndex:
+    """
+    Índice incremental de indicativos por grid confirmado.
+
+    Vive dentro do estado (chave "grid_labels") e é atualizado QSO a QSO pelo
+    Storage.merge_qsos. Para cada grid guarda, por indicativo, [contagem, primeiro, último]
+    (data/hora como inteiro YYYYMMDDHHMMSS), o que atende às três políticas sem varrer o log.
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+        if state.get("version") != LABEL_STATE_VERSION:
+            self.reset()
+
+    def reset(self):
+        self.state.clear()
+        # "built": True após o primeiro rebuild (persistido: ver Storage.__init__)
+        self.state.update({"version": LABEL_STATE_VERSION, "built": False, "grids": {}})
+
+    @property
+    def is_built(self) -> bool:
+        """False em estado antigo ou de outra versão: precisa de um rebuild a partir do log."""
+        return bool(self.state.get("built"))
+
+    def add(self, call: str, when: int, grids: Iterable[str]):
+        """Registra um QSO confirmado."""
+        table = self.state["grids"]
+        for g in grids:
+            calls = table.setdefault(g, {})
+            entry = calls.get(call)
+            # Entradas são substituídas, nunca alteradas no lugar (ver copy_state)
+            if entry is None:
+                calls[call] = [1, when, when]
+            else:
+                calls[call] = [entry[0] + 1, min(entry[1], when), max(entry[2], when)]
+
+    def copy_state(self) -> Dict[str, Any]:
+        """Cópia do estado para um novo escritor: copia os dicts, compartilha as entradas."""
+        state = dict(self.state)
+        state["grids"] = {g: dict(calls) for g, calls in self.state["grids"].items()}
+        return state
+
+    def rebuild(self, qsos: Iterable):
+        """Recalcula a partir dos registros (QSO / LazyQSO). Usado na migração ou após alterações."""
+        self.reset()
+        for qso in qsos:
+            if qso.confirmed and qso.grids:
+                self.add(qso.call or "?", qso.when, qso.grids)
+        self.state["built"] = True
+
+    def labels(self, policy: str = LATEST) -> Dict[str, str]:
+        """{GRID: CALL} segundo a política escolhida."""
+        if policy == LATEST:
+            def score(item: Tuple[str, list]):
+                return item[1][2]
+        elif policy == FIRST:
+            def score(item: Tuple[str, list]):
+                return -item[1][1]
+        elif policy == MOST_FREQUENT:
+            def score(item: Tuple[str, list]):
+                return item[1][0], item[1][2]  # Empate: o mais recente
+        else:
+            raise ValueError(f"Política de rótulo inválida: {policy!r} (use {', '.join(POLICIES)})")
+
+        return {g: max(calls.items(), key=score)[0] for g, calls in self.state["grids"].items() if calls}
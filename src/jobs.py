@@ -0,0 +1,152 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tipos de job (todos alteram o estado: rodam um por vez, nunca no meio de um merge)
+SYNC = "sync"
+RECONCILE = "reconcile"
+FORGET = "forget"        # /forget: remove um grid e grava o estado
+
+# Resultado de SyncQueue.submit
+STARTED = "started"      # Fila vazia: o job começa agora
+QUEUED = "queued"        # Entrou na fila atrás de outro job
+JOINED = "joined"        # O job em execução já cobre o pedido
+MERGED = "merged"        # Um job na fila já cobre o pedido
+UPGRADED = "upgraded"    # O sync incremental na fila virou completo
+ABSORBED = "absorbed"    # A reconciliação do log inteiro tomou o lugar do sync incremental na fila
+
+
+class SyncJob:
+    """Um job pendente ou em execução e os chats que esperam o resultado dele."""
+
+    def __init__(self, kind: str, full: bool = False, months: Optional[List[str]] = None,
+                 grid: Optional[str] = None):
+        self.kind = kind
+        self.full = full
+        # Reconciliação: None = rodízio; [] = log inteiro; lista = só esses meses (ver parse_scope)
+        self.months = months
+        self.grid = grid
+        self.chat_ids: List[str] = []
+
+    def add_chat(self, chat_id: Optional[str]):
+        if chat_id and chat_id not in self.chat_ids:
+            self.chat_ids.append(chat_id)
+
+    def covers(self, kind: str, full: bool, months: Optional[List[str]], grid: Optional[str] = None) -> bool:
+        """True se rodar este job atende também ao pedido (kind, full, months)."""
+        if kind == SYNC and not full and self.kind == RECONCILE and self.months == []:
+            # Reconciliar o log inteiro confere todos os meses: QSLs novas mudam o digest do
+            # mês, que é baixado de novo e mesclado (com alerta dos grids inéditos)
+            return True
+        if kind != self.kind:
+            return False
+        if kind == SYNC:
+            return self.full or not full
+        if kind == FORGET:
+            return self.grid == grid
+        if self.months == [] or self.months == months:
+            return True
+        return bool(months) and bool(self.months) and set(months) <= set(self.months)
+
+    def __repr__(self):
+        return f"SyncJob({self.kind}, full={self.full}, months={self.months}, grid={self.grid}, chats={self.chat_ids})"
+
+
+class SyncQueue:
+    """
+    Fila dos jobs que alteram o estado (sync, reconciliação e /forget), executados um por vez
+    numa thread própria (criada quando chega trabalho e encerrada quando a fila esvazia).
+
+    Pedidos redundantes não geram downloads seguidos: um pedido coberto pelo job em execução
+    ou por um job na fila só acrescenta o chat à lista de espera (ver SyncJob.covers), e um
+    sync completo pedido com um incremental na fila transforma esse incremental em completo, e
+    uma reconciliação do log inteiro toma o lugar de um sync incremental na fila (e o cobre).
+    Um /forget só é agrupado com outro do mesmo grid: nunca é descartado.
+    Ao fim de cada job, `notify(chat_ids, resumo)` avisa todos os chats que esperavam por ele.
+
+    :param runner: executa um SyncJob e devolve o resumo para os chats (ou None).
+    :param notify: envia o resumo a cada chat.
+    """
+
+    def __init__(self, runner: Callable[[SyncJob], Optional[str]],
+                 notify: Callable[[List[str], str], None]):
+        self._runner = runner
+        self._notify = notify
+        self._lock = threading.Lock()
+        self._pending: Deque[SyncJob] = deque()
+        self._running: Optional[SyncJob] = None
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, kind: str, chat_id: Optional[str] = None, full: bool = False,
+               months: Optional[List[str]] = None, grid: Optional[str] = None) -> str:
+        """Enfileira (ou agrupa) um pedido. Retorna STARTED, QUEUED, JOINED, MERGED, UPGRADED ou ABSORBED."""
+        with self._lock:
+            if self._running is not None and self._running.covers(kind, full, months, grid):
+                self._running.add_chat(chat_id)
+                return JOINED
+            for job in self._pending:
+                if job.covers(kind, full, months, grid):
+                    job.add_chat(chat_id)
+                    return MERGED
+            if kind == SYNC and full:
+                for job in self._pending:
+                    if job.kind == SYNC:
+                        job.full = True
+                        job.add_chat(chat_id)
+                        logger.info(f"Sync na fila promovido a completo: {job}")
+                        return UPGRADED
+            if kind == RECONCILE and months == []:
+                for i, job in enumerate(self._pending):
+                    if job.kind == SYNC and not job.full:
+                        # Mesma posição na fila: quem esperava pelo sync não espera mais
+                        absorbed = self._pending[i] = SyncJob(kind, full, months, grid)
+                        for waiting in job.chat_ids + [chat_id]:
+                            absorbed.add_chat(waiting)
+                        logger.info(f"Sync na fila absorvido pela reconciliação: {absorbed}")
+                        return ABSORBED
+
+            job = SyncJob(kind, full, months, grid)
+            job.add_chat(chat_id)
+            self._pending.append(job)
+            busy = self._running is not None or len(self._pending) > 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, daemon=True, name="sync-queue")
+                self._worker.start()
+            return QUEUED if busy else STARTED
+
+    @property
+    def depth(self) -> int:
+        """Jobs na fila (sem contar o em execução)."""
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def running(self) -> Optional[SyncJob]:
+        return self._running
+
+    def _work(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._worker = None
+                    return
+                job = self._running = self._pending.popleft()
+            summary = None
+            try:
+                summary = self._runner(job)
+            except Exception as e:
+                logger.error(f"Erro no job {job}: {e}")
+                summary = f"❌ Erro: {e}"
+            finally:
+                # Fecha a lista de espera antes de avisar: pedidos daqui em diante geram outro job
+                with self._lock:
+                    self._running = None
+                    chat_ids = list(job.chat_ids)
+            if summary and chat_ids:
+                try:
+                    self._notify(chat_ids, summary)
+                except Exception as e:
+                    logger.error(f"Erro ao avisar {chat_ids}: {e}")
@@ -1,45 +1,158 @@
+import codecs
 import requests
 import re
 import logging
-from typing import List, Dict, Optional
+import time
+from typing import Iterator, List, Dict, Optional
 from .config import Config
+from .metrics import REGISTRY, STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Regex para capturar campos: <TAG:LEN>VALUE
+# Adicionei suporte a tipo opcional <TAG:LEN:TYPE>
+FIELD_PATTERN = re.compile(r"<([^:>]+):(\d+)(?::[^>]*)?>")
+EOR_PATTERN = re.compile(r"<eor>", re.IGNORECASE)
+
+# Consultas ao lotwreport.adi, cada uma com seu cursor incremental:
+#   qsl    -> confirmações (qso_qsl=yes), a partir de qso_qslsince
+#   worked -> todos os QSOs enviados ao LoTW (qso_qsl=no), a partir de qso_qsorxsince
+# "header" é a marca d'água no cabeçalho da resposta; "record" o campo equivalente por registro.
+QSL = "qsl"
+WORKED = "worked"
+QUERIES = {
+    QSL: {"qso_qsl": "yes", "since": "qso_qslsince", "header": "APP_LOTW_LASTQSL", "record": "APP_LOTW_RXQSL"},
+    WORKED: {"qso_qsl": "no", "since": "qso_qsorxsince", "header": "APP_LOTW_LASTQSORX", "record": "APP_LOTW_RXQSO"},
+}
+
+# Sem <EOH> depois disso, a resposta não é ADIF (ex.: página HTML de erro de login)
+MAX_HEADER_CHARS = 1024 * 1024
+
+
+def parse_record(chunk: str) -> Dict[str, str]:
+    """Campos de um registro ADIF (texto entre dois <EOR>)."""
+    fields = {}
+    pos = 0
+    while True:
+        match = FIELD_PATTERN.search(chunk, pos)
+        if not match:
+            break
+            
+        tag_name = match.group(1).upper()
+        length = int(match.group(2))
+        
+        # O valor começa logo após o fechamento da tag >
+        start_val = match.end()
+        value = chunk[start_val : start_val + length]
+        
+        fields[tag_name] = value.strip()
+        
+        # Avança a busca
+        pos = start_val + length
+    return fields
+
+
+def parse_header(header: str) -> Dict[str, str]:
+    """
+    Campos do cabeçalho ADIF (antes do <EOH>). O LoTW envia, entre outros:
+    APP_LOTW_LASTQSL (data/hora UTC da QSL mais recente do relatório) e APP_LOTW_NUMREC.
+    """
+    return parse_record(header)
+
+
+class AdifStreamParser:
+    """
+    Parser ADIF incremental: recebe o texto em pedaços (feed) e devolve cada registro assim
+    que o <EOR> correspondente chega. Só o registro incompleto fica em buffer.
+    """
+
+    def __init__(self):
+        self.header: Optional[str] = None
+        self._buf = ""
+
+    @property
+    def header_fields(self) -> Dict[str, str]:
+        return parse_header(self.header) if self.header else {}
+
+    def feed(self, text: str) -> Iterator[Dict[str, str]]:
+        self._buf += text
+        if self.header is None:
+            idx = self._buf.lower().find("<eoh>")
+            if idx == -1:
+                if len(self._buf) > MAX_HEADER_CHARS:
+                    raise RuntimeError("Fim do cabeçalho <EOH> não encontrado no ADIF.")
+                return
+            self.header = self._buf[:idx]
+            self._buf = self._buf[idx + 5:]
+
+        pos = 0
+        for match in EOR_PATTERN.finditer(self._buf):
+            fields = parse_record(self._buf[pos:match.start()])
+            if fields:
+                yield fields
+            pos = match.end()
+        self._buf = self._buf[pos:]
+
+    def close(self) -> Iterator[Dict[str, str]]:
+        """Fim do texto: processa o que sobrou após o último <EOR>."""
+        if self.header is None:
+            raise RuntimeError("Fim do cabeçalho <EOH> não encontrado no ADIF.")
+        fields = parse_record(self._buf)
+        self._buf = ""
+        if fields:
+            yield fields
+
+
 class LoTWClient:
     LOTW_URL = "https://lotw.arrl.org/lotwuser/lotwreport.adi"
 
-    def __init__(self):
-        self.username = Config.LOTW_USERNAME
-        self.password = Config.LOTW_PASSWORD
+    def __init__(self, username: Optional[str] = None, password: Optional[str] = None):
+        self.username = username if username is not None else Config.LOTW_USERNAME
+        self.password = password if password is not None else Config.LOTW_PASSWORD
+        # Permite apontar para um servidor local (ex.: benchmarks/fake_services.py)
+        self.url = Config.LOTW_URL or self.LOTW_URL
+        # Campos do cabeçalho da última resposta de cada consulta (ex.: APP_LOTW_LASTQSL)
+        self.last_headers: Dict[str, Dict[str, str]] = {}
+        # Bytes da última resposta completa de cada consulta
+        self.last_bytes: Dict[str, int] = {}
 
-    def fetch_adif(self, since: Optional[str] = None) -> str:
-        """
-        Baixa ADIF de confirmações (QSLs) - Usando parametros do user.
-        :param since: Data YYYY-MM-DD para trazer apenas novos.
-        """
+    def _params(self, since: Optional[str], query: str = QSL, detail: bool = True,
+                start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, str]:
+        spec = QUERIES[query]
         params = {
             "login": self.username,
             "password": self.password,
             "qso_query": "1",
-            "qso_qsl": "yes", # SIM, queremos apenas confirmados (user request rule)
-            "qso_qsldetail": "yes",
-            "qso_mydetail": "yes", # Necessário para pegar my_gridsquare (distance calc)
+            "qso_qsl": spec["qso_qsl"], # yes: apenas confirmados; no: todos (trabalhados)
+            "qso_qsldetail": "yes" if detail else "no",
+            "qso_mydetail": "yes" if detail else "no", # Necessário para pegar my_gridsquare (distance calc)
             "qso_owncall": self.username,
         }
+        # Intervalo de QSO_DATE (YYYY-MM-DD), usado nas fatias mensais da reconciliação
+        if start_date:
+            params["qso_startdate"] = start_date
+        if end_date:
+            params["qso_enddate"] = end_date
         
         # User requested logic:
         # if since: params["qso_qslsince"] = since
         # else: params["qso_qslsince"] = "1900-01-01"
         
         if since:
-            params["qso_qslsince"] = since
+            params[spec["since"]] = since
         else:
-            params["qso_qslsince"] = "1900-01-01"
-        
+            params[spec["since"]] = "1900-01-01"
+        return params
+
+    def fetch_adif(self, since: Optional[str] = None) -> str:
+        """
+        Baixa ADIF de confirmações (QSLs) - Usando parametros do user.
+        :param since: Data YYYY-MM-DD (ou marca d'água YYYY-MM-DD HH:MM:SS) para trazer apenas novos.
+        """
+        params = self._params(since)
         logger.info(f"Baixando ADIF do LoTW (since={params['qso_qslsince']})...")
         try:
-            resp = requests.get(self.LOTW_URL, params=params, timeout=120)  # timeout maior pois pode ser grande
+            resp = requests.get(self.url, params=params, timeout=120)  # timeout maior pois pode ser grande
             resp.raise_for_status()
         except requests.RequestException as e:
             logger.error(f"Erro na requisição ao LoTW: {e}")
@@ -53,54 +166,86 @@ class LoTWClient:
             
         return text
 
-    def parse_adif(self, adif_text: str) -> List[Dict[str, str]]:
+    def iter_qsos(self, since: Optional[str] = None, query: str = QSL, chunk_size: int = 64 * 1024,
+                  detail: bool = True, start_date: Optional[str] = None,
+                  end_date: Optional[str] = None) -> Iterator[Dict[str, str]]:
         """
-        Parser de ADIF simples e eficiente.
+        Versão em streaming de get_qsos: baixa e parseia o ADIF em pedaços, entregando cada
+        registro assim que ele chega. A memória usada não depende do tamanho do log.
+        Erros (rede, login) são levantados para quem consome o iterador.
+        :param query: QSL (confirmados) ou WORKED (todos os QSOs enviados ao LoTW).
+        :param detail: False pede registros leves (sem qso_qsldetail / qso_mydetail).
+        :param start_date / end_date: limita por QSO_DATE (YYYY-MM-DD).
         """
-        lower = adif_text.lower()
-        eoh_idx = lower.find("<eoh>")
-        if eoh_idx == -1:
-            raise RuntimeError("Fim do cabeçalho <EOH> não encontrado no ADIF.")
+        params = self._params(since, query, detail, start_date, end_date)
+        since_param = QUERIES[query]["since"]
+        logger.info(f"Baixando ADIF do LoTW em streaming ({query}, {since_param}={params[since_param]})...")
+        start = time.perf_counter()
+        parse_s = 0.0
+        n_bytes = n_records = 0
+        try:
+            with requests.get(self.url, params=params, timeout=120, stream=True) as resp:
+                resp.raise_for_status()
+                decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+                parser = AdifStreamParser()
+                head = ""
+                for raw in resp.iter_content(chunk_size):
+                    n_bytes += len(raw)
+                    text = decoder.decode(raw)
+                    if parser.header is None and len(head) < 500:
+                        head += text[:500]
+                    t0 = time.perf_counter()
+                    records = list(parser.feed(text))
+                    parse_s += time.perf_counter() - t0
+                    n_records += len(records)
+                    yield from records
+                records = list(parser.feed(decoder.decode(b"", final=True)))
+                n_records += len(records)
+                yield from records
 
-        records_text = adif_text[eoh_idx + 5:]
-        # Remove espaços extras e quebras
-        records_text = records_text.strip()
-        
-        # Regex para capturar campos: <TAG:LEN>VALUE
-        # Adicionei suporte a tipo opcional <TAG:LEN:TYPE>
-        field_pattern = re.compile(r"<([^:>]+):(\d+)(?::[^>]*)?>")
-        
-        records = []
-        
-        # Split por <eor> (case insensitive)
-        chunks = re.split(r"<eor>", records_text, flags=re.IGNORECASE)
-        
-        for chunk in chunks:
-            chunk = chunk.strip()
-            if not chunk:
-                continue
-                
-            fields = {}
-            pos = 0
-            while True:
-                match = field_pattern.search(chunk, pos)
-                if not match:
-                    break
-                    
-                tag_name = match.group(1).upper()
-                length = int(match.group(2))
-                
-                # O valor começa logo após o fechamento da tag >
-                start_val = match.end()
-                value = chunk[start_val : start_val + length]
-                
-                fields[tag_name] = value.strip()
-                
-                # Avança a busca
-                pos = start_val + length
-            
-            if fields:
-                records.append(fields)
+                if parser.header is None:
+                    # Erro de autenticação ou serviço fora do ar muitas vezes retorna HTML
+                    logger.error(f"Resposta inválida recebida: {head[:500]}...")
+                    raise RuntimeError("Resposta do LoTW inválida (não parece ser ADIF). Verifique login/senha.")
+                self.last_headers[query] = parser.header_fields
+                records = list(parser.close())
+                n_records += len(records)
+                yield from records
+        except Exception:
+            REGISTRY.inc("lotw_monitor_lotw_errors_total", 1, "Falhas ao obter dados do LoTW")
+            raise
+        finally:
+            # "fetch" aqui é o tempo de rede + consumo pelo pipeline (o parse é medido à parte)
+            REGISTRY.observe(STAGE_SECONDS, time.perf_counter() - start - parse_s, "Duração das etapas do sync", stage="fetch")
+            REGISTRY.observe(STAGE_SECONDS, parse_s, stage="parse")
+
+        self.last_bytes[query] = n_bytes
+        REGISTRY.inc("lotw_monitor_lotw_response_bytes_total", n_bytes, "Bytes recebidos do LoTW")
+        REGISTRY.set("lotw_monitor_lotw_last_response_bytes", n_bytes, "Tamanho da última resposta do LoTW", query=query)
+        REGISTRY.inc("lotw_monitor_lotw_records_total", n_records, "Registros ADIF recebidos do LoTW")
+        REGISTRY.set("lotw_monitor_lotw_last_sync_records", n_records, "Registros no último sync", query=query)
+        logger.info(f"Registros recebidos em streaming ({query}): {n_records} ({n_bytes} bytes)")
+
+    def stream(self, query: str, since: Optional[str] = None) -> Dict:
+        """Fluxo para SyncPipeline.run_streams: registros + como extrair a marca d'água e mesclar."""
+        return {
+            "records": self.iter_qsos(since, query),
+            "watermark_tag": QUERIES[query]["record"],
+            # O fluxo de trabalhados nunca rebaixa um registro já confirmado
+            "keep_confirmed": query == WORKED,
+        }
+
+    def watermark(self, query: str, fallback: str = "") -> str:
+        """Marca d'água da última resposta da consulta (cabeçalho), ou `fallback`."""
+        return self.last_headers.get(query, {}).get(QUERIES[query]["header"]) or fallback
+
+    def parse_adif(self, adif_text: str) -> List[Dict[str, str]]:
+        """
+        Parser de ADIF simples e eficiente (texto completo; ver AdifStreamParser).
+        """
+        parser = AdifStreamParser()
+        records = list(parser.feed(adif_text))
+        records.extend(parser.close())
                 
         logger.info(f"Registros parseados: {len(records)}")
         return records
@@ -110,9 +255,18 @@ class LoTWClient:
         Retorna todos os QSOs (Trabalhados e Confirmados)
         """
         try:
-            raw_adif = self.fetch_adif(since)
-            return self.parse_adif(raw_adif)
+            with REGISTRY.timer(STAGE_SECONDS, "Duração das etapas do sync", stage="fetch"):
+                raw_adif = self.fetch_adif(since)
+            REGISTRY.inc("lotw_monitor_lotw_response_bytes_total", len(raw_adif), "Bytes recebidos do LoTW")
+            REGISTRY.set("lotw_monitor_lotw_last_response_bytes", len(raw_adif), "Tamanho da última resposta do LoTW")
+
+            with REGISTRY.timer(STAGE_SECONDS, stage="parse"):
+                records = self.parse_adif(raw_adif)
+            REGISTRY.inc("lotw_monitor_lotw_records_total", len(records), "Registros ADIF recebidos do LoTW")
+            REGISTRY.set("lotw_monitor_lotw_last_sync_records", len(records), "Registros no último sync")
+            return records
         except Exception as e:
+            REGISTRY.inc("lotw_monitor_lotw_errors_total", 1, "Falhas ao obter dados do LoTW")
             logger.error(f"Falha ao obter dados: {e}")
             return []
 
@@ -0,0 +1,279 @@
+"""
+Índice fixo dos 32.400 quadrados Maidenhead de 4 caracteres (18x18 fields x 10x10 squares).
+
+Cada grid tem um índice inteiro estável (0..32399), o que permite guardar
+coordenadas e vetores unitários dos centros em arrays pré-calculados e
+fazer testes geométricos vetorizados contra todos os quadrados de uma vez.
+
+GridSet guarda conjuntos de quadrados (confirmados, trabalhados, regiões) como bitset
+desses índices.
+"""
+import base64
+import math
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+FIELDS = 18
+SQUARES = 10
+GRID_COUNT = FIELDS * FIELDS * SQUARES * SQUARES  # 32.400
+GRID_BYTES = (GRID_COUNT + 7) // 8                 # 4.050 bytes por bitset
+
+EARTH_MEAN_RADIUS_KM = 6371.0
+
+
+def grid_to_index(grid: str) -> Optional[int]:
+    """'GG66' (ou 'gg66xx') -> índice 0..32399. None se o locator for inválido."""
+    if not grid or len(grid) < 4:
+        return None
+    g = grid.strip().upper()
+    f1, f2 = ord(g[0]) - 65, ord(g[1]) - 65
+    if not (0 <= f1 < FIELDS and 0 <= f2 < FIELDS and g[2].isdigit() and g[3].isdigit()):
+        return None
+    return ((f1 * FIELDS + f2) * SQUARES + int(g[2])) * SQUARES + int(g[3])
+
+
+def index_to_grid(idx: int) -> str:
+    rest, s2 = divmod(idx, SQUARES)
+    rest, s1 = divmod(rest, SQUARES)
+    f1, f2 = divmod(rest, FIELDS)
+    return f"{chr(65 + f1)}{chr(65 + f2)}{s1}{s2}"
+
+
+def index_center(idx: int) -> Tuple[float, float]:
+    """(lat, lon) do centro do quadrado."""
+    rest, s2 = divmod(idx, SQUARES)
+    rest, s1 = divmod(rest, SQUARES)
+    f1, f2 = divmod(rest, FIELDS)
+    return (-90.0 + f2 * 10 + s2 + 0.5, -180.0 + f1 * 20 + s1 * 2 + 1.0)
+
+
+def all_grids() -> Iterable[str]:
+    return (index_to_grid(i) for i in range(GRID_COUNT))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_MEAN_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+# --- Arrays pré-calculados (NumPy, construídos uma única vez sob demanda) ---
+
+@lru_cache(maxsize=1)
+def cell_latlon():
+    """Arrays (lat, lon) em graus dos centros de todos os quadrados, na ordem do índice."""
+    import numpy as np
+    idx = np.arange(GRID_COUNT)
+    rest, s2 = np.divmod(idx, SQUARES)
+    rest, s1 = np.divmod(rest, SQUARES)
+    f1, f2 = np.divmod(rest, FIELDS)
+    lat = -90.0 + f2 * 10 + s2 + 0.5
+    lon = -180.0 + f1 * 20 + s1 * 2 + 1.0
+    lat.flags.writeable = False
+    lon.flags.writeable = False
+    return lat, lon
+
+
+@lru_cache(maxsize=1)
+def cell_vectors():
+    """Vetores unitários (32400, 3) dos centros — produto escalar = cosseno da distância angular."""
+    import numpy as np
+    lat, lon = cell_latlon()
+    vec = latlon_to_unit(lat, lon)
+    vec.flags.writeable = False
+    return vec
+
+
+def latlon_to_unit(lat, lon):
+    """Converte lat/lon (graus, escalares ou arrays) em vetores unitários (..., 3)."""
+    import numpy as np
+    la, lo = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)], axis=-1)
+
+
+@lru_cache(maxsize=1)
+def grid_names() -> Tuple[str, ...]:
+    """Nomes de todos os quadrados na ordem do índice (evita reconstruir strings em laços quentes)."""
+    return tuple(all_grids())
+
+
+def grids_from_indices(indices) -> List[str]:
+    names = grid_names()
+    return [names[i] for i in indices]
+
+
+@lru_cache(maxsize=1)
+def _name_index() -> Dict[str, int]:
+    return {name: i for i, name in enumerate(grid_names())}
+
+
+def grid_index(grid: str) -> Optional[int]:
+    """Como grid_to_index, com atalho por dicionário para o caso comum ("GG66" já normalizado)."""
+    idx = _name_index().get(grid)
+    return idx if idx is not None else grid_to_index(grid)
+
+
+class GridSet:
+    """
+    Conjunto imutável de quadrados Maidenhead de 4 caracteres, como bitset de 32.400 bits
+    (um int do Python; bit i = quadrado de índice i).
+
+    União (|), interseção (&), diferença (-) e len() (popcount) operam sobre o inteiro inteiro
+    de uma vez; `in` e a iteração aceitam/devolvem nomes ("GG66"), então o GridSet substitui um
+    frozenset de strings. Operandos que não são GridSet (set, lista) são convertidos.
+    Locators inválidos são ignorados. encode()/decode() dão a forma compacta persistida.
+    """
+
+    __slots__ = ("_bits",)
+
+    def __init__(self, bits: int = 0):
+        self._bits = bits
+
+    # --- Construção ---
+
+    @classmethod
+    def from_grids(cls, grids: Iterable[str]) -> "GridSet":
+        if isinstance(grids, GridSet):
+            return grids
+        return cls.from_indices(i for i in map(grid_index, grids) if i is not None)
+
+    @classmethod
+    def from_indices(cls, indices: Iterable[int]) -> "GridSet":
+        buf = bytearray(GRID_BYTES)
+        for i in indices:
+            buf[i >> 3] |= 1 << (i & 7)
+        return cls(int.from_bytes(buf, "little"))
+
+    @classmethod
+    def from_mask(cls, mask) -> "GridSet":
+        """Array booleano NumPy (GRID_COUNT,) -> GridSet."""
+        import numpy as np
+        return cls(int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little"))
+
+    @classmethod
+    def decode(cls, text: str) -> "GridSet":
+        return cls(int.from_bytes(zlib.decompress(base64.b64decode(text)), "little"))
+
+    # --- Regiões ---
+
+    @classmethod
+    def field(cls, name: str) -> "GridSet":
+        """Os 100 quadrados de um field ("GG")."""
+        idx = grid_to_index(name[:2] + "00")
+        if idx is None:
+            raise ValueError(f"Field inválido: {name!r}")
+        return cls(((1 << (SQUARES * SQUARES)) - 1) << idx)
+
+    @classmethod
+    def box(cls, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> "GridSet":
+        """Quadrados que tocam o retângulo (graus)."""
+        # Linhas de 1° de latitude e colunas de 2° de longitude
+        rows = range(max(0, math.floor(lat_min + 90)), min(FIELDS * SQUARES, math.ceil(lat_max + 90)))
+        cols = range(max(0, math.floor((lon_min + 180) / 2)), min(FIELDS * SQUARES, math.ceil((lon_max + 180) / 2)))
+        return cls.from_indices(
+            ((c // SQUARES * FIELDS + r // SQUARES) * SQUARES + c % SQUARES) * SQUARES + r % SQUARES
+            for r in rows for c in cols
+        )
+
+    @classmethod
+    def radius(cls, grid: str, km: float) -> "GridSet":
+        """Quadrados cujo centro está a até `km` do centro de `grid`."""
+        idx = grid_index(grid)
+        if idx is None:
+            raise ValueError(f"Locator inválido: {grid!r}")
+        vec = cell_vectors()
+        cos_limit = math.cos(min(km / EARTH_MEAN_RADIUS_KM, math.pi))
+        return cls.from_mask(vec @ vec[idx] >= cos_limit)
+
+    # --- Conversão ---
+
+    def to_bytes(self) -> bytes:
+        return self._bits.to_bytes(GRID_BYTES, "little")
+
+    def encode(self) -> str:
+        """Forma compacta (zlib + base64): poucas centenas de bytes para logs típicos."""
+        return base64.b64encode(zlib.compress(self.to_bytes(), 9)).decode("ascii")
+
+    def to_mask(self):
+        """Array booleano NumPy (GRID_COUNT,) na ordem do índice."""
+        import numpy as np
+        bits = np.unpackbits(np.frombuffer(self.to_bytes(), dtype=np.uint8), bitorder="little")
+        return bits[:GRID_COUNT].astype(bool)
+
+    def indices(self) -> Iterator[int]:
+        for pos, byte in enumerate(self.to_bytes()):
+            if byte:
+                base = pos << 3
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield base + bit
+
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """(lat_min, lon_min, lat_max, lon_max) dos quadrados do conjunto, ou None se vazio."""
+        lat_min = lon_min = math.inf
+        lat_max = lon_max = -math.inf
+        for i in self.indices():
+            lat, lon = index_center(i)
+            lat_min, lat_max = min(lat_min, lat - 0.5), max(lat_max, lat + 0.5)
+            lon_min, lon_max = min(lon_min, lon - 1.0), max(lon_max, lon + 1.0)
+        return None if lat_min == math.inf else (lat_min, lon_min, lat_max, lon_max)
+
+    # --- Protocolo de conjunto ---
+
+    def __contains__(self, grid) -> bool:
+        idx = grid_index(grid) if isinstance(grid, str) else None
+        return idx is not None and (self._bits >> idx) & 1 == 1
+
+    def __iter__(self) -> Iterator[str]:
+        names = grid_names()
+        return (names[i] for i in self.indices())
+
+    def __len__(self) -> int:
+        # bin().count em vez de int.bit_count (só existe no Python 3.10+)
+        return bin(self._bits).count("1")
+
+    def __bool__(self) -> bool:
+        return self._bits != 0
+
+    def __or__(self, other) -> "GridSet":
+        return GridSet(self._bits | GridSet.from_grids(other)._bits)
+
+    def __and__(self, other) -> "GridSet":
+        return GridSet(self._bits & GridSet.from_grids(other)._bits)
+
+    def __sub__(self, other) -> "GridSet":
+        return GridSet(self._bits & ~GridSet.from_grids(other)._bits)
+
+    def __xor__(self, other) -> "GridSet":
+        return GridSet(self._bits ^ GridSet.from_grids(other)._bits)
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __rsub__(self, other) -> "GridSet":
+        return GridSet.from_grids(other) - self
+
+    def __le__(self, other) -> bool:
+        return self._bits & ~GridSet.from_grids(other)._bits == 0
+
+    def __ge__(self, other) -> bool:
+        return GridSet.from_grids(other) <= self
+
+    def isdisjoint(self, other) -> bool:
+        return self._bits & GridSet.from_grids(other)._bits == 0
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, GridSet):
+            return self._bits == other._bits
+        if isinstance(other, (set, frozenset)):
+            return set(self) == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._bits)
+
+    def __repr__(self) -> str:
+        return f"GridSet({len(self)} grids)"
@@ -1,10 +1,13 @@
 import logging
 import io
+import threading
 import requests
 from PIL import Image, ImageDraw, ImageFont
 from typing import Set, Tuple, Dict
 from pathlib import Path
 
+from .maidenhead import GridSet
+
 logger = logging.getLogger(__name__)
 
 class MapGenerator:
@@ -16,10 +19,20 @@ class MapGenerator:
         self.cache_dir = cache_dir
         self.map_path = cache_dir / "world_map_v2.tif" 
         self.font_path = cache_dir / "Roboto-Bold.ttf" # Force local cache for consistency
-            
-        self._ensure_resources()
-        
+        self._resources_ready = False
+        # Mapas podem ser gerados em paralelo (pool "cpu" do dispatcher): um download por vez
+        self._resources_lock = threading.Lock()
+
     def _ensure_resources(self):
+        # Downloads adiados para o primeiro generate() (não bloqueiam o startup)
+        if self._resources_ready:
+            return
+        with self._resources_lock:
+            if not self._resources_ready:
+                self._download_resources()
+
+    def _download_resources(self):
+
         # 1. Map
         if not self.map_path.exists():
             try:
@@ -46,6 +59,9 @@ class MapGenerator:
              except Exception as e:
                 logger.error(f"Erro ao baixar fonte: {e}")
 
+        # Se algum download falhou, tenta de novo no próximo mapa
+        self._resources_ready = self.map_path.exists() and self.font_path.exists()
+
     def _grid_to_latlon(self, grid: str) -> Tuple[float, float, float, float]:
         """Converte Grid 4 chars para Lat/Lon."""
         grid = grid.upper().strip()
@@ -66,6 +82,9 @@ class MapGenerator:
 
     def generate(self, confirmed_grids: Set[str], worked_grids: Set[str], grid_labels: Dict[str, str] = None) -> bytes:
         """Gera mapa com grids desenhados (Crop -> Upscale -> Draw)."""
+        self._ensure_resources()
+        # Aceita GridSet ou coleções de strings (ex.: /testgrid); locators inválidos ficam de fora
+        confirmed_grids = GridSet.from_grids(confirmed_grids)
         if not self.map_path.exists():
             return b""
             
@@ -80,16 +99,7 @@ class MapGenerator:
                     min_lat, max_lat = -90.0, 90.0
                     min_lon, max_lon = -180.0, 180.0
                 else:
-                    min_lat, max_lat = 90.0, -90.0
-                    min_lon, max_lon = 180.0, -180.0
-                    
-                    for grid in confirmed_grids:
-                        lat_min, lon_min, lat_max, lon_max = self._grid_to_latlon(grid)
-                        if lat_min == 0 and lat_max == 0: continue
-                        min_lat = min(min_lat, lat_min)
-                        max_lat = max(max_lat, lat_max)
-                        min_lon = min(min_lon, lon_min)
-                        max_lon = max(max_lon, lon_max)
+                    min_lat, min_lon, max_lat, max_lon = confirmed_grids.bounds()
                     
                     # Padding 3 graus
                     padding = 3.0
@@ -194,13 +204,9 @@ class MapGenerator:
                 overlay_layer = Image.new("RGBA", final_im.size, (255,255,255,0))
                 draw_ov = ImageDraw.Draw(overlay_layer)
 
-                for grid in confirmed_grids:
+                # Só os grids dentro da área recortada
+                for grid in confirmed_grids & GridSet.box(min_lat, max_lat, min_lon, max_lon):
                     lat_min, lon_min, lat_max, lon_max = self._grid_to_latlon(grid)
-                    if lat_min == 0 and lat_max == 0: continue
-                    
-                    # Check if inside view
-                    if lat_max < min_lat or lat_min > max_lat or lon_max < min_lon or lon_min > max_lon:
-                        continue
 
                     px1, py_bottom = project_crop(lat_min, lon_min)
                     px2, py_top = project_crop(lat_max, lon_max)
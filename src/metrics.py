@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Nomes das métricas compartilhadas entre módulos
+STAGE_SECONDS = "lotw_monitor_stage_seconds"
+COMMAND_SECONDS = "lotw_monitor_command_seconds"
+TELEGRAM_SECONDS = "lotw_monitor_telegram_request_seconds"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Registry:
+    """
+    Métricas em memória (contadores, gauges e histogramas com rótulos), thread-safe,
+    exportadas no formato texto do Prometheus. Sem dependências externas.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = tuple(buckets)
+        self._help: Dict[str, Tuple[str, str]] = {}  # nome -> (tipo, help)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._hists: Dict[str, Dict[LabelKey, List]] = {}  # [contagens por bucket, soma, total, último]
+
+    def _declare(self, name: str, kind: str, doc: str):
+        if name not in self._help:
+            self._help[name] = (kind, doc)
+
+    def inc(self, name: str, value: float = 1.0, doc: str = "", **labels):
+        with self._lock:
+            self._declare(name, "counter", doc)
+            series = self._counters.setdefault(name, {})
+            key = _labels_key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, doc: str = "", **labels):
+        with self._lock:
+            self._declare(name, "gauge", doc)
+            self._gauges.setdefault(name, {})[_labels_key(labels)] = value
+
+    def observe(self, name: str, value: float, doc: str = "", **labels):
+        with self._lock:
+            self._declare(name, "histogram", doc)
+            series = self._hists.setdefault(name, {})
+            key = _labels_key(labels)
+            h = series.get(key)
+            if h is None:
+                h = series[key] = [[0] * len(self._buckets), 0.0, 0, 0.0]
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+            h[3] = value
+
+    @contextmanager
+    def timer(self, name: str, doc: str = "", **labels):
+        """Mede a duração (s) do bloco num histograma, mesmo se ele levantar exceção."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, doc, **labels)
+
+    def cache_result(self, cache: str, hit: bool):
+        self.inc("lotw_monitor_cache_requests_total", 1, "Consultas a caches internos",
+                 cache=cache, result="hit" if hit else "miss")
+
+    # --- Exportação ---
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, doc = self._help[name]
+                if doc:
+                    lines.append(f"# HELP {name} {doc}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for key, v in self._counters.get(name, {}).items():
+                        lines.append(f"{name}{_fmt_labels(key)} {v:g}")
+                elif kind == "gauge":
+                    for key, v in self._gauges.get(name, {}).items():
+                        lines.append(f"{name}{_fmt_labels(key)} {v:g}")
+                else:
+                    for key, (counts, total, count, _last) in self._hists.get(name, {}).items():
+                        for bound, c in zip(self._buckets, counts):
+                            lines.append(f"{name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {c}")
+                        lines.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {count}")
+                        lines.append(f"{name}_sum{_fmt_labels(key)} {total:g}")
+                        lines.append(f"{name}_count{_fmt_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary_lines(self) -> List[str]:
+        """Resumo compacto para o chat: contagem/média/último de cada histograma e contadores."""
+        lines = []
+        with self._lock:
+            for name in sorted(self._hists):
+                short = name.replace("lotw_monitor_", "")
+                for key, (_counts, total, count, last) in sorted(self._hists[name].items()):
+                    label = ",".join(v for _k, v in key)
+                    avg = total / count if count else 0.0
+                    lines.append(f"{short}[{label}] n={count} avg={avg * 1000:.0f}ms last={last * 1000:.0f}ms")
+            for name in sorted(self._counters):
+                short = name.replace("lotw_monitor_", "")
+                for key, v in sorted(self._counters[name].items()):
+                    label = ",".join(v2 for _k, v2 in key)
+                    lines.append(f"{short}[{label}] {v:g}")
+        return lines
+
+
+REGISTRY = Registry()
+
+
+def start_http_server(port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Expõe GET /metrics numa thread daemon (apenas localhost por padrão)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    logger.info(f"Métricas Prometheus em http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,115 @@
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .maidenhead import EARTH_MEAN_RADIUS_KM, FIELDS, SQUARES, GridSet, cell_vectors, grid_names, grid_to_index
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = FIELDS * SQUARES  # 180 colunas de 2° de longitude (e 180 linhas de 1° de latitude)
+
+
+def _row_col(idx):
+    """Índice maidenhead -> (linha de latitude, coluna de longitude), escalares ou arrays."""
+    rest, s2 = np.divmod(idx, SQUARES)
+    rest, s1 = np.divmod(rest, SQUARES)
+    f1, f2 = np.divmod(rest, FIELDS)
+    return f2 * SQUARES + s2, f1 * SQUARES + s1
+
+
+def _index(row, col):
+    return ((col // SQUARES * FIELDS + row // SQUARES) * SQUARES + col % SQUARES) * SQUARES + row % SQUARES
+
+
+def footprint_radius_km(predictor, sat: str) -> float:
+    """
+    Alcance com um satélite agora: distância máxima entre duas estações que o veem ao mesmo
+    tempo (elevação 0°), ou seja, o dobro do semi-ângulo do footprint na altitude atual.
+    """
+    from .planner import footprint_half_angle
+    _lat, _lon, alt = predictor.track(sat, np.array([time.time()]))
+    return 2 * EARTH_MEAN_RADIUS_KM * float(footprint_half_angle(alt[0]))
+
+
+class NeighborIndex:
+    """
+    Índice de vizinhança e distância entre os 32.400 quadrados: para uma origem, todos os
+    quadrados ordenados pela distância entre centros, com a distância em km.
+
+    A ordem só depende da linha (latitude) da origem — deslocar a longitude é uma rotação —,
+    então o índice guarda um "anel" por linha: linhas e deslocamentos de coluna ordenados por
+    distância. O anel de uma linha é calculado uma vez (~5 ms) e vale para as 180 origens
+    daquela linha; uma consulta é uma busca binária no raio e um deslocamento de colunas.
+    Os anéis mais usados ficam em cache (LRU, `max_rows`).
+    """
+
+    def __init__(self, max_rows: int = 16):
+        self.max_rows = max_rows
+        self._rings: "OrderedDict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = Lock()
+
+    def _ring(self, row: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self._lock:
+            ring = self._rings.get(row)
+            if ring is not None:
+                self._rings.move_to_end(row)
+                return ring
+
+        t0 = time.perf_counter()
+        cells = cell_vectors()
+        cos = np.clip(cells @ cells[_index(row, 0)], -1.0, 1.0)
+        order = np.argsort(-cos, kind="stable")
+        rows, cols = _row_col(order)
+        ring = (rows.astype(np.int16), cols.astype(np.int16),
+                (EARTH_MEAN_RADIUS_KM * np.arccos(cos[order])).astype(np.float32))
+        for arr in ring:
+            arr.flags.writeable = False
+        logger.debug(f"Anel de vizinhança da linha {row} em {time.perf_counter() - t0:.3f}s")
+
+        with self._lock:
+            self._rings[row] = ring
+            while len(self._rings) > self.max_rows:
+                self._rings.popitem(last=False)
+        return ring
+
+    def neighbors(self, grid: str, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(índices, distâncias em km) dos quadrados a até `radius_km` de `grid`, do mais perto ao mais longe."""
+        origin = grid_to_index(grid[:4])
+        if origin is None:
+            raise ValueError(f"Locator inválido: {grid!r}")
+        row, col = _row_col(origin)
+        rows, dcols, km = self._ring(int(row))
+        n = int(np.searchsorted(km, radius_km, side="right"))
+        cols = (dcols[:n].astype(np.int32) + int(col)) % COLUMNS
+        return _index(rows[:n].astype(np.int32), cols), km[:n]
+
+    def needed(self, grid: str, radius_km: float, confirmed: GridSet, worked: GridSet,
+               limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Grids não confirmados a até `radius_km` de `grid`, do mais perto ao mais longe.
+
+        Retorna {"total", "confirmed", "needed", "worked", "items"}: quadrados no raio,
+        confirmados, não confirmados, não confirmados já trabalhados e a lista
+        [{"grid", "km", "worked"}] (até `limit` itens).
+        """
+        idx, km = self.neighbors(grid, radius_km)
+        conf_mask = GridSet.from_grids(confirmed).to_mask()
+        worked_mask = GridSet.from_grids(worked).to_mask()
+        keep = ~conf_mask[idx]
+        idx, km = idx[keep], km[keep]
+        flags = worked_mask[idx]
+        names = grid_names()
+        shown = idx.size if limit is None else min(limit, idx.size)
+        return {
+            "total": int(keep.size),
+            "confirmed": int(keep.size - idx.size),
+            "needed": int(idx.size),
+            "worked": int(flags.sum()),
+            "items": [{"grid": names[i], "km": float(d), "worked": bool(w)}
+                      for i, d, w in zip(idx[:shown].tolist(), km[:shown].tolist(), flags[:shown].tolist())],
+        }
+
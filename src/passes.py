@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from sgp4.api import Satrec, SatrecArray
+    SGP4_AVAILABLE = True
+except ImportError:
+    SGP4_AVAILABLE = False
+
+from .metrics import REGISTRY
+from .tle import TLEMonitor
+from .wab_data import grid_to_latlon
+
+logger = logging.getLogger(__name__)
+
+# WGS84
+EARTH_RADIUS_KM = 6378.137
+EARTH_FLATTENING = 1 / 298.257223563
+
+
+def normalize_sat_name(name: str) -> str:
+    """'AO-91 (FOX-1B)' -> 'AO91'. Usado para casar SAT_NAME do LoTW com nomes do arquivo TLE."""
+    name = name.upper().split("(")[0].split("[")[0]
+    return re.sub(r"[^A-Z0-9]", "", name)
+
+
+def _gmst(jd_ut1):
+    """Tempo sideral médio de Greenwich (rad), IAU-82, vetorizado."""
+    t = (jd_ut1 - 2451545.0) / 36525.0
+    gmst_s = (67310.54841 + (876600.0 * 3600 + 8640184.812866) * t
+              + 0.093104 * t * t - 6.2e-6 * t * t * t)
+    return np.mod(gmst_s * (2 * np.pi / 86400.0), 2 * np.pi)
+
+
+def _teme_to_ecef(r, jd):
+    """Rotaciona posições TEME (..., ntime, 3) para o referencial fixo à Terra."""
+    theta = _gmst(jd)
+    c, s = np.cos(theta), np.sin(theta)
+    x = c * r[..., 0] + s * r[..., 1]
+    y = -s * r[..., 0] + c * r[..., 1]
+    return np.stack([x, y, r[..., 2]], axis=-1)
+
+
+def _observer(lat_deg: float, lon_deg: float):
+    """Posição ECEF (km) do observador (altitude 0) e vetores locais leste/norte/zênite."""
+    lat, lon = math.radians(lat_deg), math.radians(lon_deg)
+    e2 = EARTH_FLATTENING * (2 - EARTH_FLATTENING)
+    n = EARTH_RADIUS_KM / math.sqrt(1 - e2 * math.sin(lat) ** 2)
+    pos = np.array([n * math.cos(lat) * math.cos(lon),
+                    n * math.cos(lat) * math.sin(lon),
+                    n * (1 - e2) * math.sin(lat)])
+    east = np.array([-math.sin(lon), math.cos(lon), 0.0])
+    north = np.array([-math.sin(lat) * math.cos(lon), -math.sin(lat) * math.sin(lon), math.cos(lat)])
+    up = np.array([math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)])
+    return pos, east, north, up
+
+
+def _jd_from_unix(ts):
+    """Converte timestamp unix (s) em (jd inteiro-e-meio, fração) no formato esperado pelo sgp4."""
+    days = np.asarray(ts, dtype=float) / 86400.0 + 2440587.5
+    jd = np.floor(days - 0.5) + 0.5
+    return jd, days - jd
+
+
+class PassPredictor:
+    """
+    Previsão de passagens em lote.
+    Propaga todos os satélites do catálogo TLE local sobre uma grade de tempo
+    numa única chamada vetorizada (SatrecArray + NumPy) e extrai AOS/LOS/elevação máxima.
+    Resultados ficam em cache por conjunto de épocas do TLE + locator.
+    """
+
+    def __init__(self, tle_mon: TLEMonitor, step_seconds: int = 30, min_elevation: float = 0.0):
+        if not SGP4_AVAILABLE:
+            raise RuntimeError("Previsão de passagens requer os pacotes 'numpy' e 'sgp4'.")
+        self.tle_mon = tle_mon
+        self.step = step_seconds
+        self.min_elevation = min_elevation
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._names: List[str] = []
+        self._sats: List = []
+        self._array = None
+        self._cache: Dict[Tuple, Dict] = {}
+
+    # --- Catálogo ---
+
+    def _load_catalog(self):
+        """(Re)carrega os Satrec somente quando as épocas do catálogo local mudam."""
+        catalog = self.tle_mon.get_catalog()
+        fingerprint = hashlib.md5(
+            "|".join(f"{k}:{v['epoch']}:{v['line2']}" for k, v in sorted(catalog.items())).encode()
+        ).hexdigest()
+        if fingerprint == self._fingerprint:
+            return
+
+        names, sats = [], []
+        for key, entry in sorted(catalog.items()):
+            try:
+                sats.append(Satrec.twoline2rv(entry["line1"], entry["line2"]))
+                names.append(entry.get("name", key))
+            except Exception as e:
+                logger.warning(f"TLE inválido para {key}: {e}")
+
+        self._names, self._sats = names, sats
+        self._array = SatrecArray(sats) if sats else None
+        self._fingerprint = fingerprint
+        self._cache.clear()  # Épocas novas invalidam as passagens calculadas
+        logger.info(f"Catálogo TLE carregado para propagação: {len(sats)} satélites.")
+
+    @property
+    def satellite_names(self) -> List[str]:
+        with self._lock:
+            self._load_catalog()
+            return list(self._names)
+
+    def match_satellites(self, wanted: List[str]) -> List[str]:
+        """Nomes do catálogo que correspondem aos SAT_NAME informados (ex.: do log de QSOs)."""
+        wanted_norm = {normalize_sat_name(w) for w in wanted if w}
+        return [n for n in self.satellite_names if normalize_sat_name(n) in wanted_norm]
+
+    # --- Propagação ---
+
+    def _propagate(self, times):
+        """Posições ECEF (nsat, ntime, 3) em km e máscara de erro do SGP4."""
+        jd, fr = _jd_from_unix(times)
+        err, r, _v = self._array.sgp4(jd, fr)
+        return _teme_to_ecef(r, jd + fr), err != 0
+
+    def track(self, name: str, times) -> Tuple:
+        """Ponto sub-satélite (lat, lon em graus) e altitude (km) para os instantes dados."""
+        with self._lock:
+            self._load_catalog()
+            idx = self._names.index(name)
+            sat = self._sats[idx]
+        jd, fr = _jd_from_unix(times)
+        _err, r, _v = sat.sgp4_array(jd, fr)
+        ecef = _teme_to_ecef(r, jd + fr)
+        norm = np.linalg.norm(ecef, axis=-1)
+        lat = np.degrees(np.arcsin(ecef[..., 2] / norm))
+        lon = np.degrees(np.arctan2(ecef[..., 1], ecef[..., 0]))
+        return lat, lon, norm - EARTH_RADIUS_KM
+
+    def _compute(self, lat: float, lon: float, start: float, end: float) -> List[Dict]:
+        times = np.arange(start, end + self.step, self.step, dtype=float)
+        ecef, bad = self._propagate(times)
+
+        obs, east, north, up = _observer(lat, lon)
+        rho = ecef - obs
+        dist = np.linalg.norm(rho, axis=-1)
+        el = np.degrees(np.arcsin(np.clip((rho @ up) / dist, -1.0, 1.0)))
+        el[bad] = -90.0
+
+        above = el >= self.min_elevation
+        # Bordas: AOS = subida (False->True), LOS = descida (True->False)
+        padded = np.zeros((above.shape[0], above.shape[1] + 2), dtype=bool)
+        padded[:, 1:-1] = above
+        edges = np.diff(padded.astype(np.int8), axis=1)
+        sat_idx, aos_idx = np.nonzero(edges == 1)
+        _sat2, los_idx = np.nonzero(edges == -1)
+
+        def crossing(s, i, j):
+            # Interpolação linear do cruzamento com a elevação mínima entre as amostras i e j
+            e0, e1 = el[s, i], el[s, j]
+            if e1 == e0:
+                return times[i]
+            return times[i] + (self.min_elevation - e0) / (e1 - e0) * (times[j] - times[i])
+
+        def azimuth(s, i):
+            v = rho[s, i]
+            return (math.degrees(math.atan2(v @ east, v @ north)) + 360.0) % 360.0
+
+        passes = []
+        last = len(times) - 1
+        for s, a, b in zip(sat_idx, aos_idx, los_idx):
+            b = b - 1  # último índice acima do horizonte
+            seg = el[s, a:b + 1]
+            peak = a + int(np.argmax(seg))
+            aos = crossing(s, a - 1, a) if a > 0 else times[a]
+            los = crossing(s, b, b + 1) if b < last else times[b]
+            passes.append({
+                "sat": self._names[s],
+                "aos": float(aos),
+                "los": float(los),
+                "tca": float(times[peak]),
+                "max_el": round(float(el[s, peak]), 1),
+                "aos_az": round(azimuth(s, a)),
+                "los_az": round(azimuth(s, b)),
+                "partial": bool(a == 0 or b == last),
+            })
+        passes.sort(key=lambda p: p["aos"])
+        return passes
+
+    def predict(self, grid: str, hours: float = 24, sats: Optional[List[str]] = None,
+                start: Optional[float] = None, min_max_el: float = 0.0) -> List[Dict]:
+        """
+        Passagens (AOS/LOS/TCA em timestamp unix UTC) visíveis do grid nas próximas `hours` horas.
+        :param sats: limita a estes nomes do catálogo (None = todos).
+        :param min_max_el: descarta passagens cuja elevação máxima fica abaixo disso.
+        """
+        coords = grid_to_latlon(grid) if grid else None
+        if not coords:
+            raise ValueError(f"Locator inválido: {grid!r}")
+        start = time.time() if start is None else start
+        end = start + hours * 3600
+
+        with self._lock:
+            self._load_catalog()
+            if self._array is None:
+                return []
+
+            key = (grid.upper()[:6], self.min_elevation, self.step)
+            cached = self._cache.get(key)
+            hit = bool(cached) and cached["start"] <= start and cached["end"] >= end
+            REGISTRY.cache_result("passes", hit)
+            if not hit:
+                # Calcula uma janela de pelo menos 24h a partir do passo atual para reaproveitar
+                win_start = math.floor(start / self.step) * self.step
+                win_end = max(end, win_start + 24 * 3600)
+                t0 = time.perf_counter()
+                cached = {"start": win_start, "end": win_end,
+                          "passes": self._compute(coords[0], coords[1], win_start, win_end)}
+                self._cache[key] = cached
+                logger.info(
+                    f"Passagens calculadas: {len(self._names)} sats, "
+                    f"{(win_end - win_start) / 3600:.0f}h em {time.perf_counter() - t0:.3f}s"
+                )
+
+        wanted = set(sats) if sats is not None else None
+        return [
+            p for p in cached["passes"]
+            if p["los"] >= start and p["aos"] <= end
+            and p["max_el"] >= min_max_el
+            and (wanted is None or p["sat"] in wanted)
+        ]
+
+
+def format_pass(p: Dict) -> str:
+    """Linha curta para o Telegram: `SO-50` 14:32–14:44 UTC ↑45° (AZ 210→30)."""
+    aos = datetime.fromtimestamp(p["aos"], tz=timezone.utc)
+    los = datetime.fromtimestamp(p["los"], tz=timezone.utc)
+    return (f"• `{p['sat']}` {aos.strftime('%d/%m %H:%M')}–{los.strftime('%H:%M')} UTC "
+            f"↑{p['max_el']:.0f}° (AZ {p['aos_az']}→{p['los_az']})")
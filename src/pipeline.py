@@ -0,0 +1,207 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List
+
+from .metrics import REGISTRY, STAGE_SECONDS
+from .qso import QSO
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Lotes em espera por fluxo quando há downloads concorrentes (limita a memória)
+QUEUE_BATCHES_PER_STREAM = 2
+
+
+class SyncPipeline:
+    """
+    Sync em streaming: download → parse → normalização → merge → agregados → alertas.
+
+    Os registros chegam um a um (LoTWClient.iter_qsos) e são mesclados em lotes de
+    `batch_size`; cada lote atravessa todas as etapas e é descartado em seguida. Assim a
+    memória transitória do sync fica proporcional ao lote, não ao tamanho do log (o cache de
+    QSOs do Storage continua sendo o estado persistente).
+
+    Vários fluxos (ex.: confirmados e trabalhados) podem ser baixados ao mesmo tempo com
+    run_streams: cada um roda numa thread (download, parse e normalização) e entrega lotes
+    numa fila limitada; o merge acontece só na thread que chamou, um lote por vez.
+
+    Cada etapa publica o próprio resultado em `run()` / `run_streams()`:
+      parse      {"records"}
+      merge      {"inserted", "updated", "unchanged", "batches"}
+      aggregate  {"max_qso_date", "confirmed"}
+      alerts     {"new_grids", "grid_info"}
+      streams    {nome: {"records", "watermark"}}
+    """
+
+    def __init__(self, storage, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.storage = storage
+        self.batch_size = max(1, batch_size)
+
+    def run(self, records: Iterable[Dict[str, str]]) -> Dict[str, Any]:
+        """Fluxo único de registros (sem marca d'água)."""
+        return self.run_streams({"records": {"records": records}})
+
+    def run_streams(self, streams: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Mescla um ou mais fluxos. Cada fluxo é um dict (ver LoTWClient.stream):
+          records         iterável de registros ADIF
+          watermark_tag   campo cujo maior valor vira streams[nome]["watermark"] (opcional)
+          keep_confirmed  repassado ao Storage.merge_qsos (opcional)
+        """
+        result = {
+            "parse": {"records": 0},
+            "merge": {"inserted": 0, "updated": 0, "unchanged": 0, "batches": 0},
+            "aggregate": {"max_qso_date": "", "confirmed": 0},
+            "alerts": {"new_grids": [], "grid_info": {}},
+            "streams": {name: {"records": 0, "watermark": ""} for name in streams},
+        }
+        self._timings = {"normalize": 0.0, "merge": 0.0, "aggregate": 0.0, "alerts": 0.0}
+        self._timings_lock = threading.Lock()
+        new_grids = set()
+
+        try:
+            if len(streams) == 1:
+                # Sem threads: mantém tudo visível para o /profile sync
+                name, spec = next(iter(streams.items()))
+                for batch in self._batches(spec["records"]):
+                    self._flush(name, spec, batch, result, new_grids)
+            else:
+                self._run_concurrent(streams, result, new_grids)
+        finally:
+            # Mesmo com erro no download: fecha o merge com os lotes já mesclados (registros
+            # inteiros do LoTW; a marca d'água não avança, então o próximo sync os repete)
+            t0 = time.perf_counter()
+            self.storage.finish_merge()
+            self._timings["merge"] += time.perf_counter() - t0
+
+        result["alerts"]["new_grids"] = sorted(new_grids)
+        for stage, seconds in self._timings.items():
+            REGISTRY.observe(STAGE_SECONDS, seconds, stage=stage)
+        logger.info(f"Pipeline: {result['parse']['records']} registros em {result['merge']['batches']} lotes, "
+                    f"{len(new_grids)} grids inéditos.")
+        return result
+
+    def _run_concurrent(self, streams: Dict[str, Dict[str, Any]], result: Dict[str, Any], new_grids: set):
+        batches: queue.Queue = queue.Queue(maxsize=QUEUE_BATCHES_PER_STREAM * len(streams))
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Lotes de dados: desiste se outro fluxo falhou (o consumidor parou de mesclar)
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce(name: str, records: Iterable):
+            try:
+                for batch in self._batches(records):
+                    if not put((name, batch)):
+                        break
+            except Exception as e:
+                batches.put((name, e))
+            finally:
+                close = getattr(records, "close", None)
+                if close:
+                    close()  # Encerra a conexão se o consumo foi interrompido
+                # Erros e o fim do fluxo sempre chegam: o consumidor drena até o último
+                batches.put((name, None))
+
+        threads = [threading.Thread(target=produce, args=(name, spec["records"]), daemon=True,
+                                    name=f"sync-{name}") for name, spec in streams.items()]
+        for t in threads:
+            t.start()
+
+        error = None
+        pending = len(threads)
+        while pending:
+            name, item = batches.get()
+            if item is None:
+                pending -= 1
+            elif isinstance(item, Exception):
+                logger.error(f"Falha no fluxo {name}: {item}")
+                error = error or item
+                stop.set()
+            elif error is None:
+                try:
+                    self._flush(name, streams[name], item, result, new_grids)
+                except Exception as e:
+                    error = e
+                    stop.set()
+        for t in threads:
+            t.join()
+        if error is not None:
+            raise error
+
+    def _batches(self, records: Iterable[Dict[str, str]]) -> Iterator[List[QSO]]:
+        # Normalização (dict ADIF -> QSO compacto), lote a lote
+        batch: List[QSO] = []
+        spent = 0.0
+        for raw in records:
+            t0 = time.perf_counter()
+            batch.append(QSO.from_adif(raw))
+            spent += time.perf_counter() - t0
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        with self._timings_lock:
+            self._timings["normalize"] += spent
+
+    def _flush(self, name: str, spec: Dict[str, Any], batch: List[QSO], result: Dict[str, Any], new_grids: set):
+        timings = self._timings
+        stream = result["streams"][name]
+        stream["records"] += len(batch)
+        result["parse"]["records"] += len(batch)
+
+        # Merge
+        t0 = time.perf_counter()
+        batch_new = self.storage.merge_qsos(batch, defer_rebuild=True,
+                                            keep_confirmed=spec.get("keep_confirmed", False))
+        merge = result["merge"]
+        for k, v in self.storage.last_merge.items():
+            merge[k] += v
+        merge["batches"] += 1
+        t1 = time.perf_counter()
+
+        # Agregados (last_qso_date, marca d'água do fluxo e contagem de confirmados)
+        agg = result["aggregate"]
+        max_date = agg["max_qso_date"]
+        tag = spec.get("watermark_tag")
+        watermark = stream["watermark"]
+        for q in batch:
+            d = q.get("QSO_DATE", "")
+            if d > max_date:
+                max_date = d
+            if q.confirmed:
+                agg["confirmed"] += 1
+            if tag:
+                w = q.get(tag, "")
+                if w > watermark:
+                    watermark = w
+        agg["max_qso_date"] = max_date
+        stream["watermark"] = watermark
+        t2 = time.perf_counter()
+
+        # Alertas: quem deu cada grid inédito (o registro mais recente no download prevalece)
+        new_grids.update(batch_new)
+        if new_grids:
+            grid_info = result["alerts"]["grid_info"]
+            for q in batch:
+                if not q.confirmed:
+                    continue
+                for g in q.grids:
+                    if g in new_grids:
+                        grid_info[g] = {"call": q.get("CALL"), "date": q.get("QSO_DATE")}
+        t3 = time.perf_counter()
+
+        with self._timings_lock:
+            timings["merge"] += t1 - t0
+            timings["aggregate"] += t2 - t1
+            timings["alerts"] += t3 - t2
@@ -0,0 +1,105 @@
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from .maidenhead import GridSet, cell_vectors, grids_from_indices, latlon_to_unit
+from .passes import EARTH_RADIUS_KM, PassPredictor
+from .wab_data import grid_to_latlon
+
+logger = logging.getLogger(__name__)
+
+
+def footprint_half_angle(alt_km):
+    """Semi-ângulo central (rad) da área de cobertura para elevação 0° a partir da altitude."""
+    return np.arccos(EARTH_RADIUS_KM / (EARTH_RADIUS_KM + np.maximum(alt_km, 1.0)))
+
+
+class GridPlanner:
+    """
+    Planejador de oportunidades: para cada passagem futura, quais grids ainda não confirmados
+    ficam dentro do footprint do satélite enquanto ele está visível da estação.
+
+    O teste footprint x grid é vetorizado contra o índice fixo de centros dos 32.400 quadrados
+    (maidenhead.cell_vectors), restrito de antemão aos candidatos alcançáveis da estação.
+    """
+
+    def __init__(self, predictor: PassPredictor, samples_per_pass: int = 16):
+        self.predictor = predictor
+        self.samples = samples_per_pass
+
+    def plan(self, grid: str, confirmed: Set[str], worked: Set[str], hours: float = 12,
+             sats: Optional[List[str]] = None, min_max_el: float = 5.0) -> List[Dict]:
+        """
+        Lista de oportunidades ordenadas pelo número de grids não confirmados cobertos.
+        Cada item: {"pass", "count", "worked_count", "cells", "worked_cells"}, onde `cells` são
+        os índices (maidenhead) dos grids não confirmados no footprint e `worked_cells` o
+        subconjunto já trabalhado. Use `opportunity_grids` para obter os nomes.
+        """
+        t0 = time.perf_counter()
+        passes = self.predictor.predict(grid, hours=hours, sats=sats, min_max_el=min_max_el)
+        if not passes:
+            return []
+
+        lat, lon = grid_to_latlon(grid)
+        station = latlon_to_unit(lat, lon)
+        cells = cell_vectors()
+
+        # Máscara dos grids ainda não confirmados
+        needed = ~GridSet.from_grids(confirmed).to_mask()
+        worked_mask = GridSet.from_grids(worked).to_mask()
+
+        # Amostra a trajetória de todas as passagens de cada satélite numa chamada só
+        by_sat: Dict[str, List[int]] = {}
+        for i, p in enumerate(passes):
+            by_sat.setdefault(p["sat"], []).append(i)
+
+        tracks = {}
+        max_lambda = 0.0
+        for sat, idxs in by_sat.items():
+            times = np.concatenate([
+                np.linspace(passes[i]["aos"], passes[i]["los"], self.samples) for i in idxs
+            ])
+            sub_lat, sub_lon, alt = self.predictor.track(sat, times)
+            lam = footprint_half_angle(alt)
+            max_lambda = max(max_lambda, float(lam.max()))
+            tracks[sat] = (latlon_to_unit(sub_lat, sub_lon), np.cos(lam))
+
+        # Pré-filtro: estação e grid precisam caber no mesmo footprint,
+        # logo só interessam grids a menos de 2x o maior semi-ângulo da estação
+        reach = cells @ station >= math.cos(min(math.pi, 2 * max_lambda))
+        candidates = np.nonzero(needed & reach)[0]
+        cand_vec = cells[candidates]
+
+        results = []
+        for sat, idxs in by_sat.items():
+            sub_vec, cos_lambda = tracks[sat]                       # (n, 3), (n,)
+            for k, i in enumerate(idxs):
+                sl = slice(k * self.samples, (k + 1) * self.samples)
+                inside = (sub_vec[sl] @ cand_vec.T) >= cos_lambda[sl, None]  # (samples, cand)
+                hit = candidates[inside.any(axis=0)]
+                if hit.size == 0:
+                    continue
+                worked_hit = hit[worked_mask[hit]]
+                results.append({
+                    "pass": passes[i],
+                    "count": int(hit.size),
+                    "worked_count": int(worked_hit.size),
+                    "cells": hit,
+                    "worked_cells": worked_hit,
+                })
+
+        results.sort(key=lambda r: (-r["count"], r["pass"]["aos"]))
+        logger.info(f"Planejamento: {len(passes)} passagens em {time.perf_counter() - t0:.3f}s")
+        return results
+
+
+def opportunity_grids(item: Dict, limit: int = 10) -> List[str]:
+    """Nomes dos grids de uma oportunidade, trabalhados-não-confirmados primeiro."""
+    worked = grids_from_indices(item["worked_cells"][:limit].tolist())
+    if len(worked) >= limit:
+        return worked
+    rest = item["cells"][~np.isin(item["cells"], item["worked_cells"])]
+    return worked + grids_from_indices(rest[:limit - len(worked)].tolist())
@@ -0,0 +1,177 @@
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _short_path(filename: str) -> str:
+    """Encurta caminhos para o resumo do chat: .../src/storage.py -> src/storage.py"""
+    parts = Path(filename).parts
+    for anchor in ("src", "site-packages", "benchmarks"):
+        if anchor in parts:
+            i = len(parts) - 1 - parts[::-1].index(anchor)
+            return "/".join(parts[i + (anchor == "site-packages"):])
+    return Path(filename).name
+
+
+class Profiler:
+    """
+    Perfilamento sob demanda (cProfile + tracemalloc) de comandos do bot e do job de sync.
+
+    Um alvo é perfilado quando:
+      - foi "armado" com /profile <alvo> (vale só para a próxima execução), ou
+      - está na lista fixa da variável de ambiente PROFILE_COMMANDS.
+
+    Cada execução grava em `profile_dir`:
+      <ts>-<alvo>.prof        estatísticas do cProfile (abrir com pstats/snakeviz)
+      <ts>-<alvo>-alloc.txt   principais pontos de alocação (tracemalloc)
+    mantendo apenas as `keep` execuções mais recentes.
+    """
+
+    def __init__(self, profile_dir: Path, always: Optional[Set[str]] = None, keep: int = 20,
+                 top: int = 8, alloc_frames: int = 10):
+        self.profile_dir = profile_dir
+        self.always = set(always or ())
+        self.keep = keep
+        self.top = top
+        self.alloc_frames = alloc_frames
+        self._armed: Set[str] = set()
+        self._armed_lock = threading.Lock()
+        # cProfile e tracemalloc são globais ao processo: um perfil por vez
+        self._running = threading.Lock()
+
+    def arm(self, target: str):
+        with self._armed_lock:
+            self._armed.add(target)
+
+    def _wants(self, target: str) -> bool:
+        """Consulta, sem desarmar: o alvo está armado ou configurado?"""
+        with self._armed_lock:
+            return target in self._armed or target in self.always
+
+    def _should_profile(self, target: str) -> bool:
+        """Desarma o alvo e confirma o perfil. Só com `_running` já adquirido."""
+        with self._armed_lock:
+            if target in self._armed:
+                self._armed.discard(target)
+                return True
+        return target in self.always
+
+    @contextmanager
+    def profile(self, target: str):
+        """
+        Perfila o bloco se `target` estiver armado/configurado.
+        Produz um dict que, ao final, recebe "summary" (texto para o chat) e "files".
+        """
+        result: Dict = {}
+        # O alvo armado só é consumido depois de reservar o perfilador: se outro perfil estiver
+        # rodando, a execução segue sem perfil e o alvo continua armado para a próxima
+        if not self._wants(target) or not self._running.acquire(blocking=False):
+            yield result
+            return
+        if not self._should_profile(target):
+            # Outra execução do mesmo alvo consumiu o armado entre a consulta e a reserva
+            self._running.release()
+            yield result
+            return
+
+        tracing_before = tracemalloc.is_tracing()
+        if not tracing_before:
+            tracemalloc.start(self.alloc_frames)
+        prof = cProfile.Profile()
+        start = time.perf_counter()
+        prof.enable()
+        try:
+            yield result
+        finally:
+            prof.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _current, peak = tracemalloc.get_traced_memory()
+            if not tracing_before:
+                tracemalloc.stop()
+            self._running.release()
+            try:
+                result.update(self._save(target, prof, snapshot, elapsed, peak))
+            except Exception as e:
+                logger.error(f"Erro ao salvar perfil de {target}: {e}")
+
+    # --- Saída ---
+
+    def _save(self, target: str, prof: cProfile.Profile, snapshot, elapsed: float, peak: int) -> Dict:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{target}"
+        prof_path = self.profile_dir / f"{stem}.prof"
+        alloc_path = self.profile_dir / f"{stem}-alloc.txt"
+
+        prof.dump_stats(str(prof_path))
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        alloc_stats = snapshot.statistics("lineno")
+        with open(alloc_path, "w", encoding="utf-8") as f:
+            f.write(f"# {target}: {elapsed:.3f}s, pico tracemalloc {peak / 1024 / 1024:.1f} MB\n")
+            for stat in alloc_stats[:50]:
+                f.write(f"{stat}\n")
+            f.write("\n# Pilhas dos 10 maiores pontos de alocação\n")
+            for stat in snapshot.statistics("traceback")[:10]:
+                f.write(f"\n{stat.size / 1024:.1f} KiB em {stat.count} blocos\n")
+                f.write("\n".join(stat.traceback.format()) + "\n")
+
+        self._rotate()
+        logger.info(f"Perfil de {target} gravado em {prof_path}")
+        return {
+            "files": [prof_path, alloc_path],
+            "summary": self._summary(target, prof, alloc_stats, elapsed, peak, prof_path.name),
+        }
+
+    def _summary(self, target: str, prof: cProfile.Profile, alloc_stats, elapsed: float,
+                 peak: int, filename: str) -> str:
+        stats = pstats.Stats(prof, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)  # cumtime
+
+        lines = [f"🔬 *Perfil* `{target}`: {elapsed:.2f}s, pico {peak / 1024 / 1024:.1f} MB", "", "*Tempo (acumulado / próprio / chamadas):*"]
+        shown = 0
+        for (file, line, func), (_cc, ncalls, tottime, cumtime, _callers) in rows:
+            if file == "~" or file == __file__:
+                continue  # Built-ins genéricos e o próprio perfilador não ajudam
+            lines.append(f"`{cumtime:6.3f}s {tottime:6.3f}s {ncalls:>7} {_short_path(file)}:{line} {func}`")
+            shown += 1
+            if shown >= self.top:
+                break
+
+        lines.append("")
+        lines.append("*Alocações:*")
+        for stat in alloc_stats[:5]:
+            frame = stat.traceback[0]
+            lines.append(f"`{stat.size / 1024:8.1f} KiB {_short_path(frame.filename)}:{frame.lineno}`")
+        lines.append("")
+        lines.append(f"Arquivo: `{filename}`")
+        return "\n".join(lines)
+
+    def _rotate(self):
+        """Mantém só as `keep` execuções mais recentes (.prof + -alloc.txt)."""
+        profiles = sorted(self.profile_dir.glob("*.prof"))
+        for old in profiles[:-self.keep] if self.keep > 0 else []:
+            for path in (old, old.with_name(old.stem + "-alloc.txt")):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def recent(self, limit: int = 5) -> List[str]:
+        if not self.profile_dir.exists():
+            return []
+        return [p.name for p in sorted(self.profile_dir.glob("*.prof"), reverse=True)[:limit]]
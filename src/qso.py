@@ -0,0 +1,131 @@
+import sys
+from functools import lru_cache
+from collections.abc import Mapping
+from typing import Dict, Iterator, Optional, Tuple
+
+
+@lru_cache(maxsize=65536)
+def _grids_from(raw: str) -> Tuple[str, ...]:
+    # Mesma string de GRIDSQUARE/VUCC_GRIDS -> mesma tupla (compartilhada entre QSOs)
+    grids = set()
+    for g in raw.split(","):
+        g4 = g.strip().upper()[:4]
+        if len(g4) == 4:
+            grids.add(sys.intern(g4))
+    return tuple(sorted(grids))
+
+
+def extract_grids(qso: Mapping) -> Tuple[str, ...]:
+    """Grids de 4 caracteres de um QSO de satélite (VUCC_GRIDS tem prioridade sobre GRIDSQUARE)."""
+    # PROP_MODE=SAT ou SAT_NAME presente
+    if qso.get("PROP_MODE", "").upper() != "SAT" and not qso.get("SAT_NAME"):
+        return ()
+    return _grids_from(qso.get("VUCC_GRIDS", "") or qso.get("GRIDSQUARE", ""))
+
+
+def qso_timestamp(qso: Mapping) -> int:
+    """QSO_DATE + TIME_ON como inteiro YYYYMMDDHHMMSS (0 se inválido), para comparar sem strings."""
+    date = qso.get("QSO_DATE", "")
+    time_on = qso.get("TIME_ON", "")
+    if len(time_on) != 6:
+        time_on = (time_on + "000000")[:6]
+    try:
+        return int(date[:8] + time_on)
+    except ValueError:
+        return 0
+
+
+# Tags com valores quase sempre únicos: internar só custaria CPU (e cresceria a tabela de intern)
+_UNIQUE_TAGS = {"TIME_ON", "TIME_OFF", "APP_LOTW_QSO_TIMESTAMP", "APP_LOTW_RXQSL", "APP_LOTW_RXQSO",
+                "FREQ", "FREQ_RX", "QSO_DATE_OFF"}
+
+
+class _Layout:
+    """Conjunto ordenado de tags ADIF, compartilhado por todos os QSOs com as mesmas tags."""
+
+    __slots__ = ("tags", "index", "interned")
+
+    def __init__(self, tags: Tuple[str, ...]):
+        self.tags = tags
+        self.index = {t: i for i, t in enumerate(tags)}
+        self.interned = tuple(i for i, t in enumerate(tags) if t not in _UNIQUE_TAGS)
+
+
+_LAYOUTS: Dict[Tuple[str, ...], _Layout] = {}
+_intern = sys.intern
+
+
+def _layout(tags: Tuple[str, ...]) -> _Layout:
+    layout = _LAYOUTS.get(tags)
+    if layout is None:
+        layout = _LAYOUTS[tags] = _Layout(tuple(sys.intern(t) for t in tags))
+    return layout
+
+
+class QSO(Mapping):
+    """
+    Registro compacto de QSO.
+
+    Os valores ADIF ficam numa tupla (strings internadas) e os nomes das tags num layout
+    compartilhado entre registros iguais, em vez de um dict por QSO. Campos usados nos
+    caminhos quentes já vêm normalizados: `confirmed`, `grids`, `is_sat`, `when`, `sat`.
+
+    Continua compatível com o código que trata QSOs como dict: `qso.get("CALL")`,
+    `qso["BAND"]`, iteração sobre as tags e `to_dict()` para serializar.
+    """
+
+    __slots__ = ("_layout", "_values", "confirmed", "grids", "is_sat", "when", "sat")
+
+    def __init__(self, fields: Mapping):
+        layout = self._layout = _layout(tuple(fields))
+        values = list(fields.values())
+        for i in layout.interned:
+            values[i] = _intern(values[i])
+        self._values = tuple(values)
+        # Normalização feita uma vez aqui (lendo do mapping de entrada, que costuma ser um dict)
+        get = fields.get
+        self.confirmed = get("QSL_RCVD", "").upper() == "Y"
+        sat = get("SAT_NAME", "")
+        self.sat = _intern(sat.upper()) if sat else ""
+        self.is_sat = bool(sat) or get("PROP_MODE", "").upper() == "SAT"
+        self.grids = _grids_from(get("VUCC_GRIDS", "") or get("GRIDSQUARE", "")) if self.is_sat else ()
+        self.when = qso_timestamp(fields)
+
+    @classmethod
+    def from_adif(cls, fields: Mapping) -> "QSO":
+        return fields if isinstance(fields, cls) else cls(fields)
+
+    @property
+    def call(self) -> str:
+        return self.get("CALL", "")
+
+    # --- Interface de dict ---
+
+    def get(self, tag: str, default: Optional[str] = None):
+        i = self._layout.index.get(tag)
+        return default if i is None else self._values[i]
+
+    def __getitem__(self, tag: str) -> str:
+        return self._values[self._layout.index[tag]]
+
+    def __contains__(self, tag) -> bool:
+        return tag in self._layout.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._layout.tags)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __eq__(self, other):
+        if isinstance(other, QSO):
+            return self._layout is other._layout and self._values == other._values
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(zip(self._layout.tags, self._values))
+
+    def __repr__(self):
+        return f"QSO({self.to_dict()!r})"
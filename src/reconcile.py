@@ -0,0 +1,151 @@
+import calendar
+import logging
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from . import digests
+from .lotw_client import QSL, WORKED
+from .pipeline import DEFAULT_BATCH_SIZE, SyncPipeline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MONTHS = 12
+
+
+def _month_range(month: str):
+    """YYYYMM -> ("YYYY-MM-01", "YYYY-MM-<último dia>")"""
+    year, mon = int(month[:4]), int(month[4:6])
+    last = calendar.monthrange(year, mon)[1]
+    return f"{year:04d}-{mon:02d}-01", f"{year:04d}-{mon:02d}-{last:02d}"
+
+
+def _contiguous(months: List[str]) -> List[List[str]]:
+    """Agrupa meses consecutivos (uma requisição ao LoTW por grupo)."""
+    runs: List[List[str]] = []
+    for m in sorted(months):
+        if runs:
+            prev = runs[-1][-1]
+            y, mo = int(prev[:4]), int(prev[4:6])
+            nxt = f"{y + mo // 12:04d}{mo % 12 + 1:02d}"
+            if m == nxt:
+                runs[-1].append(m)
+                continue
+        runs.append([m])
+    return runs
+
+
+def parse_scope(arg: str) -> Optional[List[str]]:
+    """
+    Argumento do /reconcile -> meses (YYYYMM).
+    "" -> None (rodízio dos meses conferidos há mais tempo); "all" -> [] (log inteiro);
+    "2023" -> os 12 meses do ano; "2023-05" / "202305" -> só o mês.
+    """
+    arg = arg.strip().lower()
+    if not arg:
+        return None
+    if arg in ("all", "tudo"):
+        return []
+    if re.fullmatch(r"\d{4}", arg):
+        return [f"{arg}{m:02d}" for m in range(1, 13)]
+    match = re.fullmatch(r"(\d{4})-?(\d{2})", arg)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return [match.group(1) + match.group(2)]
+    raise ValueError(f"Período inválido: {arg!r} (use all, AAAA ou AAAA-MM)")
+
+
+class Reconciler:
+    """
+    Reconciliação por mês entre o cache e o LoTW, sem sync completo.
+
+    1. Conferência: baixa fatias *leves* (sem qso_qsldetail/qso_mydetail) dos meses escolhidos
+       e calcula o digest de cada mês (digests.compute), comparando com o mantido pelo Storage.
+    2. Reparo: cada mês diferente (ou marcado pelo /forget) é baixado completo e mesclado; QSOs
+       do cache que não vieram mais do LoTW naquele mês são removidos.
+
+    Com `worked` (SYNC_WORKED), compara todos os QSOs (qso_qsl=no); senão, só os confirmados.
+    """
+
+    def __init__(self, storage, client, worked: bool = True, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.storage = storage
+        self.client = client
+        self.query = WORKED if worked else QSL
+        self.confirmed_only = not worked
+        self.batch_size = batch_size
+
+    def run(self, months: Optional[List[str]] = None, check: bool = True,
+            limit: int = DEFAULT_MONTHS) -> Dict[str, Any]:
+        """
+        :param months: meses a conferir; None = rodízio de `limit` meses; [] = log inteiro.
+        :param check: False pula a conferência e só repara os meses marcados (dirty_months).
+        """
+        report = {
+            "checked": [], "differ": [], "repaired": [],
+            "inserted": 0, "updated": 0, "deleted": 0,
+            "check_bytes": 0, "repair_bytes": 0,
+            "new_grids": [], "grid_info": {},
+        }
+        to_repair = set(self.storage.dirty_months)
+
+        try:
+            if check:
+                if months is None:
+                    months = self.storage.digests.least_recently_checked(limit)
+                remote = self._remote_digests(months, report)
+                local = self.storage.digests.digests(self.confirmed_only)
+                checked = set(months) if months else set(remote) | set(local)
+                report["checked"] = sorted(checked)
+                report["differ"] = sorted(m for m in checked if remote.get(m, (0, 0)) != local.get(m, (0, 0)))
+                to_repair.update(report["differ"])
+
+            if to_repair:
+                self._repair(sorted(to_repair), report)
+            self.storage.clear_dirty_months(report["repaired"])
+            self.storage.mark_months_checked(report["checked"], datetime.now().isoformat())
+        finally:
+            # Um erro no download (ex.: timeout do LoTW) não pode deixar o merge aberto: os meses
+            # já reparados ficam; os demais ficam para a próxima reconciliação
+            self.storage.finish_merge()
+
+        logger.info(f"Reconciliação: {len(report['checked'])} meses conferidos "
+                    f"({report['check_bytes']} bytes), {len(report['repaired'])} reparados "
+                    f"({report['repair_bytes']} bytes), {report['deleted']} removidos.")
+        return report
+
+    def _remote_digests(self, months: List[str], report: Dict[str, Any]) -> Dict[str, digests.Digest]:
+        remote: Dict[str, digests.Digest] = {}
+        ranges = [(None, None)] if not months else [
+            (_month_range(run[0])[0], _month_range(run[-1])[1]) for run in _contiguous(months)
+        ]
+        for start, end in ranges:
+            records = self.client.iter_qsos(None, self.query, detail=False, start_date=start, end_date=end)
+            remote.update(digests.compute(records, self.confirmed_only))
+            report["check_bytes"] += self.client.last_bytes.get(self.query, 0)
+        return remote
+
+    def _repair(self, months: List[str], report: Dict[str, Any]):
+        local_keys = self.storage.month_keys(months)
+        new_grids = set()
+        for month in months:
+            start, end = _month_range(month)
+            seen = set()
+
+            def records() -> Iterator[Dict[str, str]]:
+                for raw in self.client.iter_qsos(None, self.query, start_date=start, end_date=end):
+                    seen.add(self.storage._qso_key(raw))
+                    yield raw
+
+            result = SyncPipeline(self.storage, self.batch_size).run(records())
+            report["repair_bytes"] += self.client.last_bytes.get(self.query, 0)
+            report["inserted"] += result["merge"]["inserted"]
+            report["updated"] += result["merge"]["updated"]
+            new_grids.update(result["alerts"]["new_grids"])
+            report["grid_info"].update(result["alerts"]["grid_info"])
+
+            # Apagados no LoTW (na consulta de confirmados, só os confirmados são conferidos)
+            cache = self.storage.data.get("qso_cache", {})
+            gone = [k for k in local_keys[month] - seen
+                    if not self.confirmed_only or cache[k].confirmed]
+            report["deleted"] += self.storage.delete_qsos(gone)
+            report["repaired"].append(month)
+        report["new_grids"] = sorted(new_grids)
@@ -0,0 +1,130 @@
+import functools
+import logging
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+from .awards import AwardEngine
+from .grid_labels import GridLabelIndex
+from .maidenhead import GridSet
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def _memoized(method):
+    """
+    Cacheia o resultado de uma visão (por argumentos) no próprio snapshot, que nunca muda.
+    Os resultados são imutáveis (frozenset / GridSet / MappingProxyType) para que quem chama não altere
+    o cache sem querer. Acertos e faltas vão para as métricas (cache "snapshot:<visão>").
+    """
+    name = method.__name__
+    cache = "snapshot:" + name.replace("get_", "", 1)
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        key = (name,) + args
+        hit = self._memo.get(key)
+        REGISTRY.cache_result(cache, hit is not None)
+        if hit is None:
+            hit = self._memo[key] = method(self, *args)
+        return hit
+
+    return wrapper
+
+
+class StateSnapshot:
+    """
+    Versão imutável do estado publicada pelo Storage para os leitores (comandos do bot).
+
+    Quem lê pega `storage.snapshot` (uma referência) e trabalha sobre ele sem lock: o escritor
+    (sync, reconciliação, /forget) nunca altera as estruturas de um snapshot publicado — copia
+    antes de escrever (Storage._own) e publica a versão seguinte trocando a referência.
+    Um leitor que começou antes da troca continua vendo a versão antiga, inteira.
+
+    As visões derivadas são calculadas sob demanda e memorizadas no snapshot; snapshots
+    publicados sem mudança nas visões (mesmo `version`) herdam o cache do anterior.
+    """
+
+    def __init__(self, data: Dict[str, Any], version: int, label_policy: str,
+                 memo: Optional[Dict[tuple, Any]] = None):
+        self.data: Mapping[str, Any] = MappingProxyType(data)
+        self.version = version
+        self.label_policy = label_policy
+        self._memo: Dict[tuple, Any] = memo if memo is not None else {}
+
+    @property
+    def qsos(self) -> Iterable:
+        """Registros do cache (QSO / LazyQSO)."""
+        return self.data.get("qso_cache", {}).values()
+
+    @_memoized
+    def get_confirmed_grids(self) -> GridSet:
+        return self.data.get("known_grids") or GridSet()
+
+    @_memoized
+    def get_worked_grids(self) -> GridSet:
+        """
+        Retorna TODOS os grids encontrados no cache de QSOs (trabalhados ou confirmados).
+        """
+        return GridSet.from_grids(g for qso in self.qsos for g in qso.grids)
+
+    @_memoized
+    def get_my_grid(self) -> str:
+        """Locator mais usado nos QSOs (MY_GRIDSQUARE), ou "" se desconhecido."""
+        counts = {}
+        for qso in self.qsos:
+            g = qso.get("MY_GRIDSQUARE", "").strip().upper()
+            if len(g) >= 4:
+                counts[g] = counts.get(g, 0) + 1
+        return max(counts, key=counts.get) if counts else ""
+
+    @_memoized
+    def get_worked_sats(self) -> FrozenSet[str]:
+        """Nomes de satélite (SAT_NAME) presentes no log."""
+        return frozenset(qso.sat for qso in self.qsos if qso.sat)
+
+    def find_calls(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Busca aproximada de indicativo (ver CallIndex.matches): variantes portáteis, com prefixo
+        ou digitadas com erro encontram o indicativo base, com todos os QSOs dele.
+        Não memorizada: cada consulta é diferente e o índice já responde em milissegundos.
+        """
+        return self.data["call_index"].matches(query, self.data.get("qso_cache", {}), limit)
+
+    @_memoized
+    def get_stats(self) -> Mapping[str, Any]:
+        """
+        Gera estatísticas a partir do cache local.
+        """
+        # Formato: { "HI21": { "count": 10, "last_call": "XX1XX", ... } }
+        stats = {}
+        for qso in self.qsos:
+            for g in qso.grids:
+                if g not in stats:
+                    stats[g] = {"count": 0, "calls": set()}
+                stats[g]["count"] += 1
+                stats[g]["calls"].add(qso.call or "UNKNOWN")
+        return MappingProxyType(stats)
+
+    @_memoized
+    def get_grid_labels(self, policy: str = None) -> Mapping[str, str]:
+        """
+        Retorna um dicionário {GRID: CALL} para os grids confirmados.
+        Lido do índice incremental (GridLabelIndex) segundo a política: "latest" (padrão,
+        QSO mais recente), "first" (primeiro QSO) ou "most_frequent" (call com mais QSOs).
+        """
+        labels = GridLabelIndex(self.data["grid_labels"])
+        return MappingProxyType(labels.labels(policy or self.label_policy))
+
+    @_memoized
+    def get_dashboard_stats(self) -> Mapping[str, Any]:
+        """
+        Retorna estatísticas detalhadas do dashboard (similar ao HTML fornecido).
+        Lê o estado dos diplomas já mantido incrementalmente pelo merge_qsos
+        (Total QSOs, Grids/VUCC por banda e satélite, Sats, DXCC, CQ, ITU, WAB, Max Distance, Hunters).
+        """
+        awards = AwardEngine(self.data["awards"])
+        stats = awards.progress()
+        stats["vucc_status"] = stats["total_grids"]
+        stats["top_hunters"] = awards.top_hunters()
+        return MappingProxyType(stats)
@@ -1,37 +1,232 @@
 import json
 import logging
-from typing import Dict, List, Set, Any
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 
+from .awards import AwardEngine
+from .callsearch import CallIndex
+from .digests import MonthDigests, month_of
+from .grid_labels import LATEST, POLICIES, GridLabelIndex
+from .maidenhead import GridSet, grid_to_index
+from .metrics import REGISTRY
+from .columnar import is_binary_state, read_cache, read_state, write_state
+from .qso import QSO, extract_grids
+from .quickcheck import read_sidecar, write_sidecar
+from .snapshot import StateSnapshot
+
 logger = logging.getLogger(__name__)
 
+# Campos que identificam um QSO no qso_cache (chave em memória = tupla destes valores)
+KEY_FIELDS = ("CALL", "QSO_DATE", "TIME_ON", "BAND")
+QSOKey = Tuple[str, str, str, str]
+
+# Estruturas do estado que o escritor altera no lugar (copiadas antes, ver Storage._own).
+# known_grids (GridSet) é imutável: cada mudança troca o valor, sem cópia.
+_SHARED_KEYS = ("qso_cache", "sync_cursors", "awards", "grid_labels", "month_digests", "call_index")
+# Estruturas derivadas mantidas só em memória (remontadas no load)
+_TRANSIENT_KEYS = ("call_index",)
+
+
+def _json_default(obj):
+    # QSO / LazyQSO / qso_cache preguiçoso -> dict
+    return obj.to_dict() if hasattr(obj, "to_dict") else dict(obj)
+
+
 class Storage:
-    def __init__(self, filepath: Path):
-        self.filepath = filepath
+    """
+    Estado persistente (QSOs, grids conhecidos, diplomas, datas de sync).
+
+    Formatos em disco (`state_format`):
+      - "json": state.json legível (padrão);
+      - "binary": state.bin colunar com mmap e leitura preguiçosa dos campos (ver columnar.py).
+    O outro formato continua sendo lido para migração: se o arquivo do formato escolhido
+    ainda não existe, carrega o do formato antigo e o próximo save grava no novo.
+
+    `label_policy` define o indicativo exibido em cada grid do mapa (ver grid_labels.py).
+
+    Concorrência: `data` é o estado de *trabalho*, de uso exclusivo do escritor (métodos que
+    alteram o estado serializam-se em `_write_lock`). Os leitores usam `snapshot`, a última
+    versão publicada (ver snapshot.py), sem lock. Depois de uma publicação as estruturas são
+    compartilhadas com o snapshot; o escritor as copia na primeira escrita (_own) e publica a
+    versão seguinte em finish_merge(), forget_grid() e save(). Entre um merge em lotes
+    (merge_qsos com defer_rebuild, delete_qsos) e o finish_merge() nada é publicado nem gravado.
+    """
+
+    def __init__(self, filepath: Path, state_format: str = "json", label_policy: str = LATEST):
+        self.state_format = (state_format or "json").lower()
+        if self.state_format not in ("json", "binary"):
+            raise ValueError(f"STATE_FORMAT inválido: {state_format!r} (use json ou binary)")
+        if label_policy not in POLICIES:
+            raise ValueError(f"LABEL_POLICY inválida: {label_policy!r} (use {', '.join(POLICIES)})")
+        self.label_policy = label_policy
+        self.json_path = filepath.with_suffix(".json") if filepath.suffix == ".bin" else filepath
+        self.bin_path = self.json_path.with_suffix(".bin")
+        self.filepath = self.bin_path if self.state_format == "binary" else self.json_path
         self.data = self._load()
+        self.data["known_grids"] = self._load_grids(self.data.get("known_grids"))
+        # True quando há mudanças ainda não gravadas (save() zera)
+        self.dirty = not self.filepath.exists()
+        # Incrementado a cada mudança que afeta as visões derivadas (memorizadas no snapshot)
+        self.version = 0
+        self._write_lock = threading.RLock()
+        # Chaves de `data` cujas estruturas ainda são as do snapshot publicado
+        self._shared: Set[str] = set()
+        self.snapshot: Optional[StateSnapshot] = None
+        # Contagens do último merge_qsos: inserted / updated / unchanged
+        self.last_merge: Dict[str, int] = {"inserted": 0, "updated": 0, "unchanged": 0}
+        self._rebuild_pending = False
+        # True entre um merge_qsos(defer_rebuild=True) / delete_qsos e o finish_merge(): o estado
+        # de trabalho está pela metade e só o finish_merge() pode publicá-lo
+        self._merge_open = False
+        self.awards = AwardEngine(self.data.setdefault("awards", {}))
+        self.labels = GridLabelIndex(self.data.setdefault("grid_labels", {}))
+        self.digests = MonthDigests(self.data.setdefault("month_digests", {}))
+        self.calls = self.data["call_index"] = CallIndex.build(self.data.get("qso_cache", {}),
+                                                              KEY_FIELDS.index("CALL"))
+        # Migração: estado antigo (ou de outra versão) sem diplomas / rótulos pré-calculados. A
+        # marca "built" é gravada com o estado, então um log sem QSOs confirmados ou sem grids
+        # não é recalculado (nem marcado como sujo) a cada inicialização
+        if not self.awards.is_built:
+            self._rebuild_awards()
+            self.dirty = True
+        if not self.labels.is_built:
+            self.labels.rebuild(self.data.get("qso_cache", {}).values())
+            self.dirty = True
+        if self.data.get("qso_cache"):
+            if self.digests.is_empty:
+                self.digests.rebuild(self.data["qso_cache"].values())
+                self.dirty = True
+        self.publish()
+
+    def publish(self) -> StateSnapshot:
+        """
+        Publica o estado de trabalho como o novo snapshot: uma troca de referência, atômica
+        para os leitores. As estruturas passam a ser compartilhadas (copy-on-write).
+        """
+        with self._write_lock:
+            previous = self.snapshot
+            memo = previous._memo if previous is not None and previous.version == self.version else None
+            if previous is not None:
+                # Hit: o novo snapshot herda as visões já calculadas (nada que as afete mudou)
+                REGISTRY.cache_result("snapshot_memo", memo is not None)
+            self.snapshot = StateSnapshot(dict(self.data), self.version, self.label_policy, memo)
+            self._shared = {k for k in _SHARED_KEYS if k in self.data}
+            return self.snapshot
+
+    def _own(self, *keys: str):
+        """Copy-on-write: copia as estruturas `keys` que ainda são as do snapshot publicado."""
+        for key in keys:
+            if key not in self._shared:
+                continue
+            self._shared.discard(key)
+            if key == "awards":
+                self.awards = AwardEngine(self.awards.copy_state())
+                self.data[key] = self.awards.state
+            elif key == "grid_labels":
+                self.labels = GridLabelIndex(self.labels.copy_state())
+                self.data[key] = self.labels.state
+            elif key == "month_digests":
+                self.digests = MonthDigests(self.digests.copy_state())
+                self.data[key] = self.digests.state
+            elif key == "call_index":
+                self.calls = self.data[key] = self.calls.copy_state()
+            else:
+                # qso_cache (dict ou LazyQSOCache; os registros são imutáveis), sync_cursors
+                self.data[key] = self.data[key].copy()
 
     def _load(self) -> Dict[str, Any]:
-        if not self.filepath.exists():
+        other = self.json_path if self.filepath == self.bin_path else self.bin_path
+        path = self.filepath if self.filepath.exists() else other
+        if not path.exists():
             return {
-                "known_grids": [],
+                "known_grids": GridSet(),
                 "qso_cache": {},  # call+date+band -> qso_record
                 "last_run": None,
                 "last_qso_date": "1900-01-01" # Para busca incremental
             }
+        if path != self.filepath:
+            logger.info(f"Migrando estado de {path.name} para {self.filepath.name} ({self.state_format}).")
         try:
-            with open(self.filepath, "r", encoding="utf-8") as f:
-                return json.load(f)
+            if is_binary_state(path):
+                return read_state(path, KEY_FIELDS)
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Em disco a chave é a string legada CALL_DATA_HORA_BANDA; em memória, a tupla
+            cache = {}
+            for raw in data.get("qso_cache", {}).values():
+                qso = QSO(raw)
+                cache[self._qso_key(qso)] = qso
+            data["qso_cache"] = cache
+            return data
         except Exception as e:
             logger.error(f"Erro ao carregar estado: {e}")
             return {}
 
-    def save(self):
+    @staticmethod
+    def _load_grids(stored) -> GridSet:
+        """known_grids em disco: bitset codificado (GridSet.encode) ou a lista ordenada de versões antigas."""
+        if isinstance(stored, str):
+            return GridSet.decode(stored)
+        return GridSet.from_grids(stored or [])
+
+    def save(self) -> bool:
+        """Publica o estado de trabalho e grava o snapshot resultante. Retorna se gravou."""
+        with self._write_lock:
+            if self._merge_open:
+                logger.warning("Save ignorado: merge em lotes ainda aberto (o estado fica para o próximo save).")
+                return False
+            return self._save(self.publish().data)
+
+    def _save(self, snapshot_data: Mapping[str, Any]) -> bool:
         try:
-            with open(self.filepath, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            data = {k: v for k, v in snapshot_data.items() if k not in _TRANSIENT_KEYS}
+            data["known_grids"] = snapshot_data.get("known_grids", GridSet()).encode()
+            if self.state_format == "binary":
+                write_state(self.filepath, data)
+                self._compact_cache()
+            else:
+                data["qso_cache"] = {self._key_str(k): q for k, q in snapshot_data.get("qso_cache", {}).items()}
+                with open(self.filepath, "w", encoding="utf-8") as f:
+                    # default: registros QSO e linhas preguiçosas de um state.bin (migração)
+                    json.dump(data, f, ensure_ascii=False, indent=2, default=_json_default)
+            self.dirty = False
+            self._retire_other_format()
+            write_sidecar(self.filepath, snapshot_data)
+            return True
         except Exception as e:
             logger.error(f"Erro ao salvar estado: {e}")
+            return False
+
+    def _compact_cache(self):
+        """
+        Estado binário: troca o qso_cache por um sobre o arquivo recém-gravado, com a camada de
+        sobreposição vazia (senão ela guardaria em memória todo QSO alterado desde o load).
+        Os leitores do snapshot anterior seguem com o mmap antigo, que continua válido.
+        """
+        self.data["qso_cache"] = read_cache(self.filepath, KEY_FIELDS)
+        self.publish()
+
+    def refresh_sidecar(self):
+        """
+        Regrava o resumo usado pela verificação rápida do cron (quickcheck.py) se ele faltar ou
+        estiver desatualizado e o estado em disco estiver em dia (senão, o próximo save grava).
+        """
+        with self._write_lock:
+            if self.dirty or not self.filepath.exists() or read_sidecar(self.filepath) is not None:
+                return
+            try:
+                write_sidecar(self.filepath, self.publish().data)
+            except OSError as e:
+                logger.error(f"Erro ao gravar resumo do estado: {e}")
+
+    def _retire_other_format(self):
+        """Após migrar, renomeia o arquivo do outro formato para .bak (evita ler um estado velho ao voltar)."""
+        other = self.json_path if self.filepath == self.bin_path else self.bin_path
+        if other.exists():
+            other.replace(other.with_name(other.name + ".bak"))
+            logger.info(f"Estado antigo preservado em {other.name}.bak")
 
     @property
     def last_qso_date(self) -> str:
@@ -39,7 +234,9 @@ class Storage:
 
     @last_qso_date.setter
     def last_qso_date(self, value: str):
-        self.data["last_qso_date"] = value
+        if self.data.get("last_qso_date") != value:
+            self.data["last_qso_date"] = value
+            self.dirty = True
         
     @property
     def last_sync_date(self) -> str:
@@ -48,294 +245,282 @@ class Storage:
 
     @last_sync_date.setter
     def last_sync_date(self, value: str):
-        self.data["last_sync_date"] = value
+        if self.data.get("last_sync_date") != value:
+            self.data["last_sync_date"] = value
+            self.dirty = True
+
+    def get_cursor(self, query: str) -> Optional[str]:
+        """
+        Marca d'água do último sync de uma consulta ao LoTW (ex.: "qsl"): o APP_LOTW_LASTQSL
+        devolvido no cabeçalho, usado como qso_qslsince na próxima busca incremental.
+        """
+        return self.data.get("sync_cursors", {}).get(query)
+
+    def set_cursor(self, query: str, value: str):
+        with self._write_lock:
+            if self.get_cursor(query) != value:
+                self._own("sync_cursors")
+                self.data.setdefault("sync_cursors", {})[query] = value
+                self.dirty = True
+
+    @property
+    def known_grids(self) -> GridSet:
+        return self.get_confirmed_grids()
+
+    # --- Visões (leitura do snapshot publicado, sem lock) ---
+
+    def get_confirmed_grids(self) -> GridSet:
+        return self.snapshot.get_confirmed_grids()
+
+    def get_worked_grids(self) -> GridSet:
+        return self.snapshot.get_worked_grids()
+
+    def get_my_grid(self) -> str:
+        return self.snapshot.get_my_grid()
+
+    def get_worked_sats(self) -> FrozenSet[str]:
+        return self.snapshot.get_worked_sats()
+
+    def find_calls(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        return self.snapshot.find_calls(query, limit)
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return self.snapshot.get_stats()
+
+    def get_grid_labels(self, policy: str = None) -> Mapping[str, str]:
+        return self.snapshot.get_grid_labels(policy)
+
+    def get_dashboard_stats(self) -> Mapping[str, Any]:
+        return self.snapshot.get_dashboard_stats()
+
+    # --- Escrita ---
+
+    def mark_changed(self):
+        """Registra uma mudança no estado: o próximo snapshot recalcula as visões; marca para salvar."""
+        self.version += 1
+        self.dirty = True
+
+    def forget_grid(self, grid: str) -> bool:
+        """
+        Remove um grid da lista de confirmados. Os meses com QSOs confirmados nesse grid ficam
+        marcados para reconciliação: o próximo sync os baixa de novo e redescobre o grid.
+        """
+        with self._write_lock:
+            known = self.data.get("known_grids", GridSet())
+            if grid not in known:
+                return False
+            self.data["known_grids"] = known - {grid}
+            self.mark_months_dirty(month_of(q) for q in self.data.get("qso_cache", {}).values()
+                                   if q.confirmed and grid in q.grids)
+            self.mark_changed()
+            if not self._merge_open:
+                self.publish()
+            return True
 
     @property
-    def known_grids(self) -> Set[str]:
-        return set(self.data.get("known_grids", []))
+    def merge_open(self) -> bool:
+        """Há um merge em lotes sem finish_merge() (ver __init__)."""
+        return self._merge_open
 
-    def merge_qsos(self, new_qsos: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    @property
+    def dirty_months(self) -> List[str]:
+        """Meses (YYYYMM) a baixar de novo na próxima reconciliação."""
+        return sorted(self.data.get("dirty_months", []))
+
+    def mark_months_dirty(self, months: Iterable[str]):
+        with self._write_lock:
+            dirty = set(self.data.get("dirty_months", []))
+            before = len(dirty)
+            dirty.update(months)
+            if len(dirty) != before:
+                self.data["dirty_months"] = sorted(dirty)
+                self.dirty = True
+
+    def clear_dirty_months(self, months: Iterable[str]):
+        with self._write_lock:
+            dirty = set(self.data.get("dirty_months", []))
+            before = len(dirty)
+            dirty.difference_update(months)
+            if len(dirty) != before:
+                self.data["dirty_months"] = sorted(dirty)
+                self.dirty = True
+
+    def mark_months_checked(self, months: Iterable[str], when: str):
+        """Registra a conferência dos meses com o LoTW (ver MonthDigests.least_recently_checked)."""
+        with self._write_lock:
+            self._own("month_digests")
+            self.digests.mark_checked(months, when)
+            self.dirty = True
+
+    def month_keys(self, months: Iterable[str]) -> Dict[str, Set[QSOKey]]:
+        """Chaves do cache por mês (só lê as chaves: QSO_DATE faz parte delas)."""
+        wanted = {m: set() for m in months}
+        date_idx = KEY_FIELDS.index("QSO_DATE")
+        for key in self.data.get("qso_cache", {}):
+            keys = wanted.get(key[date_idx][:6])
+            if keys is not None:
+                keys.add(key)
+        return wanted
+
+    def delete_qsos(self, keys: Iterable[QSOKey]) -> int:
+        """
+        Remove QSOs do cache (ex.: apagados no LoTW). Diplomas e rótulos são recalculados
+        no próximo finish_merge(); grids confirmados que ficaram sem QSO saem de known_grids.
+        """
+        with self._write_lock:
+            return self._delete_qsos(keys)
+
+    def _delete_qsos(self, keys: Iterable[QSOKey]) -> int:
+        keys = [k for k in keys if k in self.data.get("qso_cache", {})]
+        if not keys:
+            return 0
+        self._own("qso_cache", "month_digests", "call_index")
+        self._merge_open = True
+        cache = self.data["qso_cache"]
+        removed = 0
+        lost_confirmed = False
+        for key in keys:
+            qso = cache.pop(key)
+            removed += 1
+            self.digests.remove(qso)
+            self.calls.remove(qso.call, key)
+            if qso.confirmed:
+                lost_confirmed = True
+
+        if lost_confirmed:
+            self._rebuild_pending = True
+            still = GridSet.from_grids(g for qso in cache.values() if qso.confirmed for g in qso.grids)
+            self.data["known_grids"] = self.data.get("known_grids", GridSet()) & still
+        self.mark_changed()
+        return removed
+
+    def merge_qsos(self, new_qsos: List[Dict[str, str]], defer_rebuild: bool = False,
+                   keep_confirmed: bool = False) -> List[Dict[str, str]]:
         """
         Mescla novos QSOs no cache.
+        Registros idênticos ao já armazenado (o overlap do sync incremental) não são regravados
+        nem reprocessados; as contagens ficam em `last_merge` (inserted / updated / unchanged).
+        Com `defer_rebuild`, o recálculo de diplomas/rótulos (QSO já creditado que mudou) fica
+        pendente até `finish_merge()` — usado pelo pipeline, que mescla em lotes.
+        Com `keep_confirmed` (fluxo de trabalhados), um registro não confirmado nunca substitui
+        um já confirmado: conta como inalterado.
         Retorna lista de grids que passaram a ser CONFIRMADOS (inéditos).
         """
+        with self._write_lock:
+            return self._merge_qsos(new_qsos, defer_rebuild, keep_confirmed)
+
+    def _merge_qsos(self, new_qsos: List[Dict[str, str]], defer_rebuild: bool,
+                    keep_confirmed: bool) -> List[Dict[str, str]]:
         cache = self.data.setdefault("qso_cache", {})
+        owned = False
         
         # Carrega o estado atual de confirmados
-        current_confirmed = set(self.data.get("known_grids", []))
+        current_confirmed = self.data.get("known_grids", GridSet())
         
         newly_confirmed_grids = set()
+        awards_stale = False
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
         
-        for qso in new_qsos:
+        for raw in new_qsos:
+            qso = QSO.from_adif(raw)
             key = self._qso_key(qso)
+            previous = cache.get(key)
+
+            if previous is None:
+                counts["inserted"] += 1
+            elif qso == previous or (keep_confirmed and previous.confirmed and not qso.confirmed):
+                # Sem mudança: só confere se um grid confirmado foi esquecido (/forget)
+                counts["unchanged"] += 1
+                if qso.confirmed:
+                    newly_confirmed_grids.update(g for g in qso.grids
+                                                 if g not in current_confirmed and grid_to_index(g) is not None)
+                continue
+            else:
+                counts["updated"] += 1
+            if not owned:
+                # Primeira alteração desde a última publicação: copia o que o snapshot compartilha
+                self._own("qso_cache", "month_digests", "awards", "grid_labels", "call_index")
+                cache = self.data["qso_cache"]
+                owned = True
+            if previous is not None:
+                self.digests.remove(previous)
+            else:
+                self.calls.add(qso.call, key)
             cache[key] = qso
+            self.digests.add(qso)
             
             # Checa se é confirmado (LoTW status QSL_RCVD = Y, ou se veio pela query QSL=yes)
             # Como agora baixamos TUDO (trabalhados e confirmados), precisamos validar o campo.
             # LoTW field: QSL_RCVD (Y ou N) ou APP_LOTW_QSLMODE
-            is_confirmed = (qso.get("QSL_RCVD", "").upper() == "Y")
+            is_confirmed = qso.confirmed
+            was_confirmed = previous is not None and previous.confirmed
             
             if is_confirmed:
-                grids = self._extract_grids(qso)
+                grids = set(qso.grids)
                 for g in grids:
-                    if g not in current_confirmed:
+                    # Só locators válidos entram no bitset; um inválido seria "inédito" a cada sync
+                    if g not in current_confirmed and grid_to_index(g) is not None:
                         newly_confirmed_grids.add(g)
+
+                # Diplomas e rótulos: só credita uma vez por QSO
+                if not was_confirmed:
+                    self.awards.add(self._key_str(key), qso, grids)
+                    if grids:
+                        self.labels.add(qso.call or "?", qso.when, grids)
+                else:
+                    awards_stale = True
+            elif was_confirmed:
+                awards_stale = True
         
         # Atualiza a lista persistida de confirmados
         if newly_confirmed_grids:
-            current_confirmed.update(newly_confirmed_grids)
-            self.data["known_grids"] = sorted(list(current_confirmed))
-            
-        self.data["last_run"] = datetime.now().isoformat()
-        
-        return sorted(list(newly_confirmed_grids))
+            self.data["known_grids"] = current_confirmed | newly_confirmed_grids
 
-    def get_confirmed_grids(self) -> Set[str]:
-        return set(self.data.get("known_grids", []))
+        # Um QSO já creditado mudou de conteúdo: recalcula para não contar em dobro
+        if awards_stale:
+            self._rebuild_pending = True
+        self.last_merge = counts
+        if counts["inserted"] or counts["updated"] or newly_confirmed_grids:
+            self.data["last_run"] = datetime.now().isoformat()
+            self.mark_changed()
+        if defer_rebuild:
+            self._merge_open = True
+        else:
+            self.finish_merge()
 
-    def get_worked_grids(self) -> Set[str]:
+        return sorted(list(newly_confirmed_grids))
+
+    def finish_merge(self):
         """
-        Retorna TODOS os grids encontrados no cache de QSOs (trabalhados ou confirmados).
+        Executa o recálculo de diplomas/rótulos adiado por merge_qsos(defer_rebuild=True) e
+        publica o resultado para os leitores (fim de uma transação de escrita).
         """
-        all_grids = set()
-        for qso in self.data.get("qso_cache", {}).values():
-            all_grids.update(self._extract_grids(qso))
-        return all_grids
-
+        with self._write_lock:
+            self._merge_open = False
+            if self._rebuild_pending:
+                self._rebuild_pending = False
+                self._own("awards", "grid_labels")
+                self._rebuild_awards()
+                self.labels.rebuild(self.data.get("qso_cache", {}).values())
+                self.mark_changed()
+            self.publish()
 
-    def _qso_key(self, qso: Dict[str, str]) -> str:
-        """Gera chave única para o QSO: CALL + DATA + BAND + TIME"""
-        return f"{qso.get('CALL')}_{qso.get('QSO_DATE')}_{qso.get('TIME_ON')}_{qso.get('BAND')}"
+    def _rebuild_awards(self):
+        items = ((self._key_str(k), q) for k, q in self.data.get("qso_cache", {}).items())
+        self.awards.rebuild(items, self._extract_grids)
 
-    def _extract_grids(self, qso: Dict[str, str]) -> Set[str]:
-        grids = set()
-        # PROP_MODE=SAT ou SAT_NAME presente
-        if qso.get("PROP_MODE", "").upper() != "SAT" and not qso.get("SAT_NAME"):
-            return grids
-
-        # VUCC_GRIDS tem prioridade
-        vucc = qso.get("VUCC_GRIDS", "")
-        if vucc:
-            for g in vucc.split(","):
-                g4 = g.strip().upper()[:4]
-                if len(g4) == 4:
-                    grids.add(g4)
-        else:
-            g = qso.get("GRIDSQUARE", "")
-            g4 = g.strip().upper()[:4]
-            if len(g4) == 4:
-                grids.add(g4)
-        return grids
+    def _qso_key(self, qso: Dict[str, str]) -> QSOKey:
+        """Chave única do QSO: (CALL, QSO_DATE, TIME_ON, BAND), reaproveitando as strings do registro."""
+        get = qso.get
+        return (get("CALL", ""), get("QSO_DATE", ""), get("TIME_ON", ""), get("BAND", ""))
 
-    def get_stats(self) -> Dict[str, Any]:
-        """
-        Gera estatísticas a partir do cache local.
-        """
-        # Formato: { "HI21": { "count": 10, "last_call": "XX1XX", ... } }
-        stats = {}
-        for qso in self.data.get("qso_cache", {}).values():
-            grids = self._extract_grids(qso)
-            for g in grids:
-                if g not in stats:
-                    stats[g] = {"count": 0, "calls": set()}
-                stats[g]["count"] += 1
-                stats[g]["calls"].add(qso.get("CALL", "UNKNOWN"))
-        return stats
-
-    def get_grid_labels(self) -> Dict[str, str]:
-        """
-        Retorna um dicionário {GRID: CALL} para os grids confirmados.
-        Escolhe arbitrariamente um call caso haja múltiplos (ex: o mais recente processado).
-        """
-        labels = {}
-        qsos = list(self.data.get("qso_cache", {}).values())
-        qsos.sort(key=lambda x: (x.get("QSO_DATE", ""), x.get("TIME_ON", "")))
-        
-        for qso in qsos:
-            is_confirmed = (qso.get("QSL_RCVD", "").upper() == "Y")
-            if is_confirmed:
-                call = qso.get("CALL", "?")
-                grids = self._extract_grids(qso)
-                for g in grids:
-                    labels[g] = call
-        return labels
+    @staticmethod
+    def _key_str(key: QSOKey) -> str:
+        """Forma persistida (e usada pelos diplomas) da chave: CALL_DATA_HORA_BANDA."""
+        return "_".join(key)
 
-    def get_dashboard_stats(self) -> Dict[str, Any]:
-        """
-        Retorna estatísticas detalhadas do dashboard (similar ao HTML fornecido).
-        Calcula: Total QSOs, Grids, Sats, DXCC, CQ, ITU, Max Distance, Hunters.
-        """
-        import math
-
-        stats = {
-            "total_confirmed": 0,
-            "total_grids": 0,
-            "total_sats": 0,
-            "max_distance": 0,
-            "dxcc_count": 0,
-            "cq_count": 0,
-            "itu_count": 0,
-            "vucc_status": 0,
-            "top_hunters": [], # Lista de (Call, Count, GridsStr)
-            "sats_breakdown": {}, # Sat -> Count
-            "dxcc_breakdown": {}  # Country -> Count
-        }
-
-        unique_grids = set()
-        unique_sats = set()
-        unique_dxcc = set()
-        unique_cq = set()
-        unique_itu = set()
-        hunter_grids = {} # Call -> Set[Grid]
-        
-        # Helper de Distância (Haversine)
-        def calc_dist(lat1, lon1, lat2, lon2):
-            R = 6371
-            dLat = (lat2 - lat1) * math.pi / 180
-            dLon = (lon2 - lon1) * math.pi / 180
-            a = math.sin(dLat/2) * math.sin(dLat/2) + \
-                math.cos(lat1 * math.pi / 180) * math.cos(lat2 * math.pi / 180) * \
-                math.sin(dLon/2) * math.sin(dLon/2)
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-            return int(R * c)
-
-        # Helper Grid -> LatLon Center
-        def grid_to_center(grid):
-            if not grid or len(grid) < 4: return None
-            g = grid.upper().strip()
-            # Maidenhead simplificado (apenas 4 chars)
-            # Longitude: (Field - 'A') * 20 - 180 + (Square) * 2
-            # Latitude: (Field - 'A') * 10 - 90 + (Square) * 1
-            # Center: +1 lon, +0.5 lat
-            
-            A = ord('A')
-            lon_field = (ord(g[0]) - A) * 20 - 180
-            lat_field = (ord(g[1]) - A) * 10 - 90
-            lon_sq = int(g[2]) * 2
-            lat_sq = int(g[3]) * 1
-            
-            lat_center = lat_field + lat_sq + 0.5
-            lon_center = lon_field + lon_sq + 1.0
-            return (lat_center, lon_center)
-
-        # Iterar QSOs
-        for qso in self.data.get("qso_cache", {}).values():
-             is_confirmed = (qso.get("QSL_RCVD", "").upper() == "Y")
-             
-             # HTML filtra por SAT e Confirmed? 
-             # O código HTML processa "prop_mode=SAT".
-             prop = qso.get("PROP_MODE", "").upper()
-             sat_name = qso.get("SAT_NAME", "").upper()
-             
-             if prop != "SAT" and not sat_name:
-                 continue
-                 
-             if not is_confirmed:
-                 continue
-
-             stats["total_confirmed"] += 1
-             
-             # Grids do QSO
-             qs_grids = self._extract_grids(qso)
-             unique_grids.update(qs_grids)
-             
-             # Sat
-             if sat_name:
-                 unique_sats.add(sat_name)
-                 stats["sats_breakdown"][sat_name] = stats["sats_breakdown"].get(sat_name, 0) + 1
-             
-             # DXCC/CQ/ITU
-             dxcc = qso.get("COUNTRY", "").upper()
-             if dxcc: 
-                 unique_dxcc.add(dxcc)
-                 stats["dxcc_breakdown"][dxcc] = stats["dxcc_breakdown"].get(dxcc, 0) + 1
-                 
-             if qso.get("CQZ"): unique_cq.add(qso.get("CQZ"))
-             if qso.get("ITUZ"): unique_itu.add(qso.get("ITUZ"))
-             
-             # Top Hunter logic
-             call = qso.get("CALL", "?").upper()
-             if call not in hunter_grids: hunter_grids[call] = set()
-             hunter_grids[call].update(qs_grids)
-             
-             # Distance Calc
-             my_grid = qso.get("MY_GRIDSQUARE") or \
-                       (qso.get("MY_VUCC_GRIDS", "").split(",")[0] if qso.get("MY_VUCC_GRIDS") else None)
-             
-             if my_grid and len(my_grid) >= 4:
-                 my_coord = grid_to_center(my_grid[:4])
-                 for g in qs_grids:
-                     target_coord = grid_to_center(g)
-                     if my_coord and target_coord:
-                         d = calc_dist(my_coord[0], my_coord[1], target_coord[0], target_coord[1])
-                         if d > stats["max_distance"]:
-                             stats["max_distance"] = d
-
-        stats["total_grids"] = len(unique_grids)
-        stats["total_sats"] = len(unique_sats)
-        stats["dxcc_count"] = len(unique_dxcc)
-        stats["cq_count"] = len(unique_cq)
-        stats["itu_count"] = len(unique_itu)
-        
-        # Prepare Top Hunters (Sort by Unique Grids desc)
-        sorted_hunters = sorted(hunter_grids.items(), key=lambda item: len(item[1]), reverse=True)
-        # Pegar top 5
-        # Pegar top 5 (Filtrando >= 2 grids conforme pedido)
-        for call, grids in sorted_hunters:
-            if len(grids) < 2:
-                continue
-                
-            stats["top_hunters"].append({
-                "call": call,
-                "count": len(grids),
-                "grids": ", ".join(sorted(list(grids))[:5]) + ("..." if len(grids)>5 else "")
-            })
-            
-            if len(stats["top_hunters"]) >= 5:
-                break
-            
-        # WAB (Work All Brazil) - DISABLED (User Request)
-        # from .wab_data import get_state_from_call, get_state_from_grid, get_all_states
-        
-        # wab_states = set()
-        # wab_breakdown = {} # UF -> Count
-        
-        # for qso in self.data.get("qso_cache", {}).values():
-        #     # Check confirmed
-        #     if (qso.get("QSL_RCVD", "").upper() != "Y"): continue
-        #     
-        #     # Check Country
-        #     if qso.get("COUNTRY", "").upper() != "BRAZIL": continue
-        #     
-        #     # Check Satellite Only (User Request)
-        #     prop = qso.get("PROP_MODE", "").upper()
-        #     sat_name = qso.get("SAT_NAME", "")
-        #     if prop != "SAT" and not sat_name:
-        #         continue
-        #     
-        #     # 1. Try by Call (User Priority - "Volte para o indicativo")
-        #     # This ensures robust handling of suffixes (PU7) and avoids ocean grid issues.
-        #     call = qso.get("CALL", "")
-        #     state = get_state_from_call(call)
-        #     
-        #     # 2. Fallback to Grid (if Call fails or returns None)
-        #     if not state:
-        #         grids_list = list(self._extract_grids(qso))
-        #         best_grid = grids_list[0] if grids_list else ""
-        #         state = get_state_from_grid(best_grid)
-        #     
-        #     # 3. Fallback to ADIF State
-        #     if not state:
-        #         st = qso.get("STATE", "").upper().strip()
-        #         if len(st) == 2: state = st
-        #         
-        #     if state:
-        #         wab_states.add(state)
-        #         wab_breakdown[state] = wab_breakdown.get(state, 0) + 1
-        
-        # stats["wab_count"] = len(wab_states)
-        # stats["wab_missing"] = sorted(list(set(get_all_states()) - wab_states))
-        # stats["wab_confirmed_list"] = sorted(list(wab_states))
-        # stats["wab_breakdown"] = wab_breakdown
+    def _extract_grids(self, qso: Dict[str, str]) -> Set[str]:
+        # Registros QSO já trazem os grids normalizados; dicts crus (ADIF) são calculados na hora
+        grids = getattr(qso, "grids", None)
+        return set(grids if grids is not None else extract_grids(qso))
 
-        return stats
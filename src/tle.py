@@ -1,57 +1,184 @@
 import requests
 import hashlib
+import json
 import logging
 import os
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Dict, List, Optional
+
+from .metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+
+def parse_tle_epoch(line1: str) -> Optional[datetime]:
+    """Converte o campo de época da linha 1 (YYDDD.DDDDDDDD, colunas 19-32) em datetime UTC."""
+    try:
+        field = line1[18:32].strip()
+        yy = int(field[:2])
+        day = float(field[2:])
+    except (ValueError, IndexError):
+        return None
+    year = 2000 + yy if yy < 57 else 1900 + yy
+    return datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=day - 1)
+
+
+def parse_tle_text(text: str) -> Dict[str, Dict[str, str]]:
+    """
+    Converte um arquivo TLE (3 linhas por satélite: nome, linha 1, linha 2)
+    em um catálogo {NOME: {norad, epoch, line1, line2}}.
+    Linhas soltas ou corrompidas são ignoradas.
+    """
+    catalog = {}
+    lines = [l.rstrip() for l in text.splitlines() if l.strip()]
+    i = 0
+    while i < len(lines) - 2:
+        name, l1, l2 = lines[i].strip(), lines[i + 1], lines[i + 2]
+        if not (l1.startswith("1 ") and l2.startswith("2 ")):
+            i += 1
+            continue
+        epoch = parse_tle_epoch(l1)
+        catalog[name.upper()] = {
+            "name": name,
+            "norad": l1[2:7].strip(),
+            "epoch": epoch.isoformat() if epoch else "",
+            "line1": l1,
+            "line2": l2,
+        }
+        i += 3
+    return catalog
+
+
+def diff_catalogs(old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """Diferença por satélite entre dois catálogos: incluídos, removidos e com elementos alterados."""
+    added = sorted(set(new) - set(old))
+    removed = sorted(set(old) - set(new))
+    changed = sorted(
+        name for name in set(new) & set(old)
+        if (new[name]["line1"], new[name]["line2"]) != (old[name]["line1"], old[name]["line2"])
+    )
+    return {"added": added, "removed": removed, "changed": changed}
+
+
 class TLEMonitor:
     TLE_URL = "https://www.qsl.net/pu4elt/TLE/PU4ELT_tle.txt"
-    
-    def __init__(self, cache_file: Path):
-        self.cache_file = cache_file
 
-    def _get_local_hash(self) -> str:
-        if not self.cache_file.exists():
-            return ""
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+        self.tle_path = cache_dir / "tle.txt"               # Arquivo bruto (para propagação offline)
+        self.catalog_path = cache_dir / "tle_catalog.json"  # Catálogo por satélite + validadores HTTP
+        # Uma checagem por vez (job de sync e /tle podem rodar juntos): a segunda já vê o catálogo novo
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> Dict:
+        if not self.catalog_path.exists():
+            return {"etag": None, "last_modified": None, "md5": None, "satellites": {}}
         try:
-            with open(self.cache_file, "r") as f:
-                return f.read().strip()
-        except Exception:
-            return ""
+            with open(self.catalog_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Erro ao ler catálogo TLE: {e}")
+            return {"etag": None, "last_modified": None, "md5": None, "satellites": {}}
 
-    def _save_local_hash(self, hash_val: str):
+    @staticmethod
+    def _replace(path: Path, data: bytes):
+        """Grava num temporário e troca de uma vez: um leitor (ou outro processo) nunca vê o arquivo pela metade."""
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _save_state(self, state: Dict, raw: bytes):
         try:
-            with open(self.cache_file, "w") as f:
-                f.write(hash_val)
+            # Arquivo bruto primeiro: o catálogo (com o MD5 dele) é o que confirma a atualização
+            self._replace(self.tle_path, raw)
+            self._replace(self.catalog_path, json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8"))
         except Exception as e:
-            logger.error(f"Erro ao salvar hash TLE: {e}")
+            logger.error(f"Erro ao salvar catálogo TLE: {e}")
+
+    def get_catalog(self) -> Dict[str, Dict[str, str]]:
+        """Catálogo local (sem rede): {NOME: {norad, epoch, line1, line2}}."""
+        return self._load_state().get("satellites", {})
 
-    def check_update(self) -> bool:
+    def check_update(self) -> Dict[str, List[str]]:
         """
-        Verifica se o TLE mudou comparando o ETag ou MD5 do conteúdo.
-        Retorna True se houve atualização.
+        Busca o arquivo TLE com GET condicional (If-None-Match / If-Modified-Since).
+        Um arquivo inalterado custa uma resposta 304 sem corpo.
+
+        Retorna o diff por satélite {"added", "removed", "changed"} (listas de nomes);
+        dicionário vazio se nada mudou, na primeira checagem (sem catálogo anterior) ou em caso de erro.
         """
+        with self._lock:
+            return self._check_update()
+
+    def _check_update(self) -> Dict[str, List[str]]:
         logger.info("Checando atualizações de TLE...")
+        state = self._load_state()
+        headers = {}
+        # Só envia validadores se temos o catálogo correspondente salvo
+        if state.get("satellites"):
+            if state.get("etag"):
+                headers["If-None-Match"] = state["etag"]
+            if state.get("last_modified"):
+                headers["If-Modified-Since"] = state["last_modified"]
+
         try:
-            # Primeiro tenta HEAD para ver se mudou (usando headers)
-            # Mas sites estáticos simples as vezes não confiáveis.
-            # Vamos baixar e calcular hash, arquivo é pequeno (<100KB).
-            r = requests.get(self.TLE_URL, timeout=30)
+            r = requests.get(self.TLE_URL, headers=headers, timeout=30)
+            if r.status_code == 304:
+                logger.info("TLE inalterado (304).")
+                REGISTRY.cache_result("tle", True)
+                return {}
             r.raise_for_status()
-            
-            content = r.content
-            current_hash = hashlib.md5(content).hexdigest()
-            old_hash = self._get_local_hash()
-            
-            if current_hash != old_hash:
-                logger.info(f"TLE atualizado! Hash antigo: {old_hash}, Novo: {current_hash}")
-                self._save_local_hash(current_hash)
-                return True
-            
-            return False
-            
         except Exception as e:
             logger.error(f"Erro ao checar TLE: {e}")
-            return False
+            return {}
+
+        content = r.content
+        current_hash = hashlib.md5(content).hexdigest()
+        old_catalog = state.get("satellites", {})
+
+        # Servidor sem suporte a validadores: o hash ainda evita reprocessar o mesmo conteúdo
+        REGISTRY.cache_result("tle", False)
+        if current_hash == state.get("md5") and old_catalog:
+            diff = {}
+            new_catalog = old_catalog
+        elif not old_catalog:
+            # Primeira checagem (ou migração do tle_cache.txt, que só guardava o MD5): não há com o
+            # que comparar, então o catálogo é só gravado, sem alertar todos os satélites como novos
+            new_catalog = parse_tle_text(content.decode("utf-8", errors="replace"))
+            diff = {}
+            logger.info(f"Catálogo TLE inicial: {len(new_catalog)} satélites.")
+        else:
+            new_catalog = parse_tle_text(content.decode("utf-8", errors="replace"))
+            diff = diff_catalogs(old_catalog, new_catalog)
+            if not any(diff.values()):
+                diff = {}
+
+        self._save_state({
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "md5": current_hash,
+            "checked_at": datetime.now().isoformat(),
+            "satellites": new_catalog,
+        }, content)
+
+        if diff:
+            logger.info(
+                f"TLE atualizado! {len(diff['changed'])} alterados, "
+                f"{len(diff['added'])} novos, {len(diff['removed'])} removidos."
+            )
+        return diff
+
+    @staticmethod
+    def format_diff(diff: Dict[str, List[str]], limit: int = 15) -> str:
+        """Resumo legível do diff para mensagens do Telegram."""
+        lines = []
+        for key, label in (("changed", "🔁 Atualizados"), ("added", "➕ Novos"), ("removed", "➖ Removidos")):
+            names = diff.get(key, [])
+            if not names:
+                continue
+            shown = ", ".join(names[:limit]) + ("..." if len(names) > limit else "")
+            lines.append(f"{label} ({len(names)}): `{shown}`")
+        return "\n".join(lines)
@@ -2,14 +2,10 @@ import re
 import json
 import os
 from pathlib import Path
-import requests
 import logging
+from functools import lru_cache
 
-try:
-    from shapely.geometry import shape, Point
-    SHAPELY_AVAILABLE = True
-except ImportError:
-    SHAPELY_AVAILABLE = False
+from .maidenhead import GridSet
 
 logger = logging.getLogger(__name__)
 
@@ -21,12 +17,29 @@ GEOJSON_PATH = BASE_DIR / "data" / "brazil-states.geojson"
 
 POLYGONS_CACHE = {} # State Code -> Polygon/MultiPolygon
 
+# Shapely é importado só na primeira consulta geométrica (import pesado, ~100ms+)
+SHAPELY_AVAILABLE = None  # None = ainda não testado
+
+def _shapely_geometry():
+    """Retorna o módulo shapely.geometry (import tardio) ou None se não instalado."""
+    global SHAPELY_AVAILABLE
+    if SHAPELY_AVAILABLE is False:
+        return None
+    try:
+        from shapely import geometry
+        SHAPELY_AVAILABLE = True
+        return geometry
+    except ImportError:
+        SHAPELY_AVAILABLE = False
+        return None
+
 def _ensure_geojson():
     """Baixa o GeoJSON dos estados se não existir."""
     if GEOJSON_PATH.exists():
         return
 
     try:
+        import requests
         logger.info("Baixando GeoJSON de estados do Brasil...")
         r = requests.get(GEOJSON_URL, timeout=30)
         r.raise_for_status()
@@ -40,11 +53,16 @@ def _ensure_geojson():
     except Exception as e:
         logger.error(f"Erro ao baixar GeoJSON: {e}")
 
+_POLYGONS_ATTEMPTED = False
+
 def _load_polygons():
-    """Carrega polígonos na memória."""
-    if POLYGONS_CACHE: return
+    """Carrega polígonos na memória (uma tentativa por processo, mesmo se falhar)."""
+    global _POLYGONS_ATTEMPTED
+    if POLYGONS_CACHE or _POLYGONS_ATTEMPTED: return
+    _POLYGONS_ATTEMPTED = True
     
-    if not SHAPELY_AVAILABLE:
+    geometry = _shapely_geometry()
+    if geometry is None:
         logger.warning("Shapely não instalado. Geometria desativada.")
         return
 
@@ -74,7 +92,7 @@ def _load_polygons():
                 sigla = props.get('sigla')
 
             if sigla and geom:
-                POLYGONS_CACHE[sigla] = shape(geom)
+                POLYGONS_CACHE[sigla] = geometry.shape(geom)
                 
     except Exception as e:
         logger.error(f"Erro ao carregar polígonos: {e}")
@@ -129,14 +147,15 @@ def get_state_from_grid(grid: str) -> str:
     if grid in MANUAL_GRID_MAP:
         return MANUAL_GRID_MAP[grid]
 
-    if not SHAPELY_AVAILABLE: return None
+    geometry = _shapely_geometry()
+    if geometry is None: return None
     
     try:
         _load_polygons()
         if not POLYGONS_CACHE: return None
         
         lat, lon = grid_to_latlon(grid)
-        pt = Point(lon, lat)
+        pt = geometry.Point(lon, lat)
         
         # 1. Strict Check (Contains)
         for sigla, poly in POLYGONS_CACHE.items():
@@ -167,6 +186,23 @@ def get_state_from_grid(grid: str) -> str:
         logger.error(f"Erro no geo-check do grid {grid}: {e}")
         return None
 
+# Retângulo que contém o Brasil (lat_min, lat_max, lon_min, lon_max)
+BRAZIL_BOX = (-34.0, 6.0, -74.0, -34.0)
+
+@lru_cache(maxsize=None)
+def state_grids(state: str = None) -> GridSet:
+    """
+    Máscara (GridSet) dos grids de um estado, ou do Brasil inteiro se `state` for None,
+    segundo get_state_from_grid. Vazia se o shapely / os polígonos não estiverem disponíveis
+    (exceto os grids do MANUAL_GRID_MAP).
+    """
+    inside = []
+    for grid in GridSet.box(*BRAZIL_BOX):
+        sigla = get_state_from_grid(grid)
+        if sigla and (state is None or sigla == state):
+            inside.append(grid)
+    return GridSet.from_grids(inside)
+
 def get_state_from_call(call: str) -> str:
     """
     Deduz o estado (UF) brasileiro baseado no indicativo (Callsign).
@@ -0,0 +1,129 @@
+"""SyncQueue: agrupamento de pedidos de sync, reconciliação e /forget."""
+import threading
+
+import pytest
+
+from src.jobs import (ABSORBED, FORGET, JOINED, MERGED, QUEUED, RECONCILE, STARTED, SYNC, UPGRADED,
+                      SyncQueue)
+
+
+class Harness:
+    """Runner que segura o primeiro job até release(): o resto fica na fila, sob controle do teste."""
+
+    def __init__(self):
+        self.ran = []
+        self.notified = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.done = threading.Event()
+        self.queue = SyncQueue(self.run, self.notify)
+
+    def run(self, job):
+        self.ran.append((job.kind, job.full, job.months, job.grid))
+        self.started.set()
+        self.gate.wait(5)
+        return f"{job.kind} ok"
+
+    def notify(self, chat_ids, summary):
+        self.notified.append((summary, sorted(chat_ids)))
+
+    def hold(self, kind=FORGET):
+        """Põe um job para rodar e espera ele começar (os próximos pedidos vão para a fila)."""
+        assert self.queue.submit(kind, "busy", grid="AA00" if kind == FORGET else None) == STARTED
+        assert self.started.wait(5)
+
+    def release(self):
+        self.gate.set()
+        for _ in range(500):
+            if self.queue.running is None and not self.queue.depth:
+                return
+            self.done.wait(0.01)
+        pytest.fail("fila não esvaziou")
+
+
+@pytest.fixture
+def h():
+    harness = Harness()
+    yield harness
+    harness.gate.set()
+
+
+def test_duplicate_syncs_collapse(h):
+    h.hold(SYNC)
+    assert h.queue.submit(SYNC, "a") == JOINED       # o sync em execução cobre
+    h2 = h.queue.submit(SYNC, "b", full=True)
+    assert h2 == QUEUED
+    assert h.queue.submit(SYNC, "c") == JOINED
+    assert h.queue.submit(SYNC, "d", full=True) == MERGED  # o completo na fila cobre
+    assert h.queue.depth == 1
+    h.release()
+
+    assert h.ran == [(SYNC, False, None, None), (SYNC, True, None, None)]
+    assert h.notified == [("sync ok", ["a", "busy", "c"]), ("sync ok", ["b", "d"])]
+
+
+def test_full_sync_upgrades_pending_incremental(h):
+    h.hold()
+    h.queue.submit(RECONCILE, "r", months=["202401"])
+    assert h.queue.submit(SYNC, "a") == QUEUED
+    assert h.queue.submit(SYNC, "b", full=True) == UPGRADED
+    assert h.queue.depth == 2
+    h.release()
+    assert h.ran[1:] == [(RECONCILE, False, ["202401"], None), (SYNC, True, None, None)]
+
+
+def test_full_reconcile_absorbs_pending_sync(h):
+    h.hold()
+    h.queue.submit(FORGET, "f", grid="GG66")
+    assert h.queue.submit(SYNC, "a") == QUEUED
+    assert h.queue.submit(RECONCILE, "b", months=[]) == ABSORBED
+    assert h.queue.submit(SYNC, "c") == MERGED       # coberto pela reconciliação na fila
+    assert h.queue.depth == 2
+    h.release()
+
+    assert h.ran[1:] == [(FORGET, False, None, "GG66"), (RECONCILE, False, [], None)]
+    assert ("reconcile ok", ["a", "b", "c"]) in h.notified
+
+
+def test_partial_reconcile_does_not_absorb_sync(h):
+    h.hold()
+    assert h.queue.submit(SYNC, "a") == QUEUED
+    assert h.queue.submit(RECONCILE, "b", months=["202401"]) == QUEUED
+    assert h.queue.submit(RECONCILE, "c") == QUEUED  # rodízio: não cobre os QSOs novos
+    assert h.queue.depth == 3
+
+
+def test_full_sync_is_not_absorbed(h):
+    h.hold()
+    assert h.queue.submit(SYNC, "a", full=True) == QUEUED
+    assert h.queue.submit(RECONCILE, "b", months=[]) == QUEUED
+    assert h.queue.depth == 2
+
+
+def test_forget_is_never_dropped(h):
+    h.hold()
+    assert h.queue.submit(FORGET, "a", grid="GG66") == QUEUED
+    assert h.queue.submit(SYNC, "b", full=True) == QUEUED
+    assert h.queue.submit(RECONCILE, "c", months=[]) == QUEUED
+    assert h.queue.submit(FORGET, "d", grid="FF46") == QUEUED
+    assert h.queue.submit(FORGET, "e", grid="GG66") == MERGED  # mesmo grid: um job só
+    h.release()
+
+    forgets = [grid for kind, _full, _months, grid in h.ran if kind == FORGET]
+    assert forgets == ["AA00", "GG66", "FF46"]
+    assert ("forget ok", ["a", "e"]) in h.notified and ("forget ok", ["d"]) in h.notified
+
+
+def test_failed_job_notifies_and_queue_continues(h):
+    def run(job):
+        h.ran.append(job.kind)
+        if job.kind == SYNC:
+            raise RuntimeError("LoTW fora do ar")
+        return "ok"
+
+    h.queue._runner = run
+    h.queue.submit(SYNC, "a")
+    h.queue.submit(FORGET, "b", grid="GG66")
+    h.release()
+    assert h.ran == [SYNC, FORGET]
+    assert h.notified == [("❌ Erro: LoTW fora do ar", ["a"]), ("ok", ["b"])]
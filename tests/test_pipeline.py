@@ -0,0 +1,54 @@
+"""SyncPipeline: um erro no meio do download não pode deixar o merge do Storage aberto."""
+import json
+
+import pytest
+
+from benchmarks.synthetic import generate_qsos
+from src.pipeline import SyncPipeline
+from src.storage import Storage
+
+
+def _failing(records, after: int):
+    for i, raw in enumerate(records):
+        if i == after:
+            raise ConnectionError("LoTW caiu no meio do download")
+        yield raw
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(tmp_path / "state.json")
+    storage.merge_qsos(generate_qsos(500, seed=1))
+    assert storage.save()
+    return storage
+
+
+def _saved_qsos(storage) -> int:
+    with open(storage.filepath, encoding="utf-8") as f:
+        return len(json.load(f)["qso_cache"])
+
+
+def test_stream_error_closes_the_merge(storage):
+    qsos = generate_qsos(3000, seed=2)
+    with pytest.raises(ConnectionError):
+        SyncPipeline(storage, batch_size=1000).run(_failing(qsos, 2500))
+
+    assert not storage.merge_open
+    # Os lotes inteiros mesclados antes da falha são publicados e gravados
+    published = len(storage.snapshot.data["qso_cache"])
+    assert published == len(storage.data["qso_cache"]) > 500
+    assert storage.save()
+    assert _saved_qsos(storage) == published
+
+
+def test_concurrent_stream_error_closes_the_merge(storage):
+    streams = {
+        "qsl": {"records": iter(generate_qsos(2000, seed=3))},
+        "worked": {"records": _failing(generate_qsos(2000, seed=4), 1500), "keep_confirmed": True},
+    }
+    with pytest.raises(ConnectionError):
+        SyncPipeline(storage, batch_size=500).run_streams(streams)
+
+    assert not storage.merge_open
+    assert storage.save()
+    assert _saved_qsos(storage) == len(storage.snapshot.data["qso_cache"])
@@ -0,0 +1,40 @@
+"""Profiler: o alvo armado por /profile vale para a próxima execução que de fato for perfilada."""
+from src.profiling import Profiler
+
+
+def _work():
+    return sum(i * i for i in range(10000))
+
+
+def test_armed_target_survives_a_busy_profiler(tmp_path):
+    profiler = Profiler(tmp_path / "profiles")
+    profiler.arm("check")
+
+    # Outro perfil em andamento: roda sem perfil, mas o alvo continua armado
+    assert profiler._running.acquire(blocking=False)
+    with profiler.profile("check") as result:
+        _work()
+    assert result == {}
+    profiler._running.release()
+
+    with profiler.profile("check") as result:
+        _work()
+    assert "summary" in result and all(path.exists() for path in result["files"])
+
+    # Armado vale uma vez só
+    with profiler.profile("check") as result:
+        _work()
+    assert result == {}
+    assert len(profiler.recent()) == 1
+
+
+def test_configured_targets_are_always_profiled(tmp_path):
+    profiler = Profiler(tmp_path / "profiles", always={"map"})
+    for _ in range(2):
+        with profiler.profile("map") as result:
+            _work()
+        assert "summary" in result
+    with profiler.profile("stats") as result:
+        _work()
+    assert result == {}
+    assert not profiler._running.locked()
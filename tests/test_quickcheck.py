@@ -0,0 +1,59 @@
+"""Verificação rápida do cron: decide pelo resumo do estado e pela fatia incremental do LoTW."""
+import pytest
+
+from benchmarks.fake_services import FakeServices
+from benchmarks.synthetic import generate_qsos
+from src.config import Config
+from src.lotw_client import QSL, QUERIES, WORKED
+from src.quickcheck import QuickCheck, sidecar_path
+from src.storage import Storage
+
+
+@pytest.fixture
+def services(monkeypatch):
+    services = FakeServices(generate_qsos(300, seed=3)).start()
+    for name, value in {"LOTW_USERNAME": services.username, "LOTW_PASSWORD": services.password,
+                        "LOTW_URL": services.lotw_url}.items():
+        monkeypatch.setitem(vars(Config), name, value)
+    yield services
+    services.stop()
+
+
+@pytest.fixture
+def state_path(tmp_path, services):
+    """Estado em dia com o LoTW falso: todos os QSOs e as marcas d'água do último registro."""
+    path = tmp_path / "state.json"
+    storage = Storage(path)
+    storage.merge_qsos(services.qsos)
+    for q in (QSL, WORKED):
+        tag = QUERIES[q]["record"]
+        storage.set_cursor(q, max(r[tag] for r in services.qsos if r.get(tag)))
+    assert storage.save()
+    return path
+
+
+def test_nothing_new_skips_the_sync(state_path, services):
+    quick = QuickCheck(state_path, [QSL, WORKED])
+    assert quick.run()
+    assert quick.reason == ""
+    assert len(services.lotw_requests) == 2
+
+
+def test_new_record_needs_the_sync(state_path, services):
+    new = dict(services.qsos[0], CALL="PY9NEW", APP_LOTW_RXQSO="2099-01-01 00:00:00",
+               QSL_RCVD="Y", QSLRDATE="20990101", APP_LOTW_RXQSL="2099-01-01 00:00:00")
+    services.qsos.append(new)
+
+    quick = QuickCheck(state_path, [QSL, WORKED])
+    assert not quick.run()
+    assert "novo" in quick.reason
+    # As fatias baixadas seguem para o sync completo, que não as baixa de novo
+    assert any(r["CALL"] == "PY9NEW" for r in quick.streams[QSL]["records"])
+
+
+def test_stale_sidecar_needs_the_sync(state_path, services):
+    sidecar_path(state_path).unlink()
+    quick = QuickCheck(state_path, [QSL])
+    assert not quick.run()
+    assert "resumo" in quick.reason
+    assert services.lotw_requests == []
@@ -0,0 +1,133 @@
+"""Reconciler contra um LoTW falso: meses limpos, apagados/inseridos no LoTW e /forget."""
+from typing import Dict, List
+
+import pytest
+
+from src.lotw_client import WORKED
+from src.reconcile import Reconciler
+from src.storage import Storage
+
+
+def _qso(call: str, date: str, grid: str, confirmed: bool = True) -> Dict[str, str]:
+    qso = {
+        "CALL": call, "BAND": "2M", "MODE": "FM", "QSO_DATE": date, "TIME_ON": "120000",
+        "PROP_MODE": "SAT", "SAT_NAME": "SO-50", "GRIDSQUARE": grid,
+        "APP_LOTW_RXQSO": f"{date[:4]}-{date[4:6]}-{date[6:]} 12:00:00",
+        "QSL_RCVD": "Y" if confirmed else "N",
+    }
+    if confirmed:
+        qso["QSLRDATE"] = date
+        qso["APP_LOTW_RXQSL"] = f"{date[:4]}-{date[4:6]}-{date[6:]} 18:00:00"
+    return qso
+
+
+class FakeLoTW:
+    """iter_qsos/last_bytes do LoTWClient sobre uma lista de registros em memória."""
+
+    def __init__(self, qsos: List[Dict[str, str]]):
+        self.qsos = qsos
+        self.last_bytes: Dict[str, int] = {}
+        self.requests = []
+
+    def iter_qsos(self, since=None, query=WORKED, detail=True, start_date=None, end_date=None):
+        self.requests.append((query, detail, start_date, end_date))
+        start = (start_date or "").replace("-", "")
+        end = (end_date or "99999999").replace("-", "")
+        records = [dict(q) for q in self.qsos if start <= q["QSO_DATE"] <= end]
+        self.last_bytes[query] = 100 * len(records)
+        return iter(records)
+
+
+@pytest.fixture
+def log():
+    return [
+        _qso("PY2AA", "20240105", "GG66"),
+        _qso("LU1BB", "20240110", "GF05"),
+        _qso("CE3CC", "20240203", "FF46"),
+        _qso("W1DD", "20240214", "FN42", confirmed=False),
+    ]
+
+
+@pytest.fixture
+def storage(tmp_path, log):
+    storage = Storage(tmp_path / "state.json")
+    storage.merge_qsos([dict(q) for q in log])
+    return storage
+
+
+def test_clean_months_are_not_repaired(storage, log):
+    client = FakeLoTW(log)
+    report = Reconciler(storage, client).run(["202401", "202402"])
+
+    assert report["checked"] == ["202401", "202402"]
+    assert report["differ"] == [] and report["repaired"] == []
+    assert report["inserted"] == report["deleted"] == 0
+    assert all(not detail for _query, detail, _start, _end in client.requests)
+
+
+def test_deleted_and_inserted_qsos_are_repaired(storage, log):
+    remote = [q for q in log if q["CALL"] != "LU1BB"] + [_qso("PY5EE", "20240120", "GG54")]
+    report = Reconciler(storage, FakeLoTW(remote)).run(["202401", "202402"])
+
+    assert report["differ"] == ["202401"]
+    assert report["repaired"] == ["202401"]
+    assert report["inserted"] == 1 and report["deleted"] == 1
+    assert report["new_grids"] == ["GG54"]
+
+    grids = storage.get_confirmed_grids()
+    assert "GG54" in grids and "GF05" not in grids
+    calls = {key[0] for key in storage.data["qso_cache"]}
+    assert "LU1BB" not in calls and "PY5EE" in calls
+
+    # Reparado, o mês volta a bater com o LoTW
+    again = Reconciler(storage, FakeLoTW(remote)).run(["202401"])
+    assert again["differ"] == [] and again["repaired"] == []
+
+
+def test_forget_then_repair_alerts_the_grid_again(storage, log):
+    assert storage.forget_grid("FF46")
+    assert "FF46" not in storage.get_confirmed_grids()
+    assert storage.dirty_months == ["202402"]
+
+    # Só os meses marcados pelo /forget, sem conferência
+    report = Reconciler(storage, FakeLoTW(log)).run(check=False)
+
+    assert report["checked"] == []
+    assert report["repaired"] == ["202402"]
+    assert report["new_grids"] == ["FF46"]
+    assert "FF46" in report["grid_info"]
+    assert report["deleted"] == 0
+    assert "FF46" in storage.get_confirmed_grids()
+    assert storage.dirty_months == []
+
+
+class FlakyLoTW(FakeLoTW):
+    """Cai (timeout) no download completo de um mês, depois de entregar parte dele."""
+
+    def __init__(self, qsos: List[Dict[str, str]], fail_from: str):
+        super().__init__(qsos)
+        self.fail_from = fail_from
+
+    def iter_qsos(self, since=None, query=WORKED, detail=True, start_date=None, end_date=None):
+        records = super().iter_qsos(since, query, detail, start_date, end_date)
+        if not detail or (start_date or "").replace("-", "") < self.fail_from:
+            return records
+        return self._broken(records)
+
+    @staticmethod
+    def _broken(records):
+        yield next(records)
+        raise TimeoutError("LoTW não respondeu")
+
+
+def test_download_error_does_not_block_later_saves(storage, log):
+    # Janeiro: LU1BB apagado no LoTW (delete_qsos abre o merge); fevereiro: o download cai
+    remote = [q for q in log if q["CALL"] != "LU1BB"] + [_qso("PY5EE", "20240220", "GG54")]
+    with pytest.raises(TimeoutError):
+        Reconciler(storage, FlakyLoTW(remote, fail_from="20240201")).run(["202401", "202402"])
+
+    assert not storage.merge_open
+    calls = {key[0] for key in storage.snapshot.data["qso_cache"]}
+    assert "LU1BB" not in calls
+    assert storage.save()
+    assert Storage(storage.filepath).get_confirmed_grids() == storage.get_confirmed_grids()
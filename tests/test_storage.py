@@ -0,0 +1,147 @@
+"""Storage em disco: ida e volta nos dois formatos, migração JSON -> binário e a sobreposição do estado binário."""
+import pytest
+
+from benchmarks.synthetic import generate_qsos
+from src.awards import AwardEngine
+from src.columnar import LazyQSOCache, is_binary_state
+from src.grid_labels import GridLabelIndex
+from src.metrics import REGISTRY
+from src.storage import Storage
+
+
+def _records(storage):
+    return {k: dict(q.items()) for k, q in storage.snapshot.data["qso_cache"].items()}
+
+
+def _same_state(a, b):
+    assert _records(a) == _records(b)
+    assert a.get_confirmed_grids() == b.get_confirmed_grids()
+    assert a.get_worked_grids() == b.get_worked_grids()
+    assert a.awards.state == b.awards.state
+    assert a.digests.digests() == b.digests.digests()
+
+
+@pytest.fixture
+def qsos():
+    return generate_qsos(2000, seed=7)
+
+
+@pytest.mark.parametrize("fmt", ["json", "binary"])
+def test_save_and_reload_round_trip(tmp_path, qsos, fmt):
+    storage = Storage(tmp_path / "state.json", fmt)
+    storage.merge_qsos(qsos)
+    storage.set_cursor("qsl", "2025-01-01 00:00:00")
+    assert storage.save()
+    assert is_binary_state(storage.filepath) == (fmt == "binary")
+
+    reloaded = Storage(tmp_path / "state.json", fmt)
+    _same_state(storage, reloaded)
+    assert reloaded.get_cursor("qsl") == "2025-01-01 00:00:00"
+    assert not reloaded.dirty
+
+
+def test_json_state_migrates_to_binary(tmp_path, qsos):
+    old = Storage(tmp_path / "state.json")
+    old.merge_qsos(qsos)
+    assert old.save()
+
+    migrated = Storage(tmp_path / "state.json", "binary")
+    _same_state(old, migrated)
+    assert migrated.save()
+    assert migrated.filepath.name == "state.bin" and is_binary_state(migrated.filepath)
+    assert not (tmp_path / "state.json").exists()
+    assert (tmp_path / "state.json.bak").exists()
+    _same_state(old, Storage(tmp_path / "state.bin", "binary"))
+
+
+def test_binary_overlay_updates_and_deletes(tmp_path, qsos):
+    first = Storage(tmp_path / "state.json", "binary")
+    first.merge_qsos(qsos[:1500])
+    assert first.save()
+
+    storage = Storage(tmp_path / "state.json", "binary")
+    cache = storage.data["qso_cache"]
+    assert isinstance(cache, LazyQSOCache)
+
+    # Um não confirmado passa a confirmado, um QSO novo chega e outro é apagado no LoTW
+    pending = next(dict(q) for q in qsos[:1500] if q["QSL_RCVD"] == "N" and "GRIDSQUARE" in q)
+    pending.update(QSL_RCVD="Y", QSLRDATE="20250101", APP_LOTW_RXQSL="2025-01-01 00:00:00")
+    new = qsos[1500]
+    gone = storage._qso_key(qsos[1499])
+    assert gone != storage._qso_key(pending)
+    storage.merge_qsos([pending, new])
+    assert storage.delete_qsos([gone]) == 1
+    storage.finish_merge()
+
+    view = storage.snapshot.data["qso_cache"]
+    assert view[storage._qso_key(pending)]["QSL_RCVD"] == "Y"
+    assert storage._qso_key(new) in view
+    assert gone not in view and gone not in set(view)
+    assert len(view) == 1500
+    assert pending["GRIDSQUARE"][:4] in storage.get_confirmed_grids()
+
+    assert storage.save()
+    _same_state(storage, Storage(tmp_path / "state.bin", "binary"))
+
+
+def test_binary_overlay_stays_bounded(tmp_path, qsos):
+    storage = Storage(tmp_path / "state.json", "binary")
+    storage.merge_qsos(qsos[:500])
+    assert storage.save()
+
+    for start in range(500, 2000, 250):
+        storage.merge_qsos(qsos[start:start + 250])
+        assert len(storage.data["qso_cache"]._overlay) <= 250
+        assert storage.save()
+        # O save grava a sobreposição no arquivo e recomeça com ela vazia
+        cache = storage.data["qso_cache"]
+        assert isinstance(cache, LazyQSOCache) and not cache._overlay and not cache._deleted
+    assert len(storage.snapshot.data["qso_cache"]) == len({storage._qso_key(q) for q in qsos})
+
+
+def test_derived_state_is_not_rebuilt_on_every_start(tmp_path, qsos, monkeypatch):
+    # Log sem nenhum QSO confirmado: diplomas e rótulos vazios, mas já calculados
+    storage = Storage(tmp_path / "state.json")
+    storage.merge_qsos([dict(q, QSL_RCVD="N") for q in qsos[:200]])
+    assert storage.awards.state["total_confirmed"] == 0 and not storage.labels.state["grids"]
+    assert storage.save()
+
+    rebuilds = []
+    monkeypatch.setattr(AwardEngine, "rebuild", lambda self, *a: rebuilds.append(a))
+    monkeypatch.setattr(GridLabelIndex, "rebuild", lambda self, *a: rebuilds.append(a))
+    assert not Storage(tmp_path / "state.json").dirty
+    assert rebuilds == []
+
+    # Estado antigo, sem a marca "built": recalcula uma vez
+    monkeypatch.undo()
+    storage.awards.state.pop("built")
+    storage.labels.state.pop("built")
+    storage.dirty = True
+    assert storage.save()
+    migrated = Storage(tmp_path / "state.json")
+    assert migrated.dirty and migrated.awards.is_built and migrated.labels.is_built
+    assert migrated.save()
+    assert not Storage(tmp_path / "state.json").dirty
+
+
+def _cache_counts(cache):
+    series = REGISTRY._counters.get("lotw_monitor_cache_requests_total", {})
+    return {result: series.get((("cache", cache), ("result", result)), 0) for result in ("hit", "miss")}
+
+
+def test_snapshot_memo_reports_hits_and_misses(tmp_path, qsos):
+    storage = Storage(tmp_path / "state.json")
+    storage.merge_qsos(qsos[:200])
+    before, memo_before = _cache_counts("snapshot:dashboard_stats"), _cache_counts("snapshot_memo")
+
+    storage.get_dashboard_stats()
+    storage.get_dashboard_stats()
+    storage.set_cursor("qsl", "2025-01-01 00:00:00")
+    storage.publish()  # Sem mudança nas visões: o novo snapshot herda o memo
+    storage.get_dashboard_stats()
+    storage.merge_qsos(qsos[200:300])  # Muda as visões: memo novo
+    storage.get_dashboard_stats()
+
+    after, memo_after = _cache_counts("snapshot:dashboard_stats"), _cache_counts("snapshot_memo")
+    assert after["hit"] - before["hit"] == 2 and after["miss"] - before["miss"] == 2
+    assert memo_after["hit"] > memo_before["hit"] and memo_after["miss"] > memo_before["miss"]
@@ -0,0 +1,144 @@
+"""Sync incremental contra o LoTW falso: marcas d'água (qso_qslsince / qso_qsorxsince) e keep_confirmed."""
+import pytest
+
+from benchmarks.fake_services import FakeServices
+from src.config import Config
+from src.lotw_client import QSL, WORKED
+from src.storage import Storage
+
+
+def _qso(call: str, date: str, grid: str, rx: str, qsl: str = "") -> dict:
+    qso = {
+        "CALL": call, "BAND": "2M", "MODE": "FM", "QSO_DATE": date, "TIME_ON": "120000",
+        "PROP_MODE": "SAT", "SAT_NAME": "SO-50", "GRIDSQUARE": grid, "APP_LOTW_RXQSO": rx,
+        "QSL_RCVD": "Y" if qsl else "N",
+    }
+    if qsl:
+        qso.update(QSLRDATE=qsl[:10].replace("-", ""), APP_LOTW_RXQSL=qsl)
+    return qso
+
+
+def _confirm(qso: dict, qsl: str) -> dict:
+    return dict(qso, QSL_RCVD="Y", QSLRDATE=qsl[:10].replace("-", ""), APP_LOTW_RXQSL=qsl)
+
+
+@pytest.fixture
+def services():
+    services = FakeServices([
+        _qso("PY2AA", "20240105", "GG66", "2024-01-05 13:00:00", qsl="2024-01-10 08:00:00"),
+        _qso("LU1BB", "20240110", "GF05", "2024-01-10 13:00:00", qsl="2024-02-01 09:30:00"),
+        _qso("CE3CC", "20240203", "FF46", "2024-02-03 13:00:00"),
+    ]).start()
+    yield services
+    services.stop()
+
+
+@pytest.fixture
+def bot(tmp_path, services, monkeypatch):
+    settings = {
+        "TELEGRAM_BOT_TOKEN": "123456:TEST", "TELEGRAM_CHAT_ID": services.chat_id,
+        "LOTW_USERNAME": services.username, "LOTW_PASSWORD": services.password,
+        "LOTW_URL": services.lotw_url, "TELEGRAM_API_URL": services.base_url,
+        "STATE_FILE": tmp_path / "data" / "state.json", "SYNC_WORKED": True,
+    }
+    # Grava direto no __dict__ da instância (onde o cached_property guarda o valor), sem resolver o .env
+    for name, value in settings.items():
+        monkeypatch.setitem(vars(Config), name, value)
+    (tmp_path / "data").mkdir()
+
+    from src.bot import MonitorBot
+    bot = MonitorBot()
+    bot.tle_mon.check_update = lambda: {}
+    bot.alerts = []
+    bot.notify_new_grids = lambda grids, info: bot.alerts.append(sorted(grids))
+    return bot
+
+
+def _since(services, first: int = 0):
+    """{consulta: valor do since} das requisições feitas ao LoTW a partir de `first`."""
+    since = {}
+    for request in services.lotw_requests[first:]:
+        params = request["params"]
+        if params["qso_qsl"] == "yes":
+            since[QSL] = params["qso_qslsince"]
+        else:
+            since[WORKED] = params["qso_qsorxsince"]
+    return since
+
+
+def test_first_sync_is_full_and_sets_cursors(bot, services):
+    bot.run_check_job()
+
+    assert _since(services) == {QSL: "1900-01-01", WORKED: "1900-01-01"}
+    # Cabeçalho APP_LOTW_LASTQSL / APP_LOTW_LASTQSORX da resposta
+    assert bot.storage.get_cursor(QSL) == "2024-02-01 09:30:00"
+    assert bot.storage.get_cursor(WORKED) == "2024-02-03 13:00:00"
+    assert bot.alerts == [["GF05", "GG66"]]
+    assert bot.storage.get_worked_grids() >= {"FF46"}
+
+
+def test_incremental_sync_asks_from_the_cursors(bot, services):
+    bot.run_check_job()
+    first = len(services.lotw_requests)
+
+    # Nada novo: pede a partir das marcas d'água, que não mudam
+    bot.run_check_job()
+    assert _since(services, first) == {QSL: "2024-02-01 09:30:00", WORKED: "2024-02-03 13:00:00"}
+    assert bot.storage.get_cursor(QSL) == "2024-02-01 09:30:00"
+    assert len(bot.alerts) == 1  # O registro da fronteira (since é inclusivo) volta, mas não é novidade
+
+    # Chega a QSL do QSO só trabalhado e um QSO novo: as marcas avançam e o grid é alertado
+    services.qsos[2] = _confirm(services.qsos[2], "2024-03-01 10:00:00")
+    services.qsos.append(_qso("W1DD", "20240302", "FN42", "2024-03-02 13:00:00"))
+    second = len(services.lotw_requests)
+    bot.run_check_job()
+    # Cada consulta traz só o registro da fronteira e o novo
+    assert sorted(r["records"] for r in services.lotw_requests[second:]) == [2, 2]
+    assert bot.storage.get_cursor(QSL) == "2024-03-01 10:00:00"
+    assert bot.storage.get_cursor(WORKED) == "2024-03-02 13:00:00"
+    assert bot.alerts[-1] == ["FF46"]
+    assert "FF46" in bot.storage.get_confirmed_grids()
+
+    # As marcas d'água sobrevivem ao restart
+    assert Storage(Config.STATE_FILE).get_cursor(QSL) == "2024-03-01 10:00:00"
+
+
+def test_failed_download_keeps_cursors(bot, services):
+    bot.run_check_job()
+    services.password = "trocada"  # O LoTW devolve a página HTML de erro
+    services.qsos.append(_qso("W1DD", "20240302", "FN42", "2024-03-02 13:00:00", qsl="2024-03-05 10:00:00"))
+
+    summary = bot.run_check_job()
+
+    assert summary.startswith("❌")
+    assert bot.storage.get_cursor(QSL) == "2024-02-01 09:30:00"
+    assert bot.storage.get_cursor(WORKED) == "2024-02-03 13:00:00"
+    assert not bot.storage.merge_open
+
+
+def test_worked_record_does_not_downgrade_confirmed(tmp_path):
+    storage = Storage(tmp_path / "state.json")
+    confirmed = _qso("PY2AA", "20240105", "GG66", "2024-01-05 13:00:00", qsl="2024-01-10 08:00:00")
+    storage.merge_qsos([confirmed])
+    key = storage._qso_key(confirmed)
+
+    # O mesmo QSO pela consulta de trabalhados (qso_qsl=no): sem QSL e sem detalhe
+    worked = {k: v for k, v in confirmed.items() if k not in ("QSL_RCVD", "QSLRDATE", "APP_LOTW_RXQSL")}
+    worked["QSL_RCVD"] = "N"
+    storage.merge_qsos([worked], keep_confirmed=True)
+    assert storage.last_merge == {"inserted": 0, "updated": 0, "unchanged": 1}
+    assert storage.data["qso_cache"][key].confirmed
+    assert "GG66" in storage.get_confirmed_grids()
+    assert storage.awards.state["total_confirmed"] == 1
+
+    # Registros não confirmados ainda entram e são atualizados pelo fluxo de trabalhados
+    other = _qso("LU1BB", "20240110", "GF05", "2024-01-10 13:00:00")
+    storage.merge_qsos([other], keep_confirmed=True)
+    storage.merge_qsos([dict(other, MODE="SSB")], keep_confirmed=True)
+    assert storage.last_merge["updated"] == 1
+    assert storage.data["qso_cache"][storage._qso_key(other)]["MODE"] == "SSB"
+
+    # Sem keep_confirmed (ex.: o LoTW retirou a confirmação), o registro é substituído
+    storage.merge_qsos([worked])
+    assert not storage.data["qso_cache"][key].confirmed
+    assert storage.awards.state["total_confirmed"] == 0